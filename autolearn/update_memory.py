@@ -6,10 +6,11 @@ from brain.memory_manager import MemoryManager
 mm = MemoryManager()
 
 def save_facts(facts: List[Dict]) -> int:
-    n = 0
+    batch = []
     for f in facts:
         content = f.get("content","").strip()
         if content:
-            mm.add_fact(content, source=f.get("source",""), tags=f.get("tags",[]))
-            n += 1
-    return n
+            batch.append({"content": content, "source": f.get("source",""), "tags": f.get("tags",[])})
+    # كتابة واحدة تحت القفل (العامل والويب يكتبان نفس الملف)
+    if batch: mm.add_facts(batch)
+    return len(batch)
@@ -1,5 +1,6 @@
 # bassam_agent.py — ملف واحد: وكيل بشري + ذاكرة + واجهة ويب + PWA
-import os, re, json, sqlite3, hashlib, io, csv, uuid, traceback
+import os, re, json, sqlite3, hashlib, io, csv, uuid, traceback, threading, asyncio
+from collections import OrderedDict, deque
 from datetime import datetime
 from typing import List, Dict, Optional
 
@@ -10,6 +11,14 @@ from fastapi.staticfiles import StaticFiles
 import httpx
 from duckduckgo_search import DDGS
 
+from core.dbpool import connect as pooled_connect, close_all as close_db_pool
+from core.log_sink import BatchSink, close_all as close_log_sinks
+from core.logstore import ensure_log_schema, insert_logs
+from core.retention import archive_table, cutoff_iso
+from core.arabic import VERSION as NORM_VERSION, normalize
+from core.summarize import make_bullets
+from brain.pipeline import Pipeline, Step
+
 # ---------- إعداد مفاتيح / بيئة ----------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY","").strip()
 LLM_MODEL = os.getenv("LLM_MODEL","gpt-4o-mini").strip()  # عدّل لِما يتوفر عندك
@@ -22,8 +31,10 @@ SERPER_API_KEY = os.getenv("SERPER_API_KEY","").strip()  # اختياري للب
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data"); os.makedirs(DATA_DIR, exist_ok=True)
 UPLOADS_DIR = os.path.join(BASE_DIR, "uploads"); os.makedirs(UPLOADS_DIR, exist_ok=True)
-DB_PATH = os.path.join(DATA_DIR, "bassam.db")
-MEM_DB = os.path.join(DATA_DIR, "memory.db")
+DB_PATH = os.getenv("AGENT_DB", os.path.join(DATA_DIR, "bassam.db"))
+MEM_DB = os.getenv("AGENT_MEMORY_DB", os.path.join(DATA_DIR, "memory.db"))
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "90"))
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "180"))
 
 # ---------- تطبيق FastAPI + ملفات ثابتة بسيطة ----------
 app = FastAPI(title="Bassam Agent (Human-like)")
@@ -37,11 +48,30 @@ try:
 except Exception:
     client = None
 
+# ===================== استعلام البحث (FTS) =====================
+# مثل مُقطِّع unicode61 في chats_search: "_" فاصل؛ وإلا صار "my_file"* عبارة من كلمتين
+# وFTS5 يرفض العبارات مع detail='column' فيفشل البحث كله
+_TOKEN_RE = re.compile(r"[^\W_]+")
+SEARCH_STOPWORDS = {"في","من","على","عن","الى","ما","ماذا","هل","هو","هي","او","ثم","مع","كيف","متى","لماذا","انا","انت","هذا","هذه","التي","الذي","و","يا"}
+FTS_MAX_TERMS = 12
+
+def session_token(session:str)->str:
+    # رمز واحد لكل جلسة في عمود sid (حروف وأرقام فقط فلا يقطّعه unicode61)
+    return "s" + hashlib.blake2b((session or "").encode("utf-8"), digest_size=8).hexdigest()
+
+def fts_query(text:str)->str:
+    """يبني تعبير MATCH آمنًا: كلمات مقتبسة بلا معاملات FTS، مع * للبادئة، مفصولة بـ OR."""
+    terms = []
+    for tok in _TOKEN_RE.findall(normalize(text)):
+        if len(tok) < 2 or tok in SEARCH_STOPWORDS or tok in terms: continue
+        terms.append(tok)
+        if len(terms) >= FTS_MAX_TERMS: break
+    return " OR ".join(f'"{t}"*' for t in terms)
+
 # ===================== قواعد بيانات: سجلات + ذاكرة شخصية =====================
 def db() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+    # اتصالات مُعاد استخدامها لكل خيط (WAL) — لا تُغلق بعد الاستخدام
+    return pooled_connect(DB_PATH)
 
 def init_db():
     with db() as con:
@@ -56,17 +86,24 @@ def init_db():
             ip TEXT, ua TEXT
         );
         """)
+        ensure_log_schema(con)
 init_db()
 
-def log_event(t:str, ip:str, ua:str, query:Optional[str]=None, engine:Optional[str]=None, file_name:Optional[str]=None):
+def _write_logs(rows:List[tuple]):
     with db() as con:
-        con.execute("INSERT INTO logs(ts,type,query,file_name,engine_used,ip,ua) VALUES(?,?,?,?,?,?,?)",
-                    (datetime.utcnow().isoformat(timespec="seconds")+"Z", t, query, file_name, engine, ip, ua))
+        insert_logs(con, rows)
+
+log_sink = BatchSink("logs", _write_logs)
+
+def log_event(t:str, ip:str, ua:str, query:Optional[str]=None, engine:Optional[str]=None, file_name:Optional[str]=None):
+    log_sink.put((datetime.utcnow().isoformat(timespec="seconds")+"Z", t, query, file_name, engine, ip, ua))
 
 def mdb() -> sqlite3.Connection:
-    con = sqlite3.connect(MEM_DB)
-    con.row_factory = sqlite3.Row
-    return con
+    return pooled_connect(MEM_DB)
+
+def _add_column(con:sqlite3.Connection, table:str, col:str, decl:str):
+    if col not in {r["name"] for r in con.execute(f"PRAGMA table_info({table})")}:
+        con.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
 
 def init_memory():
     with mdb() as con:
@@ -77,7 +114,20 @@ def init_memory():
             role TEXT NOT NULL,          -- user | assistant
             text TEXT NOT NULL
         );""")
-        con.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts USING fts5(text, content='chats', content_rowid='id');""")
+        # فهرس بحث على نص مُطبَّع (بدون تشكيل، همزات موحّدة) — rowid = chats.id
+        # sid = رمز الجلسة (session_token): MATCH 'sid:… AND (…)' يقيّد البحث بالجلسة داخل الفهرس
+        # فتتبع الكلفة حجم الجلسة لا حجم كل المحادثات
+        cols = [r["name"] for r in con.execute("PRAGMA table_info(chats_search)").fetchall()]
+        rebuild = bool(cols) and "sid" not in cols
+        if rebuild: con.execute("DROP TABLE chats_search")   # فهرس بلا عمود الجلسة
+        con.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS chats_search USING fts5(
+            norm, sid, tokenize='unicode61 remove_diacritics 2', detail='column');""")
+        # جلسة لكل مستخدم (كوكي bb_sid أو device_id)؛ '' = المحادثات القديمة قبل الجلسات
+        _add_column(con, "chats", "session", "TEXT NOT NULL DEFAULT ''")
+        con.execute("DROP INDEX IF EXISTS idx_chats_role_id")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_chats_session_id ON chats(session, id)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_chats_session_role_id ON chats(session, role, id)")
+        con.execute("DROP TABLE IF EXISTS chats_fts")   # فهرس النص الخام القديم
         con.execute("""
         CREATE TABLE IF NOT EXISTS memories(
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -86,42 +136,101 @@ def init_memory():
             value TEXT NOT NULL,
             score REAL DEFAULT 1.0
         );""")
+        _add_column(con, "memories", "session", "TEXT NOT NULL DEFAULT ''")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_memories_session_id ON memories(session, id)")
+        # فهرس فريد يجعل INSERT OR IGNORE هو فحص التكرار داخل الجلسة (بعد إزالة أي تكرار قديم)
+        con.execute("DROP INDEX IF EXISTS ux_memories_key_value")
+        if not con.execute("SELECT 1 FROM sqlite_master WHERE name='ux_memories_session_key_value'").fetchone():
+            con.execute("DELETE FROM memories WHERE id NOT IN (SELECT MIN(id) FROM memories GROUP BY session, key, value)")
+            con.execute("CREATE UNIQUE INDEX ux_memories_session_key_value ON memories(session, key, value)")
+        con.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+        # إعادة بناء فهرس البحث عند تغيّر قواعد التطبيع (core.arabic.VERSION)
+        r = con.execute("SELECT value FROM meta WHERE key='search_norm_version'").fetchone()
+        if rebuild or not r or r["value"] != NORM_VERSION:
+            con.execute("DELETE FROM chats_search")
+            con.executemany("INSERT INTO chats_search(rowid,norm,sid) VALUES(?,?,?)",
+                            ((c["id"], normalize(c["text"]), session_token(c["session"]))
+                             for c in con.execute("SELECT id,text,session FROM chats").fetchall()))
+            con.execute("INSERT OR REPLACE INTO meta(key,value) VALUES('search_norm_version',?)", (NORM_VERSION,))
         con.execute("""
-        CREATE TABLE IF NOT EXISTS style_profile(
-            id INTEGER PRIMARY KEY CHECK (id=1),
+        CREATE TABLE IF NOT EXISTS style_profiles(
+            session TEXT PRIMARY KEY,
             persona TEXT, tone TEXT, prompts TEXT
-        );""")
+        ) WITHOUT ROWID;""")
+        if con.execute("SELECT 1 FROM sqlite_master WHERE name='style_profile'").fetchone():
+            # الملف العام القديم (صف واحد) يصبح ملف الجلسة ''
+            con.execute("INSERT OR IGNORE INTO style_profiles(session,persona,tone,prompts) SELECT '',persona,tone,prompts FROM style_profile")
+            con.execute("DROP TABLE style_profile")
 init_memory()
 
-def remember_chat(role:str, text:str):
+def _write_chats(rows:List[tuple]):
+    # معاملة واحدة للدفعة؛ نحتاج rowid لكل سطر لفهرس FTS
+    with mdb() as con:
+        for ts, session, role, t in rows:
+            rid = con.execute("INSERT INTO chats(ts,session,role,text) VALUES(?,?,?,?)", (ts, session, role, t)).lastrowid
+            con.execute("INSERT INTO chats_search(rowid,norm,sid) VALUES(?,?,?)",(rid,normalize(t),session_token(session)))
+    # التعلّم من الرسائل الجديدة فقط، هنا في خيط الكتابة وليس في مسار الطلب
+    try:
+        mine_new_memories()
+    except Exception:
+        traceback.print_exc()
+
+chat_sink = BatchSink("chats", _write_chats)
+
+def remember_chat(role:str, text:str, session:str=""):
     t = (text or "").strip()
     if not t: return
-    with mdb() as con:
-        cur = con.execute("INSERT INTO chats(ts,role,text) VALUES(?,?,?)",
-                          (datetime.utcnow().isoformat(timespec="seconds")+"Z", role, t))
-        rid = cur.lastrowid
-        con.execute("INSERT INTO chats_fts(rowid,text) VALUES(?,?)",(rid,t))
+    chat_sink.put((datetime.utcnow().isoformat(timespec="seconds")+"Z", session, role, t))
+    _style_push(role, t, session)
 
-def recent_history(n:int=12) -> List[Dict]:
+def recent_history(n:int=12, session:str="") -> List[Dict]:
+    # الفهرس (session, id) → آخر n رسالة للجلسة دون المرور على غيرها
     with mdb() as con:
-        rows = con.execute("SELECT * FROM chats ORDER BY id DESC LIMIT ?",(n,)).fetchall()
+        rows = con.execute("SELECT * FROM chats WHERE session=? ORDER BY id DESC LIMIT ?",(session,n)).fetchall()
     return [dict(r) for r in rows][::-1]
 
-def search_memories_like(q:str, limit:int=6)->List[str]:
-    q = (q or "").strip()
-    if not q: return []
+def session_memories(session:str="", limit:int=10) -> List[Dict]:
     with mdb() as con:
-        rows = con.execute("SELECT text FROM chats_fts WHERE chats_fts MATCH ? LIMIT ?", (q,limit)).fetchall()
+        rows = con.execute("SELECT key,value FROM memories WHERE session=? ORDER BY id DESC LIMIT ?",(session,limit)).fetchall()
+    return [dict(r) for r in rows]
+
+def search_memories_like(q:str, limit:int=6, role:Optional[str]=None, days:Optional[int]=None,
+                         session:Optional[str]=None)->List[str]:
+    """
+    بحث في المحادثات السابقة: استعلام FTS آمن من كلمات مُطبَّعة (بادئات، OR)
+    مرتّب بـ bm25، مع تصفية اختيارية بالجلسة (داخل فهرس FTS) وبالدور وبآخر days يومًا.
+    """
+    match = fts_query(q)
+    if not match: return []
+    if session is not None:
+        match = f"sid:{session_token(session)} AND ({match})"
+    sql = ("SELECT c.text FROM chats_search s JOIN chats c ON c.id = s.rowid "
+           "WHERE chats_search MATCH ? AND c.text != ?")
+    params:list = [match, (q or "").strip()]
+    if session is not None:
+        sql += " AND c.session = ?"; params.append(session)
+    if role:
+        sql += " AND c.role = ?"; params.append(role)
+    if days:
+        sql += " AND c.ts >= ?"; params.append(cutoff_iso(days))
+    sql += " ORDER BY bm25(chats_search, 1.0, 0.0) LIMIT ?"; params.append(limit)
+    try:
+        with mdb() as con:
+            rows = con.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        traceback.print_exc(); return []
     return [r["text"] for r in rows]
 
 # استخراج ذكريات (تفضيلات/حقائق) مبسّط
 PREF_PATTERNS = [
-    (r"\b(احب|أحب)\b\s+(.+)", "like"),
-    (r"\bافضل\b\s+(.+)", "prefer"),
-    (r"\bلا\s*احب\b\s+(.+)", "dislike"),
-    (r"\b(اسكن|أعيش|انا من)\b\s+(.+)", "location"),
-    (r"\b(وظيفتي|عملي|مجالي)\b\s+(.+)", "job"),
-    (r"\b(اسمي)\b\s+(.+)", "name"),
+    (re.compile(p, re.IGNORECASE), key) for p, key in [
+        (r"\b(احب|أحب)\b\s+(.+)", "like"),
+        (r"\bافضل\b\s+(.+)", "prefer"),
+        (r"\bلا\s*احب\b\s+(.+)", "dislike"),
+        (r"\b(اسكن|أعيش|انا من)\b\s+(.+)", "location"),
+        (r"\b(وظيفتي|عملي|مجالي)\b\s+(.+)", "job"),
+        (r"\b(اسمي)\b\s+(.+)", "name"),
+    ]
 ]
 
 def _clean_phrase(t:str)->str:
@@ -130,47 +239,142 @@ def _clean_phrase(t:str)->str:
 def mine_memories_from_text(text:str)->List[Dict]:
     out=[]
     for pat,key in PREF_PATTERNS:
-        m = re.search(pat, text, flags=re.IGNORECASE)
+        m = pat.search(text)
         if m:
             val = _clean_phrase(m.group(len(m.groups())))
             if val: out.append({"key":key,"value":val,"score":1.0})
     return out
 
-def mine_new_memories(limit_scan:int=60)->int:
-    with mdb() as con:
-        rows = con.execute("SELECT * FROM chats ORDER BY id DESC LIMIT ?",(limit_scan,)).fetchall()
-    added=0; seen=set()
-    for r in rows:
-        if r["role"]!="user": continue
-        for m in mine_memories_from_text(r["text"]):
-            sig=f"{m['key']}::{m['value']}"
-            if sig in seen: continue
-            seen.add(sig)
-            with mdb() as con:
-                ex = con.execute("SELECT 1 FROM memories WHERE key=? AND value=?",(m["key"],m["value"])).fetchone()
-                if not ex:
-                    con.execute("INSERT INTO memories(ts,key,value,score) VALUES(?,?,?,?)",
-                                (datetime.utcnow().isoformat(timespec="seconds")+"Z", m["key"], m["value"], m["score"]))
-                    added+=1
+_mine_lock = threading.Lock()
+
+def mine_new_memories(batch:int=500)->int:
+    """
+    يعالج فقط المحادثات بعد العلامة miner_last_id (في جدول meta) ثم يقدّمها.
+    فحص التكرار = الفهرس الفريد (key,value) مع INSERT OR IGNORE، بمعاملة واحدة لكل دفعة.
+    """
+    added = 0
+    with _mine_lock:
+        con = mdb()
+        r = con.execute("SELECT value FROM meta WHERE key='miner_last_id'").fetchone()
+        last = int(r["value"]) if r else 0
+        while True:
+            rows = con.execute("SELECT id,session,role,text FROM chats WHERE id>? ORDER BY id LIMIT ?",(last,batch)).fetchall()
+            if not rows: break
+            now = datetime.utcnow().isoformat(timespec="seconds")+"Z"
+            cands = [(now, r["session"], m["key"], m["value"], m["score"])
+                     for r in rows if r["role"]=="user" for m in mine_memories_from_text(r["text"])]
+            last = rows[-1]["id"]
+            with con:
+                if cands:
+                    added += con.executemany("INSERT OR IGNORE INTO memories(ts,session,key,value,score) VALUES(?,?,?,?,?)", cands).rowcount
+                con.execute("INSERT OR REPLACE INTO meta(key,value) VALUES('miner_last_id',?)",(str(last),))
+            if len(rows) < batch: break
     return added
 
-def derive_style_profile():
-    rows = recent_history(30)
-    exclam = sum(t["text"].count("!") for t in rows if t["role"]=="user")
-    emojis = sum(sum(t["text"].count(e) for e in ["😂","😍","😊","😅"]) for t in rows if t["role"]=="user")
-    tone = "مرح وودّي" if exclam+emojis>8 else ("حماسي وودّي" if exclam>2 else "هادئ وودّي")
+# أسلوب المستخدم: عدّادات جارية لآخر STYLE_WINDOW رسالة تُحدَّث عند حفظ كل رسالة،
+# والملف الشخصي مخبّأ بالذاكرة ولا يُعاد بناؤه/حفظه إلا إذا تغيّرت النبرة.
+STYLE_WINDOW = 30
+STYLE_EMOJIS = ("😂","😍","😊","😅")
+STYLE_PROMPTS = {"opener":"تمام! هذا ملخص سريع ثم الإجابة:","closer":"لو تحب أحفظ هذه المعلومة للمرة الجاية قل: احفظ."}
+
+class _StyleStats:
+    def __init__(self):
+        self.win = deque(maxlen=STYLE_WINDOW)   # (علامات تعجب, إيموجي) لكل رسالة
+        self.exclam = 0; self.emojis = 0
+
+    def push(self, role:str, text:str):
+        ex, em = (text.count("!"), sum(text.count(e) for e in STYLE_EMOJIS)) if role=="user" else (0, 0)
+        if len(self.win) == self.win.maxlen:
+            oe, om = self.win[0]; self.exclam -= oe; self.emojis -= om
+        self.win.append((ex, em)); self.exclam += ex; self.emojis += em
+
+    def tone(self)->str:
+        return "مرح وودّي" if self.exclam+self.emojis>8 else ("حماسي وودّي" if self.exclam>2 else "هادئ وودّي")
+
+STYLE_MAX_SESSIONS = 2000   # ملفات الأسلوب المخبّأة بالذاكرة (الأقدم استخدامًا يُستبعد)
+
+_style_lock = threading.Lock()
+_style_stats: Dict[str, _StyleStats] = {}
+_style_cache: "OrderedDict[str, Dict]" = OrderedDict()   # ترتيب آخر استخدام (LRU)
+
+def _make_profile(tone:str)->Dict:
     persona = "مساعد عربي يشبه البشر، يرد بإيجاز ووضوح وبنبرة " + tone
-    prompts = {"opener":"تمام! هذا ملخص سريع ثم الإجابة:","closer":"لو تحب أحفظ هذه المعلومة للمرة الجاية قل: احفظ."}
-    with mdb() as con:
-        con.execute("INSERT OR REPLACE INTO style_profile(id,persona,tone,prompts) VALUES(1,?,?,?)",
-                    (persona,tone,json.dumps(prompts,ensure_ascii=False)))
-    return {"persona":persona,"tone":tone,"prompts":prompts}
+    return {"persona":persona,"tone":tone,"prompts":dict(STYLE_PROMPTS)}
 
-def get_style_profile()->Dict:
+def _save_profile(session:str, prof:Dict):
     with mdb() as con:
-        r = con.execute("SELECT persona,tone,prompts FROM style_profile WHERE id=1").fetchone()
-    if not r: return derive_style_profile()
-    return {"persona":r["persona"],"tone":r["tone"],"prompts":json.loads(r["prompts"] or "{}")}
+        con.execute("INSERT OR REPLACE INTO style_profiles(session,persona,tone,prompts) VALUES(?,?,?,?)",
+                    (session,prof["persona"],prof["tone"],json.dumps(prof["prompts"],ensure_ascii=False)))
+
+def _seed_style(session:str="")->_StyleStats:
+    st = _StyleStats()
+    for t in recent_history(STYLE_WINDOW, session): st.push(t["role"], t["text"])
+    return st
+
+def _style_put(session:str, st:_StyleStats, prof:Dict)->Dict:
+    # يُستدعى تحت _style_lock
+    _style_stats[session] = st; _style_cache[session] = prof
+    _style_cache.move_to_end(session)
+    while len(_style_cache) > STYLE_MAX_SESSIONS:
+        old, _ = _style_cache.popitem(last=False); _style_stats.pop(old, None)
+    return prof
+
+def _style_push(role:str, text:str, session:str=""):
+    """يُستدعى مع كل رسالة تُحفظ: تحديث O(1) للعدّادات، وحفظ الملف فقط عند تغيّر النبرة."""
+    with _style_lock:
+        st = _style_stats.get(session)
+        if st is None: return  # لم يُطلب الملف بعد؛ سيُبنى من السجل عند أول طلب
+        st.push(role, text)
+        tone = st.tone()
+        _style_cache.move_to_end(session)
+        if _style_cache[session].get("tone") == tone: return
+        prof = _style_cache[session] = _make_profile(tone)
+    _save_profile(session, prof)
+
+def derive_style_profile(session:str=""):
+    """
+    بناء كامل من آخر STYLE_WINDOW رسالة *مكتوبة فعلًا* للجلسة. لا ينتظر chat_sink: أول طلب
+    لجلسة جديدة على المسار الساخن (خطوة style)، والرسائل المعلّقة تصل عبر _style_push.
+    /api/learn/rebuild-style يفرّغ chat_sink قبل الاستدعاء.
+    """
+    st = _seed_style(session)
+    prof = _make_profile(st.tone())
+    with _style_lock:
+        _style_put(session, st, prof)
+    _save_profile(session, prof)
+    return prof
+
+def get_style_profile(session:str="")->Dict:
+    with _style_lock:
+        prof = _style_cache.get(session)
+        if prof is not None:
+            _style_cache.move_to_end(session)   # إصابة = استخدام حديث
+            return prof
+    with mdb() as con:
+        r = con.execute("SELECT persona,tone,prompts FROM style_profiles WHERE session=?", (session,)).fetchone()
+    if not r: return derive_style_profile(session)
+    st = _seed_style(session)
+    with _style_lock:
+        prof = _style_cache.get(session)
+        if prof is not None:
+            _style_cache.move_to_end(session); return prof
+        return _style_put(session, st, {"persona":r["persona"],"tone":r["tone"],"prompts":json.loads(r["prompts"] or "{}")})
+
+# ---------- هوية الجلسة ----------
+SESSION_COOKIE = "bb_sid"
+_SID_RE = re.compile(r"[A-Za-z0-9_-]{8,64}")
+
+def session_of(request:Request, data:Optional[Dict]=None)->Optional[str]:
+    """device_id في الطلب (تطبيقات) أو كوكي bb_sid؛ None إن لم توجد هوية صالحة."""
+    for sid in ((data or {}).get("device_id"), request.cookies.get(SESSION_COOKIE)):
+        if isinstance(sid, str) and _SID_RE.fullmatch(sid):
+            return sid
+    return None
+
+def with_session_cookie(resp, request:Request, sid:str):
+    if request.cookies.get(SESSION_COOKIE) != sid:
+        resp.set_cookie(SESSION_COOKIE, sid, max_age=365*24*3600, httponly=True, samesite="lax")
+    return resp
 
 def simple_emotion(t:str)->str:
     t=(t or "").strip()
@@ -203,31 +407,16 @@ def search_duckduckgo(q:str,num:int=6)->List[Dict]:
             if len(out)>=num: break
     return out
 
-def _clean(txt:str)->str:
-    txt=(txt or "").strip()
-    return re.sub(r"[^\w\s\u0600-\u06FF]"," ", txt)
-
-def make_bullets(snips:List[str], max_items:int=8)->List[str]:
-    text=" ".join(_clean(s) for s in snips if s).strip()
-    parts=re.split(r"[.!؟\n]", text); cleaned=[]; seen=set()
-    for p in parts:
-        p=re.sub(r"\s+"," ",p).strip(" -•،,")
-        if len(p.split())>=4:
-            key=p[:80]
-            if key not in seen:
-                seen.add(key); cleaned.append(p)
-        if len(cleaned)>=max_items: break
-    return cleaned
-
 async def smart_search(q:str,num:int=6)->Dict:
     try:
         if SERPER_API_KEY:
             try:
                 res=await search_google_serper(q,num); used="Google"
             except Exception:
-                res=search_duckduckgo(q,num); used="DuckDuckGo"
+                res=await asyncio.to_thread(search_duckduckgo,q,num); used="DuckDuckGo"
         else:
-            res=search_duckduckgo(q,num); used="DuckDuckGo"
+            # DDGS متزامن: في خيط حتى لا يحجب حلقة الأحداث
+            res=await asyncio.to_thread(search_duckduckgo,q,num); used="DuckDuckGo"
         return {"ok":True,"used":used,"results":res,"bullets":make_bullets([r.get("snippet") for r in res],8)}
     except Exception as e:
         return {"ok":False,"used":None,"results":[],"error":str(e)}
@@ -239,70 +428,94 @@ HUMAN_SYSTEM_PROMPT = (
     "لا تكشف التفكير الداخلي. إن لم تكن واثقًا قل لا أعلم."
 )
 
-async def agent_reply(user_text:str)->str:
-    """
-    1) حفظ السؤال في الذاكرة
-    2) تقرير: هل نبحث أم نجيب مباشرة
-    3) صياغة رد “بشري”، مع الاستفادة من الذاكرة + أسلوب المستخدم
-    """
-    remember_chat("user", user_text)
-    style = get_style_profile()
-    mem_hits = search_memories_like(user_text, limit=5)
-
-    # قرار بسيط: هل نحتاج بحث؟
-    need_search = any(k in user_text for k in ["ما هو","من هو","كيف","متى","أخبار","خبر","سعر","نتيجة","معنى","تعريف"])
-    tool_data = None
-    if need_search:
-        s = await smart_search(user_text, num=6)
-        tool_data = s
-        # لعرض المصادر داخل الرد
+SEARCH_KEYWORDS = ["ما هو","من هو","كيف","متى","أخبار","خبر","سعر","نتيجة","معنى","تعريف"]
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "12"))
+GENERATE_TIMEOUT = float(os.getenv("GENERATE_TIMEOUT", "60"))
+
+async def _step_search(ctx:Dict, res:Dict)->Dict:
+    return await smart_search(ctx["q"], num=6)
+
+async def _step_remember(ctx:Dict, res:Dict):
+    await asyncio.to_thread(remember_chat, "user", ctx["q"], ctx["session"])
+
+async def _step_style(ctx:Dict, res:Dict)->Dict:
+    return await asyncio.to_thread(get_style_profile, ctx["session"])
 
+async def _step_memory(ctx:Dict, res:Dict)->List[str]:
+    return await asyncio.to_thread(search_memories_like, ctx["q"], 5, "user", None, ctx["session"])
+
+async def _step_facts(ctx:Dict, res:Dict)->List[Dict]:
+    return await asyncio.to_thread(session_memories, ctx["session"], 8)
+
+async def _step_learn(ctx:Dict, res:Dict):
+    await asyncio.to_thread(remember_chat, "assistant", res["generate"], ctx["session"])
+
+async def _step_generate(ctx:Dict, res:Dict)->str:
+    user_text, style, mem_hits, facts = ctx["q"], res["style"] or {}, res["memory"], res["facts"]
+    tool_data = res["web_search"]
     # لو معك مفتاح LLM — استعمله للرد بصياغة بشرية
     if client:
         user_msg = (
             f"سؤال المستخدم:\n{user_text}\n\n"
             f"سياق شخصي (قد يفيد):\n- " + "\n- ".join(mem_hits) + "\n\n"
         )
+        if facts:
+            user_msg += "معلومات عن المستخدم:\n- " + "\n- ".join(f"{f['key']}: {f['value']}" for f in facts) + "\n\n"
         if tool_data and tool_data.get("ok"):
             sources = "\n".join([f"- {r['title']}: {r['link']}" for r in tool_data["results"][:5]])
             user_msg += f"ملخص بحث مختصر (للاستئناس):\n" + " • ".join(tool_data.get("bullets",[])[:4]) + "\n"
             user_msg += f"مصادر:\n{sources}\n\n"
-        try:
-            resp = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role":"system","content": HUMAN_SYSTEM_PROMPT + " نبرة: " + (style.get("tone") or "ودّي")},
-                    {"role":"user","content": user_msg},
-                    {"role":"user","content":"اكتب الرد النهائي فقط، نقاط قصيرة إن لزم، واذكر أهم مصدرين إذا كان هناك بحث."}
-                ],
-                temperature=0.4,
-                max_tokens=600
-            )
-            answer = (resp.choices[0].message.content or "").strip()
-        except Exception as e:
-            answer = f"تعذر استخدام النموذج حالياً ({e}). هذا ملخّص سريع: " + " • ".join((tool_data or {}).get("bullets",[])[:4])
-    else:
-        # وضع احتياطي محلي
-        emo = simple_emotion(user_text)
-        if tool_data and tool_data.get("ok"):
-            bullets = tool_data.get("bullets",[])
-            srcs = tool_data.get("results",[])
-            top = " • ".join(bullets[:4]) if bullets else "بحثت ووجدت لك نقاطًا مفيدة."
-            links = "\n".join([f"- {r['title']}: {r['link']}" for r in srcs[:3]])
-            answer = f"{emo} ملخص سريع: {top}\nمصادر:\n{links}" if links else f"{emo} {top}"
-        else:
-            answer = f"{emo} تمام! أحكي لي أكثر عن سؤالك أو أعطني مثالًا أدق علشان أفيدك سريعًا."
-
-    remember_chat("assistant", answer)
-    # تعلّم يومي بسيط
-    try:
-        added = mine_new_memories(limit_scan=40)
-        if len(recent_history(1)) % 10 == 0:
-            derive_style_profile()
-    except Exception:
-        pass
-
-    return answer
+        resp = await asyncio.to_thread(client.chat.completions.create,
+            model=LLM_MODEL,
+            messages=[
+                {"role":"system","content": HUMAN_SYSTEM_PROMPT + " نبرة: " + (style.get("tone") or "ودّي")},
+                {"role":"user","content": user_msg},
+                {"role":"user","content":"اكتب الرد النهائي فقط، نقاط قصيرة إن لزم، واذكر أهم مصدرين إذا كان هناك بحث."}
+            ],
+            temperature=0.4,
+            max_tokens=600
+        )
+        return (resp.choices[0].message.content or "").strip()
+    return _local_answer(user_text, tool_data)
+
+def _local_answer(user_text:str, tool_data:Optional[Dict])->str:
+    # وضع احتياطي محلي
+    emo = simple_emotion(user_text)
+    if tool_data and tool_data.get("ok"):
+        bullets = tool_data.get("bullets",[])
+        srcs = tool_data.get("results",[])
+        top = " • ".join(bullets[:4]) if bullets else "بحثت ووجدت لك نقاطًا مفيدة."
+        links = "\n".join([f"- {r['title']}: {r['link']}" for r in srcs[:3]])
+        return f"{emo} ملخص سريع: {top}\nمصادر:\n{links}" if links else f"{emo} {top}"
+    return f"{emo} تمام! أحكي لي أكثر عن سؤالك أو أعطني مثالًا أدق علشان أفيدك سريعًا."
+
+def _generate_fallback(ctx:Dict, res:Dict, exc:Optional[BaseException])->str:
+    if client:
+        return f"تعذر استخدام النموذج حالياً ({exc}). هذا ملخّص سريع: " + " • ".join((res.get("web_search") or {}).get("bullets",[])[:4])
+    return _local_answer(ctx["q"], res.get("web_search"))
+
+# البحث يبدأ فورًا؛ بالتوازي معه حفظ السؤال + الأسلوب + الذاكرة (SQLite في خيوط to_thread)؛
+# التعلّم بعد الرد (حفظ رد المساعد → استخراج الذكريات في chat_sink + عدّادات الأسلوب) خطوة خلفية.
+AGENT_PIPELINE = Pipeline([
+    Step("web_search", _step_search, timeout=SEARCH_TIMEOUT, fallback=None,
+         when=lambda ctx, res: any(k in ctx["q"] for k in SEARCH_KEYWORDS)),
+    Step("remember", _step_remember),
+    Step("style", _step_style, fallback={}),
+    Step("memory", _step_memory, fallback=[]),
+    Step("facts", _step_facts, fallback=[]),
+    Step("generate", _step_generate, ("web_search", "style", "memory", "facts"),
+         timeout=GENERATE_TIMEOUT, fallback=_generate_fallback),
+    Step("learn", _step_learn, ("generate",), background=True),
+])
+
+async def agent_reply(user_text:str, session:str="")->str:
+    """
+    يشغّل AGENT_PIPELINE: بحث (عند الحاجة) + ذاكرة + أسلوب بالتوازي،
+    ثم صياغة رد “بشري”، ثم التعلّم في الخلفية.
+    """
+    ctx = {"q": user_text, "session": session}
+    run = await AGENT_PIPELINE.run(ctx)
+    return run["generate"]
 
 # ===================== واجهات API + صفحة المحادثة =====================
 @app.get("/", response_class=HTMLResponse)
@@ -315,20 +528,23 @@ async def api_ask(request: Request):
     data = await request.json()
     q = (data.get("q") or "").strip()
     if not q: return JSONResponse({"ok":False,"error":"no_query"}, status_code=400)
-    ans = await agent_reply(q)
+    sid = session_of(request, data) or uuid.uuid4().hex
+    ans = await agent_reply(q, sid)
     ip = request.client.host if request.client else "?"
     ua = request.headers.get("user-agent","?")
     log_event("ask", ip, ua, query=q, engine=f"Agent:{LLM_MODEL if client else 'heuristic'}")
-    return {"ok":True,"answer":ans,"bullets":make_bullets([ans],6)}
+    return with_session_cookie(JSONResponse({"ok":True,"answer":ans,"bullets":make_bullets([ans],6)}), request, sid)
 
 @app.post("/api/learn/mine")
 def api_learn_mine():
-    n = mine_new_memories(limit_scan=100)
+    chat_sink.flush()
+    n = mine_new_memories()
     return {"ok":True,"added":n}
 
 @app.post("/api/learn/rebuild-style")
-def api_learn_style():
-    prof = derive_style_profile()
+def api_learn_style(request: Request):
+    chat_sink.flush()
+    prof = derive_style_profile(session_of(request) or "")
     return {"ok":True,"profile":prof}
 
 # ---------- PWA: manifest + service worker ----------
@@ -432,6 +648,32 @@ self.addEventListener("activate", e=>self.clients.claim());
 self.addEventListener("fetch", ()=>{});
 """
 
+# ===================== أرشفة يومية (سجلات + محادثات قديمة) =====================
+def _drop_chats_fts(con:sqlite3.Connection, rows:List[sqlite3.Row]):
+    con.executemany("DELETE FROM chats_search WHERE rowid = ?", [(r["id"],) for r in rows])
+
+def job_retention():
+    try:
+        archive_table(DB_PATH, "logs", older_than_days=LOG_RETENTION_DAYS)
+        archive_table(MEM_DB, "chats", older_than_days=CHAT_RETENTION_DAYS, on_delete=_drop_chats_fts)
+    except Exception:
+        traceback.print_exc()
+
+@app.on_event("startup")
+def _on_startup():
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler
+        sch = BackgroundScheduler()
+        sch.add_job(job_retention, "cron", hour=4, minute=15)
+        sch.start()
+    except Exception:
+        traceback.print_exc()
+
+@app.on_event("shutdown")
+def _on_shutdown():
+    close_log_sinks()
+    close_db_pool()
+
 # ============ نقطة صحّة ============
 @app.get("/healthz")
 def health(): return {"ok":True}
@@ -14,22 +14,32 @@ def learn_from_interaction(query: str, sources: List[Dict], answer: str, extra_f
     """
     a = analyze_query(query)
     tags = ["user", a["intent"], a["lang"]] + a.get("key_phrases", [])
-    saved_ids = []
+    batch = []
 
     # حفظ مقتطفات من المصادر
     for s in sources or []:
         snippet = (s.get("snippet") or s.get("content") or s.get("title") or "")[:300]
         if snippet.strip():
-            saved_ids.append(mm.add_fact(snippet, source=s.get("url",""), tags=tags))
+            batch.append({"content": snippet, "source": s.get("url",""), "tags": tags})
 
     # حفظ ملخص من الإجابة نفسها
     if answer:
         brief = (answer[:400] + ("…" if len(answer)>400 else ""))
-        saved_ids.append(mm.add_fact(brief, source="model", tags=tags))
+        batch.append({"content": brief, "source": "model", "tags": tags})
 
     # حقن حقائق إضافية (إن وُجدت)
     for f in (extra_facts or []):
         if f.strip():
-            saved_ids.append(mm.add_fact(f, source="extra", tags=tags))
+            batch.append({"content": f, "source": "extra", "tags": tags})
 
+    # كتابة واحدة تحت القفل بدل كتابة لكل حقيقة
+    saved_ids = mm.add_facts(batch) if batch else []
     return {"saved": saved_ids, "tags": tags}
+
+def recall(query: str, limit: int = 3) -> List[Dict]:
+    """
+    حقائق محفوظة بنفس نية ولغة السؤال: فهرس الوسوم يحدد المرشحين ثم تُرتَّب بكلمات السؤال
+    (بلا مرور على كل الذاكرة). لا تطابق → [].
+    """
+    a = analyze_query(query)
+    return mm.query(query, tags=[a["intent"], a["lang"]], limit=limit)
@@ -1,47 +1,184 @@
 # brain/memory_manager.py
 from __future__ import annotations
-import json, os, time
-from typing import List, Dict
+import json, os, time, tempfile, threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Iterable
+
+try:
+    import fcntl  # قفل ملفات بين العمليات (Linux/macOS)
+except ImportError:  # Windows: بدون قفل بين العمليات
+    fcntl = None
 
 DEFAULT_PATH = "data/memory.json"
 
 class MemoryManager:
+    """
+    مخزن الذاكرة (JSON) آمن بين العمليات:
+    - الكتابة تحت قفل ملف (memory.json.lock) ثم استبدال ذري عبر os.replace.
+    - القراءة من نسخة داخل العملية، تُحدَّث فقط إذا تغيّر الملف (inode/mtime/size).
+    - النسخة والفهارس تحت قفل خيوط واحد (_mutex) يأخذه التحديث والإضافة والبحث.
+    - الحقائق تُضاف فقط، فالتحديث يفهرس الجديد دون إعادة بناء كاملة.
+    - فهرس ثانوي للوسوم: وسم → مواضع الحقائق (بترتيب الإضافة).
+    """
     def __init__(self, path: str = DEFAULT_PATH):
         self.path = path
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock_path = path + ".lock"
+        self._data: Dict = {"facts": [], "version": 0}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._contents: set = set()
+        self._ids: set = set()
+        self._tags: Dict[str, List[int]] = {}
+        self._mutex = threading.RLock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         if not os.path.exists(path):
-            with open(path, "w", encoding="utf-8") as f: json.dump({"facts": []}, f, ensure_ascii=False)
+            with self._locked():
+                if not os.path.exists(path): self._write({"facts": [], "version": 0})
+
+    # ---------- قفل + كتابة ذرية ----------
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lf:
+            if fcntl: fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl: fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, data: Dict) -> None:
+        fd, tmp = tempfile.mkstemp(prefix=".memory-", suffix=".json", dir=os.path.dirname(self.path) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp): os.unlink(tmp)
+            raise
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    # ---------- نسخة داخل العملية ----------
+    def refresh(self) -> bool:
+        """يعيد تحميل الملف فقط إن تغيّر منذ آخر قراءة. يرجع True إذا تغيّر.
+        ملف محذوف → مخزن فارغ (الكتابة التالية تعيد إنشاءه)."""
+        with self._mutex:
+            stamp = self._stat()
+            if stamp == self._stamp: return False
+            try:
+                if stamp is None: raise FileNotFoundError(self.path)
+                with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+            except FileNotFoundError:
+                self._data, self._stamp = {"facts": [], "version": 0}, None
+                self._reindex()
+                return True
+            data.setdefault("facts", []); data.setdefault("version", 0)
+            old, new = self._data["facts"], data["facts"]
+            appended = len(new) >= len(old) and (not old or new[len(old)-1].get("id") == old[-1].get("id"))
+            self._data, self._stamp = data, stamp
+            if appended:
+                self._index_add(new[len(old):], start=len(old))
+            else:
+                self._reindex()
+            return True
+
+    def _reindex(self) -> None:
+        self._contents, self._ids, self._tags = set(), set(), {}
+        self._index_add(self._data["facts"], start=0)
+
+    def _index_add(self, facts: List[Dict], start: int) -> None:
+        for i, f in enumerate(facts, start):
+            self._contents.add(f["content"]); self._ids.add(f["id"])
+            for t in {str(t).lower() for t in f.get("tags") or []}:
+                self._tags.setdefault(t, []).append(i)
 
     def _load(self) -> Dict:
-        with open(self.path, "r", encoding="utf-8") as f: return json.load(f)
+        self.refresh()
+        return self._data
 
-    def _save(self, data: Dict) -> None:
-        with open(self.path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+    @property
+    def version(self) -> int:
+        return self._load().get("version", 0)
+
+    # ---------- إضافة ----------
+    def add_facts(self, items: List[Dict]) -> List[str]:
+        """يضيف عدة حقائق ({content, source, tags}) بكتابة واحدة تحت القفل."""
+        ids, added = [], []
+        with self._mutex, self._locked():
+            self.refresh()
+            data = self._data
+            taken = set()
+            for it in items:
+                content = (it.get("content") or "").strip()
+                fid = f"m{int(time.time()*1000)}"
+                while fid in taken or fid in self._ids: fid = f"m{int(fid[1:]) + 1}"
+                taken.add(fid); ids.append(fid)
+                # منع التكرار البسيط
+                if not content or content in self._contents or any(a["content"] == content for a in added):
+                    continue
+                added.append({"id": fid, "content": content, "source": it.get("source", ""),
+                              "tags": it.get("tags") or [], "ts": int(time.time())})
+            if added:
+                start = len(data["facts"])
+                data["facts"].extend(added)
+                data["version"] = data.get("version", 0) + 1
+                self._write(data)
+                self._stamp = self._stat()
+                self._index_add(added, start=start)
+        return ids
 
     def add_fact(self, content: str, source: str = "", tags: List[str] = None) -> str:
-        data = self._load()
-        fact = {
-            "id": f"m{int(time.time()*1000)}",
-            "content": content.strip(),
-            "source": source,
-            "tags": tags or [],
-            "ts": int(time.time())
-        }
-        # منع التكرار البسيط
-        if not any(f["content"] == fact["content"] for f in data["facts"]):
-            data["facts"].append(fact); self._save(data)
-        return fact["id"]
+        return self.add_facts([{"content": content, "source": source, "tags": tags}])[0]
 
-    def search(self, query: str, limit: int = 5) -> List[Dict]:
-        q = query.lower().strip()
-        data = self._load()
+    # ---------- بحث ----------
+    def _positions(self, tags: Iterable[str]) -> Optional[List[int]]:
+        """تقاطع قوائم الوسوم (الأقصر أولًا). None = بدون تصفية."""
+        wanted = {str(t).lower() for t in tags or [] if str(t).strip()}
+        if not wanted: return None
+        lists = sorted((self._tags.get(t, []) for t in wanted), key=len)
+        if not lists[0]: return []
+        keep = set(lists[0])
+        for pl in lists[1:]:
+            keep.intersection_update(pl)
+            if not keep: return []
+        return sorted(keep)
+
+    def query(self, text: str = "", tags: Iterable[str] = (), limit: int = 5, recent: bool = False) -> List[Dict]:
+        """تصفية بالوسوم أولًا (مثل ["qa","ar"]) ثم ترتيب بالنص على المرشحين فقط.
+        نص فارغ → [] (كما في search)، إلا مع recent=True فيرجع أحدث المرشحين."""
+        with self._mutex:
+            facts = self._load()["facts"]
+            pos = self._positions(tags)
+            cand = list(facts) if pos is None else [facts[i] for i in pos]   # لقطة: الترتيب خارج القفل
+        words = text.lower().split()
+        if not words:
+            return sorted(cand, key=lambda f: -f["ts"])[:limit] if recent else []
         scored = []
-        for f in data["facts"]:
-            text = (f["content"]+" "+" ".join(f["tags"])).lower()
-            score = sum(w in text for w in q.split())
+        for f in cand:
+            blob = (f["content"]+" "+" ".join(f["tags"])).lower()
+            score = sum(w in blob for w in words)
             if score>0: scored.append((score, f))
         scored.sort(key=lambda x: (-x[0], -x[1]["ts"]))
         return [f for _,f in scored[:limit]]
 
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        return self.query(query.strip(), limit=limit)
+
+    def by_tag(self, *tags: str, limit: int = 50) -> List[Dict]:
+        """أحدث الحقائق التي تحمل كل الوسوم المعطاة."""
+        with self._mutex:
+            facts = self._load()["facts"]
+            pos = self._positions(tags) or []
+            return [facts[i] for i in reversed(pos[-limit:])]
+
+    def tag_counts(self, top: int = 50) -> List[Tuple[str, int]]:
+        with self._mutex:
+            self._load()
+            return sorted(((t, len(p)) for t, p in self._tags.items()), key=lambda x: -x[1])[:top]
+
     def all(self) -> List[Dict]:
         return self._load()["facts"]
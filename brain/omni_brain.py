@@ -1,31 +1,30 @@
 # brain/omni_brain.py — نواة توليد إجابة عربية بدون LLM مدفوع
 from __future__ import annotations
-import re, html, hashlib
+import hashlib, html, math, os, re, threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Tuple, Optional
 from urllib.parse import urlparse
 
-# ==== فلتر محتوى حساس ====
-HARAM_WORDS = {"اباحي","اباحية","جنس","جنسية","سكس","لواط","سحاق","مثير","فحص العذرية",
-               "porn","sex","xxx","nsfw","nude","naked","onlyfans","camgirl","strip"}
-SENSITIVE_PERSONAL = [r"(اسم|رقم|عنوان).{0,6}(زوج(ة|ته)?|والد(ة)?|أم|اب|اخ|اخت|بنت|ولد)"]
-def _is_haram(q: str) -> bool:
-    qn = re.sub(r"\s+", "", (q or "").lower());  return any(w.replace(" ","") in qn for w in HARAM_WORDS)
-def _is_sensitive(q: str) -> bool: return any(re.search(p, (q or "").lower()) for p in SENSITIVE_PERSONAL)
+try:
+    import numpy as np
+except ImportError:  # بدون NumPy: حساب بالقواميس (textrank يتحوّل إلى tfidf)
+    np = None
 
-# ==== أدوات نصية ====
-_AR_DIAC = r"ًٌٍَُِّْ"
-def _norm_ar(s: str) -> str:
-    s = (s or "").strip()
-    s = re.sub(f"[{_AR_DIAC}]", "", s)
-    return s.replace("أ","ا").replace("إ","ا").replace("آ","ا").replace("ى","ي").replace("ة","ه")
+from core.arabic import normalize
+from core.content_filter import content_filter
+from core.metrics import metrics
+from core.segment import segment, tokens as _tokens
+
+# ==== فلتر محتوى حساس (core.content_filter: القائمة "explicit" + أنماط "sensitive_personal") ====
+def _is_haram(q: str) -> bool: return content_filter.check(q, ("explicit",)) is not None
+def _is_sensitive(q: str) -> bool: return content_filter.check(q, ("sensitive_personal",)) is not None
 
+# ==== أدوات نصية ====
 def _clean(s: str) -> str:
     s = html.unescape(s or "");  return re.sub(r"\s+", " ", s).strip()
 
 def _sentences(text: str) -> List[str]:
-    if not text: return []
-    parts = re.split(r"(?<=[\.\!\؟\?])\s+|[\n\r]+", text)
-    return [p.strip() for p in parts if len(p.split()) >= 4]
+    return list(segment(text).sents)   # core.segment: مقطّعة مرة واحدة لكل نص
 
 def _hostname(url: str) -> str:
     try: return urlparse(url).netloc or ""
@@ -33,7 +32,7 @@ def _hostname(url: str) -> str:
 
 # ==== نية السؤال ====
 def _intent(q: str) -> str:
-    qn = _norm_ar(q.lower())
+    qn = normalize(q)
     if re.search(r"\b(من هو|من هي|من)\b", qn): return "person"
     if re.search(r"\b(كيف|خطوات|طريقة|شرح)\b", qn): return "howto"
     if re.search(r"\b(تعريف|ما هو|ماهي)\b", qn): return "definition"
@@ -42,53 +41,202 @@ def _intent(q: str) -> str:
     return "general"
 
 # ==== ترتيب/تلخيص ====
-def _score_sentence(sent: str, q: str, title_hint: Optional[str]=None, source_hint: Optional[str]=None) -> float:
-    q_tokens = [w for w in re.split(r"[\W_]+", _norm_ar(q).lower()) if len(w)>1]
-    s_tokens = [w for w in re.split(r"[\W_]+", _norm_ar(sent).lower()) if len(w)>1]
-    if not s_tokens: return 0.0
-    overlap = sum(1 for w in q_tokens if w in s_tokens)
-    length_penalty = 1.0 if 6 <= len(s_tokens) <= 40 else 0.6
-    title_boost = 0.0
-    if title_hint:
-        t_tokens = [w for w in re.split(r"[\W_]+", _norm_ar(title_hint).lower()) if len(w)>1]
-        title_boost = 0.3 * sum(1 for w in q_tokens if w in t_tokens)
-    source_boost = 0.5 if any(t in _hostname(source_hint or "") for t in {"wikipedia.org","who.int","un.org","bbc.com","nature.com","arxiv.org"}) else 0.0
-    return (overlap * length_penalty) + title_boost + source_boost
-
-def _fingerprint(s: str) -> str:
-    return hashlib.sha1(_norm_ar(re.sub(r"\W+","",s.lower()))[:256].encode()).hexdigest()[:16]
-
-def _dedup(scored: List[Tuple[float,str]], max_sents: int) -> List[str]:
+# كل النصوص تُقطَّع وتُطبَّع مرة واحدة وتتحوّل كلماتها لأرقام (vocab)، ثم تُحسب درجات
+# كل الجمل دفعة واحدة (مصفوفة متناثرة بصيغة rows/cols + np.bincount).
+# الأوضاع: overlap (عدد كلمات السؤال في الجملة — السلوك الأصلي) | tfidf | textrank
+SCORING_MODE = os.getenv("OMNI_SCORING", "overlap")
+_TRUSTED_HOSTS = ("wikipedia.org","who.int","un.org","bbc.com","nature.com","arxiv.org")
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERS = 30
+
+def _source_boost(link: str) -> float:
+    host = _hostname(link or "")
+    return 0.5 if any(t in host for t in _TRUSTED_HOSTS) else 0.0
+
+def score_sentences(sents: List[str], q: str, doc_of: List[int], titles: List[str], links: List[str],
+                    mode: str = SCORING_MODE, sent_tokens: Optional[List[Tuple[str, ...]]] = None) -> List[float]:
+    """
+    درجة كل جملة = صلة بالسؤال × عقوبة الطول + تعزيز العنوان + تعزيز المصدر.
+    doc_of[i] = رقم المقتطف الذي جاءت منه الجملة i (للعنوان والرابط).
+    sent_tokens: كلمات الجمل إن كانت مجزّأة مسبقًا (core.segment)، وإلا تُجزّأ هنا.
+    """
+    q_tokens = _tokens(q)
+    vocab: Dict[str, int] = {}
+    q_count: Dict[int, int] = {}
+    for w in q_tokens:
+        t = vocab.setdefault(w, len(vocab)); q_count[t] = q_count.get(t, 0) + 1
+    if sent_tokens is None: sent_tokens = [_tokens(x) for x in sents]
+    sent_ids = [[vocab.setdefault(w, len(vocab)) for w in toks] for toks in sent_tokens]
+    # تعزيز العنوان/المصدر: مرة لكل مقتطف وليس لكل جملة
+    doc_boost = []
+    for d, title in enumerate(titles):
+        t_set = set(_tokens(title)) if title else ()
+        doc_boost.append(0.3 * sum(1 for w in q_tokens if w in t_set) + _source_boost(links[d] if d < len(links) else ""))
+    boost = [doc_boost[d] if d < len(doc_boost) else 0.0 for d in doc_of]
+    if mode == "textrank" and np is None: mode = "tfidf"
+    if np is not None and sents:
+        rel, lens = _relevance_np(sent_ids, q_count, len(vocab), mode)
+    else:
+        rel, lens = _relevance_py(sent_ids, q_count, mode)
+    return [0.0 if not lens[i] else rel[i] * (1.0 if 6 <= lens[i] <= 40 else 0.6) + boost[i]
+            for i in range(len(sents))]
+
+def _relevance_np(sent_ids: List[List[int]], q_count: Dict[int, int], V: int, mode: str):
+    n = len(sent_ids)
+    lens = np.fromiter((len(x) for x in sent_ids), dtype=np.int64, count=n)
+    rows = np.repeat(np.arange(n), lens)
+    cols = np.fromiter((t for x in sent_ids for t in x), dtype=np.int64, count=int(lens.sum()))
+    qv = np.zeros(V)
+    for t, c in q_count.items(): qv[t] = c
+    # أزواج (جملة، كلمة) فريدة + تكرار الكلمة في الجملة
+    keys, tf = np.unique(rows * V + cols, return_counts=True)
+    ur, uc = keys // V, keys % V
+    if mode == "overlap" or not q_count:
+        return np.bincount(ur, weights=qv[uc], minlength=n), lens
+    df = np.bincount(uc, minlength=V)
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    w = tf * idf[uc]
+    norm = np.sqrt(np.bincount(ur, weights=w * w, minlength=n))
+    qw = qv * idf; qn = float(np.sqrt((qw * qw).sum()))
+    dot = np.bincount(ur, weights=w * qw[uc], minlength=n)
+    cos = np.divide(dot, norm * qn, out=np.zeros(n), where=(norm > 0) & (qn > 0))
+    scale = float(len(q_count))   # نفس سلّم overlap (عدد كلمات السؤال)
+    if mode != "textrank":
+        return cos * scale, lens
+    # TextRank موجَّه بالسؤال: تشابه الجمل (جيب تمام TF-IDF) + قفز نحو الجمل الأقرب للسؤال
+    X = np.zeros((n, V))
+    X[ur, uc] = np.divide(w, norm[ur], out=np.zeros_like(w), where=norm[ur] > 0)
+    sim = X @ X.T
+    np.fill_diagonal(sim, 0.0)
+    out_w = sim.sum(axis=1)
+    P = np.divide(sim, out_w[:, None], out=np.zeros_like(sim), where=out_w[:, None] > 0)
+    pers = cos / cos.sum() if cos.sum() > 0 else np.full(n, 1.0 / n)
+    pr = np.full(n, 1.0 / n)
+    dangling = out_w == 0
+    for _ in range(TEXTRANK_ITERS):
+        pr = (1 - TEXTRANK_DAMPING) * pers + TEXTRANK_DAMPING * (P.T @ pr + pr[dangling].sum() * pers)
+    return pr / pr.max() * scale if pr.max() > 0 else pr, lens
+
+def _relevance_py(sent_ids: List[List[int]], q_count: Dict[int, int], mode: str):
+    # بدون NumPy: نفس الحساب بمجموعات/قواميس (textrank → tfidf)
+    lens = [len(x) for x in sent_ids]
+    sets = [set(x) for x in sent_ids]
+    if mode == "overlap" or not q_count:
+        return [sum(c for t, c in q_count.items() if t in st) for st in sets], lens
+    n = len(sent_ids); df: Dict[int, int] = {}
+    for st in sets:
+        for t in st: df[t] = df.get(t, 0) + 1
+    idf = {t: math.log((1.0 + n) / (1.0 + d)) + 1.0 for t, d in df.items()}
+    qw = {t: c * idf.get(t, math.log(1.0 + n) + 1.0) for t, c in q_count.items()}
+    qn = math.sqrt(sum(v * v for v in qw.values()))
+    rel = []
+    for x in sent_ids:
+        tf: Dict[int, int] = {}
+        for t in x: tf[t] = tf.get(t, 0) + 1
+        norm = math.sqrt(sum((c * idf[t]) ** 2 for t, c in tf.items()))
+        dot = sum(c * idf[t] * qw[t] for t, c in tf.items() if t in qw)
+        rel.append(dot / (norm * qn) * len(q_count) if norm and qn else 0.0)
+    return rel, lens
+
+def _dedup_key(s: str) -> str:
+    # المفتاح هو النص المضغوط المُطبَّع نفسه (set يجزّئه) — لا حاجة لـ SHA-1
+    return normalize(re.sub(r"\W+", "", s))[:256]
+
+def _dedup(ordered: List[str], max_sents: int) -> List[str]:
     seen, out = set(), []
-    for sc, s in scored:
-        fp = _fingerprint(s)
-        if fp in seen: continue
-        seen.add(fp); out.append(s)
+    for s in ordered:
+        k = _dedup_key(s)
+        if k in seen: continue
+        seen.add(k); out.append(s)
         if len(out) >= max_sents: break
     return out
 
-def extractive_summary(snippets: List[str], q: str, titles: List[str], links: List[str], max_sents: int = 7) -> List[str]:
-    pool: List[Tuple[float,str]] = []
+def extractive_summary(snippets: List[str], q: str, titles: List[str], links: List[str], max_sents: int = 7,
+                       mode: str = SCORING_MODE) -> List[str]:
+    sents: List[str] = []; toks: List[Tuple[str, ...]] = []; doc_of: List[int] = []
     for i, t in enumerate(snippets):
-        title = titles[i] if i < len(titles) else ""
-        link  = links[i]  if i < len(links)  else ""
-        for s in _sentences(t):
-            pool.append((_score_sentence(s, q, title, link), s))
-    pool.sort(key=lambda x:x[0], reverse=True)
-    return _dedup(pool, max_sents)
+        seg = segment(t)
+        sents += seg.sents; toks += seg.tokens; doc_of += [i] * len(seg.sents)
+    if not sents: return []
+    scores = score_sentences(sents, q, doc_of, [titles[i] if i < len(titles) else "" for i in range(len(snippets))],
+                             [links[i] if i < len(links) else "" for i in range(len(snippets))], mode, toks)
+    order = sorted(range(len(sents)), key=lambda i: -scores[i])   # ترتيب مستقر كالسابق
+    return _dedup([sents[i] for i in order], max_sents)
 
-def render_sources(results: List[Dict]) -> str:
+# ==== الناتج المهيكل: يُبنى مرة واحدة، وHTML/JSON عارضان كسولان فوقه ====
+HEADERS = {"person":"بطاقة تعريف","definition":"تعريف مختصر","howto":"خطوات/كيفية","compare":"مقارنة سريعة","timeline":"جدول زمني مختصر"}
+SUMMARY_CACHE_MAX = int(os.getenv("OMNI_SUMMARY_CACHE", "256"))
+
+def _source_items(results: List[Dict]) -> List[Dict[str, Any]]:
     items = []
-    for i, r in enumerate(results[:10], 1):
-        title = _clean(r.get("title") or r.get("site") or "مصدر")
-        url = _clean(r.get("url") or r.get("link") or "");  host = _hostname(url)
-        if url: items.append(f'<li><a href="{url}" target="_blank" rel="noopener">{i}. {title}</a> <small>({host})</small></li>')
-    return "<ul class='sources-list'>" + "".join(items) + "</ul>" if items else "لا توجد مصادر متاحة."
+    for i, r in enumerate((results or [])[:10], 1):
+        url = _clean(r.get("url") or r.get("link") or "")
+        if url: items.append({"n": i, "title": _clean(r.get("title") or r.get("site") or "مصدر"), "url": url, "host": _hostname(url)})
+    return items
 
-def summarize_answer_html(query: str, results: List[Dict], *, memory_hits: Optional[List[Dict]] = None, max_points: int=7) -> str:
+def _render_sources(items: List[Dict[str, Any]]) -> str:
+    lis = [f'<li><a href="{s["url"]}" target="_blank" rel="noopener">{s["n"]}. {s["title"]}</a> <small>({s["host"]})</small></li>' for s in items]
+    return "<ul class='sources-list'>" + "".join(lis) + "</ul>" if lis else "لا توجد مصادر متاحة."
+
+def render_sources(results: List[Dict]) -> str:
+    return _render_sources(_source_items(results))
+
+class Summary:
+    """
+    kind: ok | titles (لا مقتطفات، عناوين فقط) | haram | sensitive
+    bullets: النقاط كنص خام، memory: [{q, ts, a}]، sources: [{n, title, url, host}]
+    html() وas_json() يُحسبان عند أول طلب ثم يُحفظان في الكائن (والكائن نفسه في ذاكرة LRU).
+    """
+    __slots__ = ("kind", "header", "bullets", "memory", "sources", "_html")
+
+    def __init__(self, kind: str, header: str = "", bullets: Optional[List[str]] = None,
+                 memory: Optional[List[Dict[str, str]]] = None, sources: Optional[List[Dict[str, Any]]] = None):
+        self.kind = kind
+        self.header = header
+        self.bullets = bullets or []
+        self.memory = memory or []
+        self.sources = sources or []
+        self._html: Optional[str] = None
+
+    def html(self) -> str:
+        if self._html is None: self._html = self._render()
+        return self._html
+
+    def _render(self) -> str:
+        if self.kind == "haram":     return "<div class='answer error'>⚠️ رجاءً تجنّب المحتوى المخالف.</div>"
+        if self.kind == "sensitive": return "<div class='answer error'>حفاظًا على الخصوصية، لا نعرض/نبحث عن بيانات شخصية.</div>"
+        sources_html = _render_sources(self.sources)
+        if self.kind == "titles":
+            bullets = "\n".join(f"• {t}" for t in self.bullets) or "لم أجد تفاصيل كافية."
+            return f"<div class='answer'><p>هذه أبرز النقاط:</p><div class='bullets'>{bullets}</div><h3>المصادر:</h3>{sources_html}</div>"
+        bullets_html = "\n".join(f"• {s}" for s in self.bullets) if self.bullets else "لم أجد ما يكفي لتوليد خلاصة."
+        memory_html = ""
+        if self.memory:
+            items = "".join(f"<li><b>{m['q']}</b><br/><small>{m['ts']}</small><div class='mem-a'>{m['a']}</div></li>" for m in self.memory)
+            memory_html = "<h3>من الذاكرة:</h3><ul class='memory-list'>" + items + "</ul>"
+        return f"""
+    <div class="answer">
+      <p>مرحبًا، أنا <b>بسام</b>. حلّلت النتائج من محرّكات بحث ومصادر مفتوحة، وبدون أي اشتراكات.</p>
+      <h3>{self.header}:</h3>
+      <div class="bullets">{bullets_html}</div>
+      {memory_html}
+      <h3>المصادر:</h3>{sources_html}
+      <div class='note'>تبي تفاصيل أدق (إحصاءات/خطوات/مقارنة)؟ قلّي وحدّد الزاوية.</div>
+    </div>
+    """
+
+    def as_json(self, with_html: bool = True) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"ok": True, "kind": self.kind, "header": self.header, "bullets": list(self.bullets),
+                               "memory": list(self.memory),
+                               "sources": [{"title": s["title"], "url": s["url"], "host": s["host"]} for s in self.sources]}
+        if with_html: out["html"] = self.html()
+        return out
+
+def build_summary(query: str, results: List[Dict], *, memory_hits: Optional[List[Dict]] = None,
+                  max_points: int = 7, mode: str = SCORING_MODE) -> Summary:
     q = _clean(query)
-    if _is_haram(q):     return "<div class='answer error'>⚠️ رجاءً تجنّب المحتوى المخالف.</div>"
-    if _is_sensitive(q): return "<div class='answer error'>حفاظًا على الخصوصية، لا نعرض/نبحث عن بيانات شخصية.</div>"
+    if _is_haram(q):     return Summary("haram")
+    if _is_sensitive(q): return Summary("sensitive")
 
     titles, links, snippets = [], [], []
     for r in (results or []):
@@ -97,39 +245,73 @@ def summarize_answer_html(query: str, results: List[Dict], *, memory_hits: Optio
         snip = _clean(r.get("snippet") or r.get("description") or r.get("text") or "")
         if titles[-1] and titles[-1] not in snip: snip = f"{titles[-1]}. {snip}" if snip else titles[-1]
         snippets.append(snip)
+    sources = _source_items(results)
 
     if not any(snippets):
-        bullets = "\n".join([f"• {t}" for t in titles[:max_points] if t]) or "لم أجد تفاصيل كافية."
-        return f"<div class='answer'><p>هذه أبرز النقاط:</p><div class='bullets'>{bullets}</div><h3>المصادر:</h3>{render_sources(results)}</div>"
+        return Summary("titles", bullets=[t for t in titles[:max_points] if t], sources=sources)
 
-    picked = extractive_summary(snippets, q, titles, links, max_sents=max_points)
-    header = {"person":"بطاقة تعريف","definition":"تعريف مختصر","howto":"خطوات/كيفية","compare":"مقارنة سريعة","timeline":"جدول زمني مختصر"}.get(_intent(q),"الخلاصة")
+    picked = extractive_summary(snippets, q, titles, links, max_sents=max_points, mode=mode)
+    memory = [{"q": _clean(m.get("q", "")), "ts": _clean(m.get("ts", "")), "a": _clean(m.get("a", ""))}
+              for m in (memory_hits or [])[:3]]
+    return Summary("ok", HEADERS.get(_intent(q), "الخلاصة"), picked, memory, sources)
 
-    bullets_html = "\n".join([f"• {s}" for s in picked]) if picked else "لم أجد ما يكفي لتوليد خلاصة."
-    memory_html = ""
-    if memory_hits:
-        items = []
-        for m in memory_hits[:3]:
-            items.append(f"<li><b>{_clean(m.get('q',''))}</b><br/><small>{_clean(m.get('ts',''))}</small><div class='mem-a'>{_clean(m.get('a',''))}</div></li>")
-        if items: memory_html = "<h3>من الذاكرة:</h3><ul class='memory-list'>" + "".join(items) + "</ul>"
+# ==== ذاكرة LRU للملخصات: المفتاح (السؤال، بصمة النتائج والذاكرة والإعدادات) ====
+_summary_cache: "OrderedDict[Tuple[str, bytes], Summary]" = OrderedDict()
+_summary_lock = threading.Lock()
 
-    return f"""
-    <div class="answer">
-      <p>مرحبًا، أنا <b>بسام</b>. حلّلت النتائج من محرّكات بحث ومصادر مفتوحة، وبدون أي اشتراكات.</p>
-      <h3>{header}:</h3>
-      <div class="bullets">{bullets_html}</div>
-      {memory_html}
-      <h3>المصادر:</h3>{render_sources(results)}
-      <div class='note'>تبي تفاصيل أدق (إحصاءات/خطوات/مقارنة)؟ قلّي وحدّد الزاوية.</div>
-    </div>
-    """
+_RESULT_FIELDS = ("title", "site", "url", "link", "snippet", "description", "text")
+
+def _results_hash(results: List[Dict], memory_hits: Optional[List[Dict]], max_points: int, mode: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{max_points}\x1e{mode}".encode())
+    for r in (results or []):
+        for k in _RESULT_FIELDS: h.update(b"\x1f" + str(r.get(k) or "").encode("utf-8", "surrogatepass"))
+        h.update(b"\x1e")
+    h.update(b"\x1d")
+    for m in (memory_hits or [])[:3]:
+        for k in ("q", "ts", "a"): h.update(b"\x1f" + str(m.get(k) or "").encode("utf-8", "surrogatepass"))
+        h.update(b"\x1e")
+    return h.digest()
+
+def summarize(query: str, results: List[Dict], *, memory_hits: Optional[List[Dict]] = None,
+              max_points: int = 7, mode: str = SCORING_MODE) -> Summary:
+    """build_summary مع ذاكرة LRU؛ الإصابات/الإخفاقات تُسجَّل في core.metrics.cache."""
+    key = (query or "", _results_hash(results, memory_hits, max_points, mode))
+    with _summary_lock:
+        s = _summary_cache.get(key)
+        if s is not None: _summary_cache.move_to_end(key)
+    metrics.cache(s is not None)
+    if s is not None: return s
+    s = build_summary(query, results, memory_hits=memory_hits, max_points=max_points, mode=mode)
+    with _summary_lock:
+        _summary_cache[key] = s
+        while len(_summary_cache) > SUMMARY_CACHE_MAX: _summary_cache.popitem(last=False)
+    return s
+
+def summarize_answer_html(query: str, results: List[Dict], *, memory_hits: Optional[List[Dict]] = None, max_points: int=7) -> str:
+    return summarize(query, results, memory_hits=memory_hits, max_points=max_points).html()
 
 def summarize_as_json(query: str, results: List[Dict], *, memory_hits: Optional[List[Dict]] = None, max_points: int = 7) -> Dict[str,Any]:
-    html_block = summarize_answer_html(query, results, memory_hits=memory_hits, max_points=max_points)
-    src_struct = []
-    for r in (results or [])[:10]:
-        t = _clean(r.get("title") or r.get("site") or "مصدر")
-        u = _clean(r.get("url") or r.get("link") or "")
-        if u: src_struct.append({"title": t, "url": u, "host": _hostname(u)})
-    bullets = [re.sub(r"^\s*•\s*", "", ln).strip() for ln in html_block.splitlines() if ln.strip().startswith("•")]
-    return {"ok": True, "html": html_block, "bullets": bullets, "sources": src_struct}
+    return summarize(query, results, memory_hits=memory_hits, max_points=max_points).as_json()
+
+if __name__ == "__main__":
+    # python -m brain.omni_brain — زمن التلخيص لكل جملة في كل وضع (60 مقتطفًا)
+    import random, time
+    random.seed(1)
+    words = ("الذكاء الاصطناعي تعلم الآلة البيانات الشبكات العصبية الحاسوب النماذج اللغوية "
+             "التطبيقات الطب التعليم الصناعة البحث العلمي الخوارزميات المعالجة الصور النصوص").split()
+    sent = lambda: " ".join(random.choice(words) for _ in range(random.randint(5, 25))) + "."
+    snips = [" ".join(sent() for _ in range(6)) for _ in range(60)]
+    titles = [" ".join(random.sample(words, 4)) for _ in snips]
+    links = [random.choice(["https://ar.wikipedia.org/x", "https://example.com/y"]) for _ in snips]
+    q = "ما هو الذكاء الاصطناعي وتطبيقاته في الطب"
+    n = sum(len(_sentences(s)) for s in snips)
+    for mode in ("overlap", "tfidf", "textrank"):
+        t = time.perf_counter()
+        for _ in range(20): extractive_summary(snips, q, titles, links, mode=mode)
+        print(f"{mode:9s} {(time.perf_counter() - t) / 20 / n * 1e6:6.1f} µs/sentence ({n} sentences, numpy={np is not None})")
+    results = [{"title": t, "url": u, "snippet": s} for t, u, s in zip(titles, links, snips)]
+    for label, fn in (("build", lambda: build_summary(q, results).as_json()), ("cached", lambda: summarize_as_json(q, results))):
+        t = time.perf_counter()
+        for _ in range(20): fn()
+        print(f"{label:9s} {(time.perf_counter() - t) / 20 * 1e3:6.2f} ms/summary")
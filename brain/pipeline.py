@@ -0,0 +1,134 @@
+# brain/pipeline.py — منفّذ خطوات كرسم اعتماديات (DAG)
+# كل خطوة دالة async تأخذ (ctx, results)؛ الخطوات المستقلة تعمل بالتوازي،
+# ولكل خطوة مهلة ونتيجة احتياطية، وتُسجَّل أزمنتها لكل طلب وفي core.metrics.
+from __future__ import annotations
+import asyncio, time, traceback
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from core.metrics import metrics
+
+StepFn = Callable[[Dict, Dict], Awaitable[Any]]
+
+class Step:
+    """
+    name: اسم الخطوة (مفتاح النتيجة)
+    fn: async fn(ctx, results) → نتيجة
+    deps: أسماء الخطوات التي يجب أن تنتهي قبلها
+    timeout: مهلة بالثواني (None = بلا مهلة)
+    fallback: قيمة، أو fn(ctx, results, exc) تُستخدم عند الخطأ/انتهاء المهلة/التخطّي
+    when: شرط fn(ctx, results) → bool؛ False = تخطٍّ مع fallback
+    background: لا ينتظرها run() (مثل التعلّم بعد الرد)
+    """
+    def __init__(self, name: str, fn: StepFn, deps: Sequence[str] = (), *,
+                 timeout: Optional[float] = None, fallback: Any = None,
+                 when: Optional[Callable[[Dict, Dict], bool]] = None, background: bool = False):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.when = when
+        self.background = background
+
+    def fallback_for(self, ctx: Dict, results: Dict, exc: Optional[BaseException]) -> Any:
+        return self.fallback(ctx, results, exc) if callable(self.fallback) else self.fallback
+
+class PipelineRun:
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {}       # ok | timeout | error | skipped
+        self.timings: Dict[str, float] = {}    # مللي ثانية
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results.get(name)
+
+    def report(self) -> Dict:
+        return {"total_ms": self.total_ms,
+                "steps": {n: {"ms": self.timings.get(n), "status": self.status.get(n)} for n in self.status}}
+
+_background: set = set()   # مراجع للخطوات الخلفية حتى لا يجمعها GC
+
+class Pipeline:
+    def __init__(self, steps: Iterable[Step]):
+        self.steps: Dict[str, Step] = {}
+        for s in steps:
+            if s.name in self.steps: raise ValueError(f"duplicate step: {s.name}")
+            self.steps[s.name] = s
+        for s in self.steps.values():
+            missing = [d for d in s.deps if d not in self.steps]
+            if missing: raise ValueError(f"step {s.name}: unknown deps {missing}")
+        self.order = self._toposort()
+
+    def _toposort(self) -> List[str]:
+        order, state = [], {}
+        def visit(n: str):
+            if state.get(n) == 1: raise ValueError(f"cycle at step: {n}")
+            if state.get(n) == 2: return
+            state[n] = 1
+            for d in self.steps[n].deps: visit(d)
+            state[n] = 2; order.append(n)
+        for n in self.steps: visit(n)
+        return order
+
+    @classmethod
+    def from_plan(cls, plan: Sequence[Dict], handlers: Dict[str, Step], extra: Sequence[Step] = ()) -> "Pipeline":
+        """
+        يحوّل خطة planner.plan_pipeline إلى DAG: كل خطوة في الخطة تأخذ معالجها من handlers
+        واعتمادياتها من الخطة (deps) إضافة لاعتماديات المعالج. الخطوات بلا معالج تُحذف
+        ويرث تابعوها اعتمادياتها.
+        """
+        plan_deps = {p["name"]: list(p.get("deps", [])) for p in plan}
+        def resolve(names: Iterable[str], seen=()) -> List[str]:
+            out: List[str] = []
+            for d in names:
+                if d in handlers and d in plan_deps: out.append(d)
+                elif d in plan_deps and d not in seen: out += resolve(plan_deps[d], seen + (d,))
+            return out
+        steps = []
+        for name in plan_deps:
+            h = handlers.get(name)
+            if h is None: continue
+            deps = list(dict.fromkeys(resolve(plan_deps[name]) + [d for d in h.deps if d in plan_deps]))
+            steps.append(Step(name, h.fn, deps, timeout=h.timeout, fallback=h.fallback,
+                              when=h.when, background=h.background))
+        return cls(list(steps) + list(extra))
+
+    async def run(self, ctx: Optional[Dict] = None) -> PipelineRun:
+        ctx = ctx if ctx is not None else {}
+        run = PipelineRun()
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.order:   # ترتيب طوبولوجي: مهام الاعتماديات موجودة قبل تابعيها
+            step = self.steps[name]
+            tasks[name] = asyncio.create_task(self._run_step(step, ctx, run, [tasks[d] for d in step.deps]))
+        fg = [t for n, t in tasks.items() if not self.steps[n].background]
+        bg = [t for n, t in tasks.items() if self.steps[n].background]
+        if fg: await asyncio.gather(*fg)
+        for t in bg:
+            _background.add(t); t.add_done_callback(_background.discard)
+        run.total_ms = round((time.perf_counter() - run.started) * 1000, 1)
+        return run
+
+    async def _run_step(self, step: Step, ctx: Dict, run: PipelineRun, deps: List[asyncio.Task]) -> None:
+        if deps: await asyncio.gather(*deps)
+        t0 = time.perf_counter()
+        try:
+            if step.when is not None and not step.when(ctx, run.results):
+                run.results[step.name] = step.fallback_for(ctx, run.results, None)
+                run.status[step.name] = "skipped"; return
+            coro = step.fn(ctx, run.results)
+            run.results[step.name] = await (asyncio.wait_for(coro, step.timeout) if step.timeout else coro)
+            run.status[step.name] = "ok"
+        except asyncio.TimeoutError as e:
+            run.results[step.name] = step.fallback_for(ctx, run.results, e)
+            run.status[step.name] = "timeout"
+        except Exception as e:
+            traceback.print_exc()
+            run.results[step.name] = step.fallback_for(ctx, run.results, e)
+            run.status[step.name] = "error"
+        finally:
+            dt = time.perf_counter() - t0
+            run.timings[step.name] = round(dt * 1000, 1)
+            if run.status.get(step.name) != "skipped":
+                metrics.step(step.name, dt, run.status.get(step.name, "error"))
@@ -4,13 +4,20 @@ from typing import List, Dict
 from .analyzer import analyze_query
 
 def plan_pipeline(query: str) -> List[Dict]:
+    """
+    خطة كقائمة خطوات؛ deps = الخطوات التي تسبقها (تنفّذها brain.pipeline.Pipeline.from_plan
+    بالتوازي حيث أمكن).
+    """
     a = analyze_query(query)
-    steps: List[Dict] = [{"name":"analyze","meta":a}]
+    steps: List[Dict] = [{"name":"analyze","meta":a,"deps":[]}]
+    last = "analyze"
     # قرار بسيط: متى نبحث؟ متى نلخص؟ متى نولّد؟
     if a["intent"] in ["search","summarize","qa"]:
-        steps.append({"name":"web_search"})
-        steps.append({"name":"summarize"})
+        steps.append({"name":"web_search","deps":["analyze"]})
+        steps.append({"name":"summarize","deps":["web_search"]})
+        last = "summarize"
     if a["intent"] in ["qa","code","math"]:
-        steps.append({"name":"generate"})
-    steps.append({"name":"learn"})  # التعلم من التجربة
+        steps.append({"name":"generate","deps":[last]})
+        last = "generate"
+    steps.append({"name":"learn","deps":[last]})  # التعلم من التجربة
     return steps
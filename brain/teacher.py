@@ -4,6 +4,8 @@ from typing import List, Dict
 from bs4 import BeautifulSoup
 import requests, re
 
+from core.segment import segment
+
 HEADERS = {"User-Agent":"Mozilla/5.0"}
 
 def _clean_text(html: str) -> str:
@@ -22,15 +24,8 @@ def fetch_page(url: str) -> str:
     return ""
 
 def distill_knowledge(text: str, max_lines: int = 10) -> List[str]:
-    # قَطِّع النص إلى جمل، خُذ أهم الجمل (بدائية لكنها فعّالة كبداية)
-    sents = re.split(r"(?<=[.!؟:])\s+", text)
-    uniq = []
-    for s in sents:
-        s = s.strip()
-        if len(s) >= 40 and s not in uniq:
-            uniq.append(s)
-        if len(uniq) >= max_lines: break
-    return uniq
+    # قَطِّع النص إلى جمل، خُذ أهم الجمل (بدائية لكنها فعّالة كبداية) — التقطيع من core.segment
+    return list(segment(text, "facts").sents[:max_lines])
 
 def learn_from_urls(urls: List[str]) -> List[Dict]:
     out = []
@@ -0,0 +1,86 @@
+# core/arabic.py — تطبيع النص العربي في مكان واحد (بحث، مطابقة، فلترة، تلخيص)
+# القواعد أزواج (حرف → بديل) تُطبَّق بـ str.replace بعد فحص `in` (بحث C سريع، ولا نسخ إن غاب الحرف)؛
+# str.translate على نص غير ASCII يبحث في القاموس حرفًا حرفًا فكان أبطأ من سلاسل replace القديمة
+# بأضعاف على النصوص الطويلة. الأرقام (نادرة) تُفحص أولًا بتعبير واحد في النصوص القصيرة.
+# مع ذاكرة LRU للنصوص القصيرة المتكررة (الأسئلة، الكلمات، الجمل القصيرة).
+
+import re
+from functools import lru_cache
+
+VERSION = "1"          # غيّره عند تغيير الجداول: الفهارس المخزّنة على نص مُطبَّع تُعاد بناؤها
+MEMO_MAX_LEN = 256     # النصوص الأطول لا تُخزَّن (صفحات/مقالات كاملة)
+
+DIACRITICS = "".join(chr(c) for c in range(0x064B, 0x0653)) + "ٰ"   # التشكيل + الألف الخنجرية
+TATWEEL = "ـ"
+DIGITS = {**{chr(0x0660 + i): str(i) for i in range(10)},    # ٠-٩
+          **{chr(0x06F0 + i): str(i) for i in range(10)}}    # ۰-۹ (فارسية)
+FOLD = {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه"}
+
+_PAIRS = tuple((c, "") for c in DIACRITICS + TATWEEL) + tuple(FOLD.items())
+_DIGIT_PAIRS = tuple(DIGITS.items())
+_DIGIT_RX = re.compile(f"[{''.join(DIGITS)}]")
+
+def _digits(t: str) -> str:
+    # نص قصير: تعبير واحد يحسم غياب الأرقام؛ الطويل: فحص `in` لكل رقم أرخص من مسح التعبير
+    if len(t) <= MEMO_MAX_LEN and not _DIGIT_RX.search(t): return t
+    for a, b in _DIGIT_PAIRS:
+        if a in t: t = t.replace(a, b)
+    return t
+
+def _normalize(text: str, spaces: bool) -> str:
+    t = text
+    for a, b in _PAIRS:
+        if a in t: t = t.replace(a, b)
+    t = _digits(t).lower()
+    return " ".join(t.split()) if spaces else t.strip()
+
+_memo = lru_cache(maxsize=8192)(_normalize)
+
+def normalize(text: str, spaces: bool = False) -> str:
+    """
+    الصيغة القياسية للمقارنة: بلا تشكيل/تطويل، أ/إ/آ/ٱ→ا، ى/ئ→ي، ؤ→و، ة→ه،
+    أرقام عربية/فارسية→0-9، أحرف صغيرة. spaces=True يختصر المسافات لمسافة واحدة.
+    """
+    if not text: return ""
+    return _memo(text, spaces) if len(text) <= MEMO_MAX_LEN else _normalize(text, spaces)
+
+def tidy(text: str) -> str:
+    """تلميع خفيف يحافظ على الحروف كما كُتبت: مسافات موحّدة + أرقام 0-9."""
+    return _digits(" ".join((text or "").split()))
+
+def cache_info():
+    return _memo.cache_info()
+
+if __name__ == "__main__":
+    # python -m core.arabic — مقارنة بالدوال القديمة (main.normalize_ar، omni_brain._norm_ar، main_core.norm_ar)
+    import timeit
+
+    def legacy_main(text):
+        t = (text or "").strip().lower()
+        t = re.sub(r"[ًٌٍَُِّْ]", "", t)
+        t = t.replace("أ","ا").replace("إ","ا").replace("آ","ا")
+        return t.replace("ى","ي").replace("ة","ه")
+
+    def legacy_omni(s):
+        s = (s or "").strip()
+        s = re.sub("[ًٌٍَُِّْ]", "", s)
+        return s.replace("أ","ا").replace("إ","ا").replace("آ","ا").replace("ى","ي").replace("ة","ه")
+
+    AR = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+    def legacy_core(text):
+        return re.sub(r"\s+", " ", text.strip()).translate(AR)
+
+    samples = ["مَنْ هُوَ مُؤَسِّسُ الدَّولةِ الأمويّة؟", "ما هي عاصمة فرنسا", "كم عدد سكان مصر عام ٢٠٢٤",
+               "إحصائيات الأمم المتحدة عن التعليم في الوطن العربي وأثرها على التنمية الاقتصادية والاجتماعية."]
+    # نص طويل (~1.8 ألف حرف، مثل رسالة محادثة أو فقرة صفحة) يمر دائمًا بالمسار غير المخزَّن
+    long_text = " ".join(samples * 25)[:1800]
+    ref = str.maketrans({**{c: None for c in DIACRITICS + TATWEEL}, **FOLD, **DIGITS})   # الجدول السابق
+    assert all(_normalize(s, False) == s.translate(ref).lower().strip() for s in samples + [long_text])
+    n = 20000
+    rows = [("main.normalize_ar", legacy_main), ("omni._norm_ar", legacy_omni), ("main_core.norm_ar", legacy_core),
+            ("arabic.normalize (uncached)", lambda s: _normalize(s, False)), ("arabic.normalize", normalize),
+            ("arabic.tidy", tidy), ("str.translate (previous)", lambda s: s.translate(ref).lower().strip())]
+    for label, fn in rows:
+        t = min(timeit.repeat(lambda: [fn(s) for s in samples], number=n, repeat=3))
+        t_long = min(timeit.repeat(lambda: fn(long_text), number=n // 10, repeat=3))
+        print(f"{label:30s} {t / (n * len(samples)) * 1e6:6.2f} µs/call   1.8K chars {t_long / (n // 10) * 1e6:7.2f} µs")
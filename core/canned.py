@@ -0,0 +1,74 @@
+# core/canned.py — الردود الثابتة (تعريف / صانع التطبيق / خصوصية) بمطابقة واحدة
+# تطبيع مرة واحدة (core.arabic)، ثم تعبير واحد مُجمَّع فيه مجموعة مسمّاة لكل فئة.
+# الفئات بترتيب الأولوية: كل بديل lookahead يفحص النص كاملًا، فيفوز أول بديل
+# (وليس أول موضع في النص) — نفس ترتيب الفحوص المتتالية القديمة.
+
+import re
+from typing import Dict, Optional, Tuple
+
+from core.arabic import normalize
+
+CANNED_ANSWER = "بسام الشتيمي هو منصوريّ الأصل، وهو صانع هذا التطبيق."
+INTRO_ANSWER = "أنا بسام الشتيمي، مساعدك. أخبرني بما ترغب أن تسألني."
+SENSITIVE_PRIVACY_ANSWER = (
+    "حرصًا على خصوصيتك وخصوصية الآخرين، بما في ذلك اسم زوجتك أو والدتك، "
+    "لا يقدّم بسام أي معلومات شخصية أو عائلية. "
+    "يُرجى استخدام التطبيق في الأسئلة العامة أو التعليمية فقط."
+)
+
+# الأنماط مكتوبة بصيغة core.arabic.normalize (بلا همزة على الألف، ه بدل ة)
+INTRO_PATTERNS = [r"من انت", r"مين انت", r"من تكون", r"من هو المساعد", r"تعرف بنفسك", r"عرف بنفسك"]
+BASSAM_PATTERNS = [
+    r"من هو بسام", r"مين بسام", r"من هو بسام الذكي", r"من هو بسام الشتيمي",
+    r"من صنع التطبيق", r"من هو صانع التطبيق", r"من المطور", r"من هو صاحب التطبيق",
+    r"من مطور التطبيق", r"من برمج التطبيق", r"من انشا التطبيق", r"مين المطور"
+]
+SENSITIVE_PATTERNS = [
+    r"اسم\s+زوج(ه)?\s*بسام", r"زوجه\s*بسام", r"مرت\s*بسام",
+    r"اسم\s*ام\s*بسام", r"اسم\s*والده\s*بسام", r"ام\s*بسام", r"والده\s*بسام",
+    r"اسم\s*زوجه", r"اسم\s*ام", r"من هي زوجه", r"من هي ام"
+]
+
+# فئة → (engine_used في السجلات، الجواب، أقصى عدد نقاط)
+CANNED: Dict[str, Tuple[str, str, int]] = {
+    "intro":   ("CANNED_INTRO", INTRO_ANSWER, 3),
+    "bassam":  ("CANNED", CANNED_ANSWER, 4),
+    "privacy": ("CANNED_PRIVACY", SENSITIVE_PRIVACY_ANSWER, 4),
+}
+
+def _compile(groups: Dict[str, list]) -> "re.Pattern":
+    alts = "|".join(f"(?=.*?(?P<{name}>{'|'.join(pats)}))" for name, pats in groups.items())
+    return re.compile(f"(?:{alts})", re.DOTALL)
+
+_MATCHER = _compile({"intro": INTRO_PATTERNS, "bassam": BASSAM_PATTERNS, "privacy": SENSITIVE_PATTERNS})
+
+def match_canned(user_text: str) -> Optional[str]:
+    """أول فئة مطابقة (intro | bassam | privacy) أو None."""
+    m = _MATCHER.match(normalize(user_text))
+    return m.lastgroup if m else None
+
+if __name__ == "__main__":
+    # python -m core.canned — مقارنة بالطريقة القديمة (3 تطبيعات + ~29 re.search غير مُجمَّعة)
+    import timeit
+
+    def _legacy_norm(text: str) -> str:
+        t = (text or "").strip().lower()
+        t = re.sub(r"[ًٌٍَُِّْ]", "", t)
+        t = t.replace("أ","ا").replace("إ","ا").replace("آ","ا")
+        t = t.replace("ى","ي").replace("ة","ه")
+        return t
+
+    def _legacy(text: str) -> Optional[str]:
+        for name, pats in (("intro", INTRO_PATTERNS), ("bassam", BASSAM_PATTERNS), ("privacy", SENSITIVE_PATTERNS)):
+            q = _legacy_norm(text)
+            if any(re.search(p, q) for p in pats): return name
+        return None
+
+    samples = ["من أنتَ؟", "من هو بسام الشتيمي", "ما اسم زوجة بسام", "ما هي عاصمة فرنسا وكم عدد سكانها؟",
+               "اشرح لي خوارزمية الترتيب السريع بالتفصيل مع مثال بلغة بايثون"]
+    for s in samples:
+        assert match_canned(s) == _legacy(s), s
+    n = 20000
+    for label, fn in (("legacy", _legacy), ("compiled", match_canned)):
+        t = timeit.timeit(lambda: [fn(s) for s in samples], number=n)
+        print(f"{label:9s} {t / (n * len(samples)) * 1e6:7.2f} µs/request")
@@ -1,17 +1,11 @@
-from core.utils import ensure_arabic
 # core/compose_answer.py — تركيب إجابات ذكية من نتائج الويب
 from typing import List, Dict
 
+from core.segment import segment
+from core.utils import ensure_arabic_many
+
 def _pick_clean_lines(text: str, max_lines: int = 6) -> List[str]:
-    if not text: return []
-    lines = [l.strip(" .\t\r\n") for l in text.splitlines()]
-    lines = [l for l in lines if 15 <= len(l) <= 220]
-    seen, uniq = set(), []
-    for l in lines:
-        if l not in seen:
-            uniq.append(l); seen.add(l)
-            if len(uniq) >= max_lines: break
-    return uniq
+    return list(segment(text, "lines").sents[:max_lines])
 
 def compose_answer_ar(question: str, results: List[Dict]) -> Dict:
     bullets, links = [], []
@@ -29,6 +23,7 @@ def compose_answer_ar(question: str, results: List[Dict]) -> Dict:
 
     if not clean:
         return {"answer": "لم أستطع استخراج نقاط مفيدة من الويب.", "links": links[:5]}
+    clean = ensure_arabic_many(clean)   # النقاط غير العربية تُترجم في طلب واحد
 
     answer = f"سؤالك: {question}\n\nإليك ملخصًا ذكيًا من الويب:\n" + "\n".join([f"• {x}" for x in clean])
     if links:
@@ -0,0 +1,182 @@
+# core/content_filter.py — فلتر المحتوى المشترك (core.utils + brain.omni_brain)
+# كل قوائم الحظر تُطابَق على النص المُطبَّع ويُعاد اسم القائمة والكلمة المطابقة.
+# القوائم الكبيرة (≥ AUTOMATON_MIN_TERMS كلمة) في آلة Aho-Corasick: مرور واحد على النص
+# مهما كبرت القائمة. القوائم الصغيرة (الحالية ~50 كلمة) أسرع بحلقة "in" (بحث C لكل كلمة).
+# القوائم في data/blocklist.json وتُعاد قراءتها تلقائيًا عند تغيّر الملف.
+#   {"lists": {"haram": [...], ...}, "collapse_spaces": ["explicit"],
+#    "patterns": {"sensitive_personal": [regex, ...]}}
+# collapse_spaces: قوائم تُطابَق أيضًا على النص بلا مسافات ("s e x" → "sex").
+# patterns للحالات التي تحتاج تعبيرًا (مسافة متغيرة بين كلمتين) — تُجمَّع في تعبير واحد
+# كما كُتبت، وتُطابَق على النص المُطبَّع: يجب كتابتها بالصيغة المُطبَّعة (ه لا ة، ا لا أ،
+# حروف صغيرة)، والنمط غير المُطبَّع يُرفض عند القراءة.
+
+import json, os, re, threading, time, traceback
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.arabic import normalize as _normalize
+
+BLOCKLIST_PATH = os.getenv("BLOCKLIST_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "blocklist.json"))
+RELOAD_CHECK_SEC = 2.0   # أقصى تكرار لفحص mtime الملف
+AUTOMATON_MIN_TERMS = 128   # نقطة التعادل المقيسة (python -m core.content_filter)
+
+class Hit(NamedTuple):
+    category: str
+    term: str
+
+def normalize(text: str) -> str:
+    # core.arabic + مسافات موحّدة (لكلمات القوائم متعددة المقاطع مثل "افلام اباحيه")
+    return _normalize(text, spaces=True)
+
+class Automaton:
+    """
+    Aho-Corasick: goto كقواميس حرف→عقدة + fail. الانتقالات المحسوبة عبر fail تُخزَّن
+    في delta عند أول استخدام (DFA كسول)، فالحلقة الداخلية قاموس واحد لكل حرف.
+    """
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        goto: List[Dict[str, int]] = [{}]
+        own: List[List[Hit]] = [[]]
+        for cat, term in terms:
+            if not term: continue
+            node = 0
+            for ch in term:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto); goto[node][ch] = nxt
+                    goto.append({}); own.append([])
+                node = nxt
+            own[node].append(Hit(cat, term))
+        fail = [0] * len(goto)
+        outs: List[Tuple[Hit, ...]] = [()] * len(goto)   # مخرجات العقدة + كل لواحقها عبر fail
+        q = deque(goto[0].values())
+        for v in q: outs[v] = tuple(own[v])
+        while q:
+            u = q.popleft()
+            for ch, v in goto[u].items():
+                f = fail[u]
+                while f and ch not in goto[f]: f = fail[f]
+                fail[v] = goto[f].get(ch, 0) if u else 0
+                outs[v] = tuple(own[v]) + outs[fail[v]]
+                q.append(v)
+        self.goto, self.fail, self.outs = goto, fail, outs
+        self.delta: List[Dict[str, int]] = [dict(g) for g in goto]
+
+    def _resolve(self, node: int, ch: str) -> int:
+        goto, fail = self.goto, self.fail
+        while node and ch not in goto[node]: node = fail[node]
+        return goto[node].get(ch, 0)
+
+    def first(self, text: str, categories: Optional[frozenset] = None) -> Optional[Hit]:
+        delta, outs = self.delta, self.outs
+        node = 0
+        for ch in text:
+            nxt = delta[node].get(ch)
+            if nxt is None:
+                nxt = delta[node][ch] = self._resolve(node, ch)
+            node = nxt
+            if outs[node]:
+                for h in outs[node]:
+                    if categories is None or h.category in categories: return h
+        return None
+
+class Scan:
+    """حلقة "in" بسيطة: للقوائم الصغيرة أسرع من الآلة (حلقة بايثون لكل حرف)."""
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        self.hits = [Hit(cat, term) for cat, term in terms if term]
+
+    def first(self, text: str, categories: Optional[frozenset] = None) -> Optional[Hit]:
+        for h in self.hits:
+            if (categories is None or h.category in categories) and h.term in text: return h
+        return None
+
+def build_matcher(terms: Iterable[Tuple[str, str]]):
+    terms = list(terms)
+    return Automaton(terms) if len(terms) >= AUTOMATON_MIN_TERMS else Scan(terms)
+
+_ESCAPE = re.compile(r"\\.")
+
+def _check_pattern(p: str) -> str:
+    # خارج تسلسلات الهروب (\S \W ...) يجب ألا يغيّر التطبيع شيئًا
+    bare = _ESCAPE.sub("", p)
+    if _normalize(bare) != bare.strip():
+        raise ValueError(f"blocklist pattern is not in normalized form: {p!r} (expected {_normalize(bare)!r})")
+    return p
+
+class ContentFilter:
+    def __init__(self, path: str = BLOCKLIST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self.matcher = build_matcher(())
+        self.collapsed = build_matcher(())      # قوائم collapse_spaces بلا مسافات
+        self.collapse_cats: frozenset = frozenset()
+        self.patterns: Dict[str, "re.Pattern"] = {}
+        self.terms = 0
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> bool:
+        """يعيد البناء إن تغيّر الملف (mtime/الحجم). عند خطأ في الملف تبقى القوائم السابقة."""
+        try:
+            st = os.stat(self.path); stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if not force and stamp == self._stamp: return False
+        with self._lock:
+            if not force and stamp == self._stamp: return False
+            try:
+                data = {}
+                if stamp is not None:
+                    with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+                terms = [(cat, normalize(t)) for cat, items in (data.get("lists") or {}).items() for t in items]
+                collapse = frozenset(data.get("collapse_spaces") or ())
+                collapsed = [(cat, t.replace(" ", "")) for cat, t in terms if cat in collapse]
+                patterns = {cat: re.compile("|".join(f"(?:{_check_pattern(p)})" for p in pats))
+                            for cat, pats in (data.get("patterns") or {}).items() if pats}
+            except Exception:
+                traceback.print_exc(); self._stamp = stamp; return False
+            self.matcher, self.collapsed, self.collapse_cats = build_matcher(terms), build_matcher(collapsed), collapse
+            self.patterns, self.terms = patterns, len(terms)
+            self._stamp = stamp
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_SEC:
+            self._checked = now
+            self.reload()
+
+    def check(self, text: str, categories: Optional[Iterable[str]] = None) -> Optional[Hit]:
+        """أول تطابق (القائمة، الكلمة) في categories (أو كل القوائم)، أو None."""
+        self._maybe_reload()
+        cats = frozenset(categories) if categories is not None else None
+        t = normalize(text)
+        hit = self.matcher.first(t, cats)
+        if hit: return hit
+        if self.collapse_cats and (cats is None or cats & self.collapse_cats) and " " in t:
+            hit = self.collapsed.first(t.replace(" ", ""), cats)
+            if hit: return hit
+        for cat, rx in self.patterns.items():
+            if cats is not None and cat not in cats: continue
+            m = rx.search(t)
+            if m: return Hit(cat, m.group(0))
+        return None
+
+content_filter = ContentFilter()
+
+def check(text: str, *categories: str) -> Optional[Hit]:
+    return content_filter.check(text, categories or None)
+
+if __name__ == "__main__":
+    # python -m core.content_filter — الآلة مقابل حلقة "in" حسب حجم القائمة (سؤال ~70 حرفًا)
+    import random, string, timeit
+    random.seed(2)
+    text = normalize("اشرح لي كيف تعمل محركات البحث وما هي افضل طريقة لتعلم البرمجة بلغة بايثون")
+    alpha = string.ascii_lowercase + "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+    for n in (30, 100, 200, 1000, 10000):
+        words = [("x", "".join(random.choices(alpha, k=random.randint(3, 9)))) for _ in range(n)]
+        ac, sc = Automaton(words), Scan(words)
+        ac.first(text)   # تسخين delta
+        t_ac = timeit.timeit(lambda: ac.first(text), number=500) / 500
+        t_sc = timeit.timeit(lambda: sc.first(text), number=500) / 500
+        print(f"{n:6d} terms  automaton {t_ac*1e6:8.1f} µs   scan {t_sc*1e6:9.1f} µs   → {type(build_matcher(words)).__name__}")
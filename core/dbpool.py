@@ -0,0 +1,51 @@
+# core/dbpool.py — اتصالات SQLite مُعاد استخدامها (اتصال لكل خيط لكل ملف) + وضع WAL
+# الاستخدام كما كان: `with connect(path) as con: con.execute(...)`
+# (سياق with يعمل commit/rollback فقط ولا يغلق الاتصال، فيبقى للطلب التالي)
+
+import sqlite3, threading
+from typing import Dict, List
+
+# WAL: القرّاء (لوحة الإدارة) لا يحجبون الكاتب (تسجيل الطلبات) والعكس
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # آمن مع WAL، ويلغي fsync لكل commit
+    "PRAGMA cache_size=-8000",     # ~8MB صفحات مخبّأة لكل اتصال
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+STATEMENT_CACHE = 256
+
+_local = threading.local()
+_opened: List[sqlite3.Connection] = []
+_opened_lock = threading.Lock()
+_generation = 0  # يزيد مع close_all فتُهمل الخيوط اتصالاتها القديمة
+
+def _open(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(path, timeout=5, cached_statements=STATEMENT_CACHE, check_same_thread=False)
+    con.row_factory = sqlite3.Row
+    for p in PRAGMAS:
+        con.execute(p)
+    with _opened_lock:
+        _opened.append(con)
+    return con
+
+def connect(path: str) -> sqlite3.Connection:
+    """يرجع اتصال هذا الخيط بالملف path (يُنشأ أول مرة فقط)."""
+    conns: Dict[str, sqlite3.Connection] = getattr(_local, "conns", None)
+    if conns is None or getattr(_local, "gen", None) != _generation:
+        conns = _local.conns = {}
+        _local.gen = _generation
+    con = conns.get(path)
+    if con is None:
+        con = conns[path] = _open(path)
+    return con
+
+def close_all() -> None:
+    """يغلق كل الاتصالات المفتوحة (عند إيقاف التطبيق)."""
+    global _generation
+    with _opened_lock:
+        cons = list(_opened); _opened.clear()
+        _generation += 1
+    for con in cons:
+        try: con.close()
+        except Exception: pass
@@ -1,17 +1,158 @@
-# core/local_memory.py
-import os
+# core/local_memory.py — قاعدة المعرفة المحلية (data/knowledge.txt) بفهرس BM25 في الذاكرة
+# الفهرس يُبنى مرة واحدة: كلمة مُطبَّعة (core.segment.tokens) → [(رقم السطر، تكرارها فيه)]،
+# وموضع كل سطر بالبايت فيُقرأ نصه عند الحاجة فقط. عند تغيّر mtime: إن كان الملف قد كبر
+# بإضافة أسطر في آخره تُفهرس الإضافة فقط (تُقرأ البايتات الجديدة وحدها)، وإلا يُعاد البناء.
+# الملف يُنسخ إلى الذاكرة ولا يُستخدم mmap: قصّ الملف أو إعادة كتابته في مكانه بين فحصين
+# كان سيُسقط العملية بـ SIGBUS عند قراءة سطر.
+
+import heapq, math, os, threading, time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from core.segment import tokens
 
 DATA_FILE = os.path.join("data", "knowledge.txt")
+MAX_RESULTS = 5
+BM25_K1, BM25_B = 1.5, 0.75
+RELOAD_CHECK_SEC = 2.0       # أقصى تكرار لفحص mtime الملف
+TAIL_CHECK = 64              # بايتات من آخر الجزء المفهرس تُقارن للتأكد أن التغيير إضافة فقط
+
+class KnowledgeIndex:
+    def __init__(self, path: str = DATA_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.data = bytearray()                            # نسخة الملف المفهرسة
+        self.offsets: List[int] = []                       # بداية كل سطر بالبايت
+        self.lengths: List[int] = []                       # عدد كلمات كل سطر
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.total_len = 0
+        self.indexed = 0                                   # بايتات مفهرسة من بداية الملف
+        self.tail = b""
+        self.reloads = self.appends = 0
+
+    # ---------- البناء ----------
+    def _read(self, start: int = 0) -> bytes:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read()
+
+    def _index_from(self, start: int) -> None:
+        data, pos, size = self.data, start, len(self.data)
+        while pos < size:
+            nl = data.find(b"\n", pos, size)
+            end = size if nl < 0 else nl + 1
+            i = len(self.lengths)
+            toks = tokens(bytes(data[pos:end]).decode("utf-8", "replace"))
+            for t, tf in Counter(toks).items():
+                self.postings.setdefault(t, []).append((i, tf))
+            self.offsets.append(pos); self.lengths.append(len(toks)); self.total_len += len(toks)
+            pos = end
+        self.indexed = pos
+        self.tail = bytes(data[max(0, pos - TAIL_CHECK):pos])
+
+    def reload(self, force: bool = False) -> bool:
+        """يحدّث الفهرس إن تغيّر الملف (mtime/الحجم): إضافة في آخره → فهرسة الجديد فقط."""
+        try:
+            st = os.stat(self.path); stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if not force and stamp == self._stamp: return False
+        with self._lock:
+            if not force and stamp == self._stamp: return False
+            if stamp is None:
+                self._reset(); self._stamp = None; return True
+            # إضافة فقط: الملف أكبر، وآخر سطر مفهرس كان مكتملًا (\n)، وآخر TAIL_CHECK بايت لم تتغير
+            try:
+                if (not force and self.indexed and stamp[1] > self.indexed
+                        and self.data[self.indexed - 1:self.indexed] == b"\n"):
+                    chunk = self._read(self.indexed - len(self.tail))
+                    if chunk[:len(self.tail)] == self.tail and len(chunk) > len(self.tail):
+                        start = self.indexed
+                        self.data += chunk[len(self.tail):]
+                        self._index_from(start); self.appends += 1
+                        self._stamp = stamp
+                        return True
+                data = self._read()
+            except FileNotFoundError:
+                self._reset(); self._stamp = None; return True
+            counts = (self.reloads + 1, self.appends)
+            self._reset(); self.data = bytearray(data)
+            self._index_from(0); self.reloads, self.appends = counts
+            self._stamp = stamp
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_SEC:
+            self._checked = now
+            self.reload()
+
+    # ---------- البحث ----------
+    def line(self, i: int) -> str:
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.indexed
+        return bytes(self.data[self.offsets[i]:end]).decode("utf-8", "replace").strip()
+
+    def search(self, question: str, k: int = MAX_RESULTS) -> List[Tuple[float, str]]:
+        """أعلى k أسطر بترتيب BM25 على كل كلمات السؤال (بعد التطبيع)."""
+        self._maybe_reload()
+        q = list(dict.fromkeys(tokens(question or "")))
+        with self._lock:
+            n = len(self.lengths)
+            if not n or not q: return []
+            avgdl = self.total_len / n or 1.0
+            lengths, scores = self.lengths, {}
+            for t in q:
+                plist = self.postings.get(t)
+                if not plist: continue
+                idf = math.log(1.0 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                for i, tf in plist:
+                    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[i] / avgdl)
+                    scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda x: (x[1], -x[0]))
+            return [(round(sc, 4), self.line(i)) for i, sc in best]
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {"lines": len(self.lengths), "terms": len(self.postings), "bytes": self.indexed,
+                    "reloads": self.reloads, "appends": self.appends}
+
+knowledge = KnowledgeIndex()
 
 def local_search(question: str) -> str:
-    if not os.path.exists(DATA_FILE):
+    """أفضل الأسطر المطابقة (حتى MAX_RESULTS) مفصولة بأسطر، أو "" إن لم يطابق شيء."""
+    return "\n".join(line for _, line in knowledge.search(question))
+
+if __name__ == "__main__":
+    # python -m core.local_memory — ملف معرفة مُولَّد: الطريقة القديمة (قراءة الملف كل سؤال) مقابل الفهرس
+    import random, tempfile, timeit
+    random.seed(7)
+    words = ("الذكاء الاصطناعي تعلم الآلة البيانات الشبكات العصبية الحاسوب النماذج اللغوية "
+             "التطبيقات الطب التعليم الصناعة البحث العلمي الخوارزميات المعالجة الصور النصوص").split()
+    words += [f"مصطلح{i}" for i in range(5000)]
+    path = os.path.join(tempfile.mkdtemp(), "knowledge.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(50000): f.write(" ".join(random.choice(words) for _ in range(random.randint(5, 20))) + "\n")
+
+    def legacy(question):
+        with open(path, "r", encoding="utf-8") as f: content = f.read().lower()
+        q = question.lower()
+        if any(w in content for w in q.split()):
+            return "\n".join([l.strip() for l in content.splitlines() if q.split()[0] in l][:5])
         return ""
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        content = f.read().lower()
-    q = question.lower()
-    # بحث بسيط عن وجود كلمات السؤال في قاعدة المعرفة
-    if any(word in content for word in q.split()):
-        lines = [line.strip() for line in content.splitlines() if q.split()[0] in line]
-        if lines:
-            return "\n".join(lines[:5])
-    return ""
+
+    idx = KnowledgeIndex(path)
+    t0 = time.perf_counter(); idx.reload(); build = time.perf_counter() - t0
+    q = "تطبيقات الذكاء الاصطناعي مصطلح42"
+    n = 20
+    t_old = timeit.timeit(lambda: legacy(q), number=n) / n
+    t_new = timeit.timeit(lambda: idx.search(q), number=n * 50) / (n * 50)
+    with open(path, "a", encoding="utf-8") as f: f.write("سطر جديد عن مصطلح42 والذكاء الاصطناعي\n")
+    t0 = time.perf_counter(); idx.reload(); append = time.perf_counter() - t0
+    print(f"{idx.info()}  build {build * 1e3:.0f} ms  append-reload {append * 1e3:.2f} ms")
+    print(f"legacy {t_old * 1e3:8.2f} ms/question   bm25 {t_new * 1e6:8.1f} µs/question")
+    print(idx.search(q, 3))
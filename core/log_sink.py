@@ -0,0 +1,117 @@
+# core/log_sink.py — كاتب سجلات بالدفعات خارج مسار الطلب
+# المعالِج يضع السطر في طابور محدود ويعود فورًا، وخيط خلفي يكتب الدفعة
+# في معاملة واحدة (executemany) كل interval_ms أو كلما تجمّع max_rows.
+# خيط وليس asyncio task: نفس الحوض يخدم دوال متزامنة (CSV، المجدول) وSQLite أصلًا حاجب.
+
+import atexit, queue, threading, time, traceback
+from typing import Any, Callable, Dict, List
+
+_STOP = object()
+
+class BatchSink:
+    def __init__(self, name: str, flush_fn: Callable[[List[Any]], None], *,
+                 max_rows: int = 200, interval_ms: int = 250, maxsize: int = 10000):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.interval = interval_ms / 1000.0
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.dropped = 0    # سطور رُفضت لأن الطابور ممتلئ
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        _sinks.append(self)
+
+    # ---------- جهة المنتِج ----------
+    def put(self, item: Any) -> bool:
+        """يضيف سطرًا دون انتظار. يرجع False (ويزيد dropped) إن كان الطابور ممتلئًا."""
+        if self._closed:
+            self._write([item]); return True
+        self._ensure_started()
+        try:
+            self._q.put_nowait(item); return True
+        except queue.Full:
+            self.dropped += 1; return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """ينتظر حتى يُكتب كل ما في الطابور (للاختبارات/القراءة بعد الكتابة مباشرة)."""
+        if self._thread is None: return True
+        end = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.005)
+        return not self._q.unfinished_tasks
+
+    def close(self, timeout: float = 5.0) -> None:
+        """يفرّغ الطابور ويوقف الخيط (عند إيقاف التطبيق)."""
+        if self._closed: return
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._q.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        # ما تبقّى (إن لم يلحق الخيط) يُكتب هنا مباشرة
+        rest = []
+        while True:
+            try: item = self._q.get_nowait()
+            except queue.Empty: break
+            if item is not _STOP: rest.append(item)
+            self._q.task_done()
+        if rest: self._write(rest)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._q.qsize(), "written": self.written, "dropped": self.dropped,
+                "errors": self.errors, "flushes": self.flushes}
+
+    # ---------- جهة الكاتب ----------
+    def _ensure_started(self) -> None:
+        if self._thread is not None: return
+        with self._start_lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+                t.start(); self._thread = t
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            self.flush_fn(batch)
+            self.written += len(batch); self.flushes += 1
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is _STOP:
+                self._q.task_done(); return
+            batch, stop = [item], False
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_rows:
+                left = deadline - time.monotonic()
+                if left <= 0: break
+                try:
+                    nxt = self._q.get(timeout=left)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True; break
+                batch.append(nxt)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._q.task_done()
+            if stop: return
+
+_sinks: List[BatchSink] = []
+
+def close_all() -> None:
+    for s in list(_sinks):
+        s.close()
+
+def all_stats() -> Dict[str, Dict[str, int]]:
+    return {s.name: s.stats() for s in _sinks}
+
+atexit.register(close_all)
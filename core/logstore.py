@@ -0,0 +1,186 @@
+# core/logstore.py — أدوات جدول السجلات logs (فهارس + تجميعات + تصدير CSV متدفّق + الأرشيف)
+# الجدول نفسه يُنشأ في main.py / bassam_agent.py (init_db)
+
+import csv, io, sqlite3, zlib
+import datetime as dt
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.canned import CANNED
+from core.retention import iter_archive
+
+LOG_COLUMNS = ("id", "ts", "type", "query", "file_name", "engine_used", "ip", "ua")
+CSV_HEADER = ["id", "ts", "type", "query", "file_name", "engine_used", "ip", "user_agent"]
+
+def ensure_log_indexes(con: sqlite3.Connection) -> None:
+    # ts بصيغة ISO (2025-01-31T10:00:00Z) فالمقارنة النصية = مقارنة زمنية
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_type_ts ON logs(type, ts)")
+    # لتصفّح keyset: كل فهرس ثانوي يحمل rowid ضمنيًا → (عمود, id) مرتّب؛
+    # type وحده يخدمه idx_logs_type_ts (بادئته type) فلا فهرس منفصل يكلّف كل كتابة
+    con.execute("DROP INDEX IF EXISTS idx_logs_type")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_engine ON logs(engine_used)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_ip ON logs(ip)")
+
+# ---------- تجميعات ساعية/يومية (تُحدَّث مع كل دفعة كتابة) ----------
+ROLLUPS = {"logs_hourly": 13, "logs_daily": 10}   # طول بادئة ts: YYYY-MM-DDTHH / YYYY-MM-DD
+# تصنيف الردود الثابتة حسب engine_used (من core.canned)
+CANNED_CATEGORIES = {engine: cat for cat, (engine, _, _) in CANNED.items()}
+
+def canned_category(engine: Optional[str]) -> str:
+    return CANNED_CATEGORIES.get(engine or "", "")
+
+def _category_sql() -> str:
+    whens = " ".join(f"WHEN '{e}' THEN '{c}'" for e, c in CANNED_CATEGORIES.items())
+    return f"CASE COALESCE(engine_used,'') {whens} ELSE '' END"
+
+def ensure_rollups(con: sqlite3.Connection) -> None:
+    """ينشئ جداول التجميع (WITHOUT ROWID = المفتاح الأساسي هو الفهرس المغطّي) ويملؤها أول مرة."""
+    for name, width in ROLLUPS.items():
+        con.execute(f"""CREATE TABLE IF NOT EXISTS {name}(
+            bucket TEXT NOT NULL,
+            type TEXT NOT NULL,
+            engine TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, type, engine)
+        ) WITHOUT ROWID""")
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_engine ON {name}(engine, bucket, n)")
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_category ON {name}(category, bucket, n)")
+        if con.execute(f"SELECT 1 FROM {name} LIMIT 1").fetchone() is None:
+            con.execute(f"""INSERT INTO {name}(bucket, type, engine, category, n)
+                SELECT substr(ts, 1, {width}), type, COALESCE(engine_used, ''), {_category_sql()}, COUNT(*)
+                FROM logs GROUP BY 1, 2, 3""")
+
+def ensure_log_schema(con: sqlite3.Connection) -> None:
+    ensure_log_indexes(con)
+    ensure_rollups(con)
+
+def insert_logs(con: sqlite3.Connection, rows: Sequence[tuple]) -> None:
+    """
+    يكتب دفعة سطور (ts, type, query, file_name, engine_used, ip, ua) ويحدّث التجميعات
+    في نفس المعاملة، فلا تختلف الأعداد عن الجدول الأصلي.
+    """
+    con.executemany(
+        "INSERT INTO logs (ts, type, query, file_name, engine_used, ip, ua) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    for name, width in ROLLUPS.items():
+        counts = Counter((r[0][:width], r[1], r[4] or "") for r in rows)
+        con.executemany(
+            f"""INSERT INTO {name}(bucket, type, engine, category, n) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(bucket, type, engine) DO UPDATE SET n = n + excluded.n""",
+            [(b, t, e, canned_category(e), n) for (b, t, e), n in counts.items()]
+        )
+
+def rollup_stats(con: sqlite3.Connection, days: int = 30, by: str = "engine") -> List[Dict]:
+    """
+    أعداد آخر days يومًا من التجميعات فقط (لا يمسّ جدول logs).
+    by: engine | type | category | day | hour
+    """
+    since = (dt.datetime.utcnow() - dt.timedelta(days=days))
+    if by == "hour":
+        rows = con.execute("SELECT bucket AS k, SUM(n) AS n FROM logs_hourly WHERE bucket >= ? GROUP BY bucket ORDER BY bucket",
+                           (since.strftime("%Y-%m-%dT%H"),)).fetchall()
+    else:
+        col = {"engine": "engine", "type": "type", "category": "category", "day": "bucket"}.get(by)
+        if col is None: raise ValueError(f"unknown rollup dimension: {by}")
+        extra = " AND category != ''" if by == "category" else ""
+        order = "bucket" if by == "day" else "n DESC"
+        rows = con.execute(f"SELECT {col} AS k, SUM(n) AS n FROM logs_daily WHERE bucket >= ?{extra} GROUP BY {col} ORDER BY {order}",
+                           (since.strftime("%Y-%m-%d"),)).fetchall()
+    return [{"key": r[0], "n": r[1]} for r in rows]
+
+def _until_bound(until: str) -> Tuple[str, str]:
+    """تاريخ فقط (YYYY-MM-DD) يشمل اليوم كاملًا → ts < اليوم التالي."""
+    u = until.strip()
+    if len(u) == 10:
+        nxt = dt.date.fromisoformat(u) + dt.timedelta(days=1)
+        return "ts < ?", nxt.isoformat()
+    return "ts <= ?", u
+
+def log_filters(since: Optional[str] = None, until: Optional[str] = None,
+                types: Optional[Sequence[str]] = None, *, engine: Optional[str] = None,
+                ip: Optional[str] = None, before_id: Optional[int] = None) -> Tuple[str, list]:
+    where, params = [], []
+    if before_id:
+        where.append("id < ?"); params.append(int(before_id))
+    if engine:
+        where.append("engine_used = ?"); params.append(engine)
+    if ip:
+        where.append("ip = ?"); params.append(ip)
+    if since:
+        where.append("ts >= ?"); params.append(since.strip())
+    if until:
+        clause, val = _until_bound(until); where.append(clause); params.append(val)
+    types = [t for t in (types or []) if t]
+    if types:
+        where.append(f"type IN ({','.join('?' * len(types))})"); params.extend(types)
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+def iter_log_rows(db_path: str, since: Optional[str] = None, until: Optional[str] = None,
+                  types: Optional[Sequence[str]] = None, batch: int = 1000) -> Iterator[tuple]:
+    """
+    يقرأ السجلات (الأحدث أولًا) على دفعات عبر fetchmany.
+    اتصال قراءة مستقل وليس من dbpool: المولّد قد يُستأنف من خيوط مختلفة
+    أثناء البث، ووضع WAL يجعله لا يحجب كتابة السجلات الجديدة.
+    """
+    where, params = log_filters(since, until, types)
+    con = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+    try:
+        cur = con.execute(f"SELECT {', '.join(LOG_COLUMNS)} FROM logs{where} ORDER BY id DESC", params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows: break
+            yield from rows
+    finally:
+        con.close()
+
+def iter_archived_log_rows(since: Optional[str] = None, until: Optional[str] = None,
+                           types: Optional[Sequence[str]] = None) -> Iterator[tuple]:
+    """صفوف logs المؤرشفة (data/archive/logs-YYYY-MM.jsonl.gz) بنفس أعمدة وفلاتر iter_log_rows."""
+    types = set(t for t in (types or []) if t)
+    until_op, until_val = _until_bound(until) if until else (None, None)
+    for r in iter_archive("logs", since=since, until=until):
+        ts = r.get("ts") or ""
+        if since and ts < since: continue
+        if until_op == "ts < ?" and ts >= until_val: continue
+        if until_op == "ts <= ?" and ts > until_val: continue
+        if types and r.get("type") not in types: continue
+        yield tuple(r.get(c) for c in LOG_COLUMNS)
+
+def page_logs(con: sqlite3.Connection, *, before_id: Optional[int] = None, limit: int = 50,
+              type: Optional[str] = None, engine: Optional[str] = None, ip: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+    """
+    صفحة سجلات بترقيم keyset على id (الأحدث أولًا): الصفحة التالية تبدأ من next_before
+    بدل OFFSET، فالصفحات العميقة تكلّف مثل الأولى.
+    """
+    limit = max(1, min(int(limit), 500))
+    where, params = log_filters(since, until, [type] if type else None,
+                                engine=engine, ip=ip, before_id=before_id)
+    rows = con.execute(f"SELECT {', '.join(LOG_COLUMNS)} FROM logs{where} ORDER BY id DESC LIMIT ?",
+                       params + [limit]).fetchall()
+    items = [dict(zip(LOG_COLUMNS, r)) for r in rows]
+    return {"items": items, "next_before": items[-1]["id"] if len(items) == limit else None}
+
+def stream_csv(rows: Iterable[Sequence], header: List[str] = CSV_HEADER, *,
+               chunk_rows: int = 500, gzip: bool = False) -> Iterator[bytes]:
+    """يحوّل الصفوف إلى قطع CSV مُرمّزة (UTF-8)، ويضغطها gzip أثناء البث عند الطلب."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buf = io.StringIO(); writer = csv.writer(buf)
+    writer.writerow(header); n = 0
+
+    def take() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0); buf.truncate(0)
+        return z.compress(data) if z else data
+
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row]); n += 1
+        if n % chunk_rows == 0:
+            chunk = take()
+            if chunk: yield chunk
+    chunk = take()
+    if z: chunk += z.flush()
+    if chunk: yield chunk
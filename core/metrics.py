@@ -0,0 +1,105 @@
+# core/metrics.py — عدّادات حيّة في الذاكرة (بدون SQLite) للوحة الإدارة
+# حلقة من خانات بالثانية لآخر WINDOW ثانية: طلبات لكل مسار، المحرّكات، الكاش، زمن الاستجابة،
+# وأزمنة خطوات brain.pipeline.
+
+import threading, time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+WINDOW = 60          # ثوانٍ محفوظة
+RATE_WINDOW = 5      # ثوانٍ يُحسب عليها معدل الطلبات/ث
+MAX_SAMPLES = 500    # حد عينات الزمن لكل ثانية
+
+class _Bucket:
+    __slots__ = ("sec", "routes", "engines", "hits", "misses", "lat", "steps")
+    def __init__(self, sec: int):
+        self.sec = sec
+        self.routes: Counter = Counter()
+        self.engines: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.lat: List[float] = []
+        self.steps: Dict[str, List[float]] = {}   # خطوة → [عدد, مجموع مللي ثانية, إخفاقات]
+
+def _pct(sorted_vals: List[float], p: float) -> Optional[float]:
+    if not sorted_vals: return None
+    i = min(len(sorted_vals) - 1, int(round(p * (len(sorted_vals) - 1))))
+    return round(sorted_vals[i], 1)
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ring: List[Optional[_Bucket]] = [None] * WINDOW
+        self.llm_inflight = 0
+        self.started = time.time()
+
+    def _bucket(self, now: float) -> _Bucket:
+        sec = int(now); i = sec % WINDOW
+        b = self._ring[i]
+        if b is None or b.sec != sec:
+            b = self._ring[i] = _Bucket(sec)
+        return b
+
+    # ---------- تسجيل ----------
+    def observe_request(self, route: str, seconds: float) -> None:
+        with self._lock:
+            b = self._bucket(time.time())
+            b.routes[route] += 1
+            if len(b.lat) < MAX_SAMPLES: b.lat.append(seconds * 1000.0)
+
+    def engine(self, name: Optional[str]) -> None:
+        with self._lock:
+            self._bucket(time.time()).engines[name or "?"] += 1
+
+    def cache(self, hit: bool, n: int = 1) -> None:
+        with self._lock:
+            b = self._bucket(time.time())
+            if hit: b.hits += n
+            else: b.misses += n
+
+    def step(self, name: str, seconds: float, status: str = "ok") -> None:
+        with self._lock:
+            s = self._bucket(time.time()).steps.setdefault(name, [0, 0.0, 0])
+            s[0] += 1; s[1] += seconds * 1000.0
+            if status != "ok": s[2] += 1
+
+    @contextmanager
+    def llm_call(self):
+        """يحيط طلبًا للنموذج: عمق طابور LLM = الطلبات الجارية الآن."""
+        with self._lock: self.llm_inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock: self.llm_inflight -= 1
+
+    # ---------- قراءة ----------
+    def snapshot(self) -> Dict:
+        now = time.time(); cur = int(now)
+        with self._lock:
+            live = [b for b in self._ring if b is not None and cur - b.sec < WINDOW]
+            recent = [b for b in live if cur - b.sec < RATE_WINDOW]
+            routes, engines = Counter(), Counter()
+            for b in recent: routes.update(b.routes)
+            for b in live: engines.update(b.engines)
+            hits = sum(b.hits for b in live); misses = sum(b.misses for b in live)
+            lat = sorted(x for b in live for x in b.lat)
+            steps: Dict[str, List[float]] = {}
+            for b in live:
+                for n, (c, ms, f) in b.steps.items():
+                    s = steps.setdefault(n, [0, 0.0, 0]); s[0] += c; s[1] += ms; s[2] += f
+            inflight = self.llm_inflight
+        span = max(1, min(RATE_WINDOW, int(now - self.started) + 1))
+        return {
+            "ts": int(now),
+            "rps": round(sum(routes.values()) / span, 2),
+            "routes": {r: round(n / span, 2) for r, n in routes.most_common(12)},
+            "engines": dict(engines.most_common(12)),
+            "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "llm_queue": inflight,
+            "p50_ms": _pct(lat, 0.50),
+            "p95_ms": _pct(lat, 0.95),
+            "steps": {n: {"n": c, "avg_ms": round(ms / c, 1), "failed": f} for n, (c, ms, f) in steps.items()},
+        }
+
+metrics = Metrics()
@@ -0,0 +1,115 @@
+# core/retention.py — أرشفة الصفوف القديمة إلى ملفات شهرية مضغوطة (gzip JSONL) وحذفها من الجداول الحيّة
+# data/archive/<name>-YYYY-MM.jsonl.gz — ملف لكل شهر؛ الإلحاق بـ gzip يضيف "عضوًا" جديدًا ويبقى مقروءًا كملف واحد.
+
+import csv, gzip, json, os, sqlite3, threading
+import datetime as dt
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from core.dbpool import connect
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "archive"))
+
+def cutoff_iso(days: int) -> str:
+    # بدون Z: "2025-01-01T00:00:00" < "2025-01-01T00:00:00Z" نصيًا، فيصلح لكل صيغ ts لدينا
+    return (dt.datetime.utcnow() - dt.timedelta(days=days)).isoformat(timespec="seconds")
+
+def archive_file(name: str, month: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"{name}-{month}.jsonl.gz")
+
+@contextmanager
+def _archive_lock(name: str, archive_dir: str):
+    # عمليتان (main + bassam_agent) قد تؤرشفان نفس الجدول: واحدة فقط في كل مرة
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(os.path.join(archive_dir, f".{name}.lock"), "a") as lf:
+        if fcntl: fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+def _append_months(name: str, rows: List[Dict], month_of: Callable[[Dict], str], archive_dir: str) -> None:
+    by_month: Dict[str, List[Dict]] = {}
+    for r in rows:
+        by_month.setdefault(month_of(r), []).append(r)
+    for month, items in by_month.items():
+        with gzip.open(archive_file(name, month, archive_dir), "at", encoding="utf-8") as f:
+            for r in items:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+def archive_table(db_path: str, table: str, *, older_than_days: int, ts_col: str = "ts",
+                  name: Optional[str] = None, archive_dir: str = ARCHIVE_DIR, batch: int = 1000,
+                  max_batches: int = 1000,
+                  on_delete: Optional[Callable[[sqlite3.Connection, List[sqlite3.Row]], None]] = None) -> int:
+    """
+    ينقل صفوف table الأقدم من older_than_days إلى الأرشيف الشهري ثم يحذفها على دفعات
+    (كل دفعة معاملة قصيرة، فلا يُحجب التسجيل الجاري). on_delete لتنظيف جداول تابعة (مثل FTS).
+    يرجع عدد الصفوف المؤرشفة.
+    """
+    name = name or table
+    cutoff = cutoff_iso(older_than_days)
+    con = connect(db_path)
+    moved = 0
+    with _archive_lock(name, archive_dir):
+        for _ in range(max_batches):
+            rows = con.execute(f"SELECT * FROM {table} WHERE {ts_col} < ? ORDER BY id LIMIT ?",
+                               (cutoff, batch)).fetchall()
+            if not rows: break
+            # الأرشيف أولًا ثم الحذف: لو توقّف بينهما يتكرر السطر في الأرشيف ولا يضيع
+            _append_months(name, [dict(r) for r in rows], lambda r: str(r[ts_col])[:7], archive_dir)
+            with con:
+                if on_delete: on_delete(con, rows)
+                con.executemany(f"DELETE FROM {table} WHERE id = ?", [(r["id"],) for r in rows])
+            moved += len(rows)
+    return moved
+
+def archive_csv(path: str, *, older_than_days: int, name: Optional[str] = None,
+                archive_dir: str = ARCHIVE_DIR, lock: Optional[threading.Lock] = None) -> int:
+    """
+    مثل archive_table لملفات CSV (العمود الأول timestamp بصيغة "%Y-%m-%d %H:%M:%S").
+    الصفوف الحديثة تُعاد كتابتها ذريًا؛ lock هو نفس قفل الكاتب حتى لا يضيع سطر أثناء إعادة الكتابة.
+    """
+    if not os.path.exists(path): return 0
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    cutoff = cutoff_iso(older_than_days).replace("T", " ")
+    with _archive_lock(name, archive_dir), (lock or threading.Lock()):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header: return 0
+            old, keep = [], []
+            for row in reader:
+                (old if row and row[0] < cutoff else keep).append(row)
+        if not old: return 0
+        _append_months(name, [dict(zip(header, r)) for r in old], lambda r: r[header[0]][:7], archive_dir)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f); w.writerow(header); w.writerows(keep)
+        os.replace(tmp, path)
+    return len(old)
+
+def archived_months(name: str, archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    """أشهر الأرشيف المتاحة (الأحدث أولًا)."""
+    if not os.path.isdir(archive_dir): return []
+    pre, suf = f"{name}-", ".jsonl.gz"
+    return sorted((f[len(pre):-len(suf)] for f in os.listdir(archive_dir)
+                   if f.startswith(pre) and f.endswith(suf)), reverse=True)
+
+def iter_archive(name: str, *, since: Optional[str] = None, until: Optional[str] = None,
+                 archive_dir: str = ARCHIVE_DIR) -> Iterator[Dict]:
+    """
+    يقرأ الأرشيف سطرًا سطرًا (بدون تحميل الملف كاملًا): الأشهر من الأحدث للأقدم،
+    وداخل كل شهر بترتيب الكتابة. since/until تستبعد ملفات الأشهر خارج المدى.
+    """
+    for month in archived_months(name, archive_dir):
+        if since and month < since[:7]: continue
+        if until and month > until[:7]: continue
+        with gzip.open(archive_file(name, month, archive_dir), "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,126 @@
+# core/segment.py — ذاكرة تقطيع مشتركة للملخِّصات (omni_brain، compose_answer، make_bullets، teacher)
+# المفتاح (القاعدة، بصمة blake2b للنص): المقتطف نفسه يظهر في إجابات كثيرة فيُقطَّع ويُطبَّع
+# ويُجزّأ كلمات مرة واحدة. الحد بالبايت (تقدير sys.getsizeof) مع طرد الأقدم استخدامًا (LRU).
+# الإصابات/الإخفاقات تُسجَّل أيضًا في core.metrics.cache (بطاقة "إصابة الكاش" في /admin).
+
+import hashlib, os, re, sys, threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from core.arabic import normalize
+from core.metrics import metrics
+
+CACHE_BYTES = int(os.getenv("SEGMENT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+WORD = re.compile(r"[^\W_]{2,}")     # كلمات من حرفين فأكثر
+
+def tokens(text: str) -> Tuple[str, ...]:
+    return tuple(WORD.findall(normalize(text)))
+
+# ---------- قواعد التقطيع (كلٌّ كما كانت في موضعها الأصلي) ----------
+_SENT = re.compile(r"(?<=[\.\!\؟\?])\s+|[\n\r]+")
+_FACT = re.compile(r"(?<=[.!؟:])\s+")
+_BULLET = re.compile(r"[.!؟\n]")
+_NON_WORD = re.compile(r"[^\w\s\u0600-\u06FF]")
+_SPACES = re.compile(r"\s+")
+
+def _sentences(text: str) -> List[str]:
+    # omni_brain: جمل من 4 كلمات فأكثر
+    return [p.strip() for p in _SENT.split(text) if len(p.split()) >= 4]
+
+def _lines(text: str) -> List[str]:
+    # compose_answer: أسطر 15..220 حرفًا بلا تكرار
+    return list(dict.fromkeys(l for l in (x.strip(" .\t\r\n") for x in text.splitlines()) if 15 <= len(l) <= 220))
+
+def _bullets(text: str) -> List[str]:
+    # make_bullets: حذف الرموز ثم التقطيع عند . ! ؟ والأسطر
+    out = []
+    for p in _BULLET.split(_NON_WORD.sub(" ", text.strip())):
+        p = _SPACES.sub(" ", p).strip(" -•،,")
+        if len(p.split()) >= 4: out.append(p)
+    return out
+
+def _facts(text: str) -> List[str]:
+    # teacher.distill_knowledge: جمل من 40 حرفًا فأكثر بلا تكرار
+    return list(dict.fromkeys(s for s in (x.strip() for x in _FACT.split(text)) if len(s) >= 40))
+
+RULES: Dict[str, Callable[[str], List[str]]] = {
+    "sentences": _sentences, "lines": _lines, "bullets": _bullets, "facts": _facts,
+}
+
+class Segments(NamedTuple):
+    sents: Tuple[str, ...]
+    norms: Tuple[str, ...]                 # core.arabic.normalize لكل جملة
+    tokens: Tuple[Tuple[str, ...], ...]    # كلمات كل جملة (WORD على النص المُطبَّع)
+    size: int                              # تقدير الحجم بالبايت
+
+EMPTY = Segments((), (), (), 0)
+
+def _build(text: str, rule: str) -> Segments:
+    sents = tuple(RULES[rule](text))
+    norms = tuple(normalize(s) for s in sents)
+    toks = tuple(tuple(WORD.findall(n)) for n in norms)
+    size = sum(sys.getsizeof(s) for s in sents + norms) + sum(sys.getsizeof(t) + sum(map(sys.getsizeof, t)) for t in toks)
+    return Segments(sents, norms, toks, size)
+
+class SegmentCache:
+    def __init__(self, max_bytes: int = CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = 0
+        self._items: "OrderedDict[Tuple[str, bytes], Segments]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str, rule: str = "sentences") -> Segments:
+        if not text: return EMPTY
+        if rule not in RULES: raise ValueError(f"unknown segmentation rule: {rule}")
+        key = (rule, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+        with self._lock:
+            seg = self._items.get(key)
+            if seg is not None:
+                self._items.move_to_end(key); self.hits += 1
+            else:
+                self.misses += 1
+        metrics.cache(seg is not None)
+        if seg is not None: return seg
+        seg = _build(text, rule)   # خارج القفل: خيطان قد يبنيان نفس النص، والنتيجة واحدة
+        if seg.size > self.max_bytes: return seg
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None: self.bytes -= old.size
+            self._items[key] = seg; self.bytes += seg.size
+            while self.bytes > self.max_bytes:
+                _, ev = self._items.popitem(last=False); self.bytes -= ev.size
+        return seg
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear(); self.bytes = 0
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+segment_cache = SegmentCache()
+
+def segment(text: str, rule: str = "sentences") -> Segments:
+    return segment_cache.get(text, rule)
+
+def cache_info() -> Dict:
+    return segment_cache.info()
+
+if __name__ == "__main__":
+    # python -m core.segment — نفس المقتطفات في طلبات متتالية: تقطيع بالتعبير كل مرة مقابل الذاكرة
+    import random, timeit
+    random.seed(5)
+    words = ("الذكاء الاصطناعي تعلم الآلة البيانات الشبكات العصبية الحاسوب النماذج اللغوية "
+             "التطبيقات الطب التعليم الصناعة البحث العلمي الخوارزميات المعالجة الصور النصوص").split()
+    sent = lambda: " ".join(random.choice(words) for _ in range(random.randint(5, 25))) + "."
+    snippets = [" ".join(sent() for _ in range(4)) for _ in range(40)]
+    pages = [" ".join(sent() for _ in range(120)) for _ in range(5)]
+    for label, texts, rule in (("snippets/sentences", snippets, "sentences"), ("pages/facts", pages, "facts")):
+        raw = timeit.timeit(lambda: [_build(t, rule) for t in texts], number=50) / 50
+        cached = timeit.timeit(lambda: [segment(t, rule) for t in texts], number=50) / 50
+        print(f"{label:20s} regex+normalize {raw * 1e3:7.2f} ms   cached {cached * 1e3:6.3f} ms  per request")
+    print(cache_info())
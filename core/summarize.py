@@ -1,25 +1,104 @@
-from rapidfuzz import fuzz
+# core/summarize.py — تلخيص نقاط من نصوص الصفحات (deep_fetch_texts) بمطابقة تقريبية للسؤال
+# المرشّحات تُجمع وتُصفّى أولًا، ثم تُقيَّم دفعة واحدة عبر rapidfuzz.process.cdist
+# (كود C متوازٍ بدل استدعاء partial_ratio من حلقة بايثون)، وأعلى k بـ heapq.
+import heapq, re
+from typing import List, Tuple
 
-def smart_summarize(question: str, texts: list[str], max_bullets: int = 6) -> str:
-    lines = []
+from rapidfuzz import fuzz, process
+
+from core.segment import segment
+
+try:
+    import numpy as np   # يحتاجه process.cdist
+except ImportError:
+    np = None
+
+MIN_LEN, MAX_LEN = 10, 220
+SCORE_CUTOFF = 40
+PARALLEL_MIN = 500       # أقل من ذلك: كلفة تشغيل الخيوط أكبر من المكسب
+
+# deep_fetch_texts يوحّد المسافات فتصل الصفحة سطرًا واحدًا طويلًا → يُقسَّم إلى جمل
+_SENT_SPLIT = re.compile(r"(?<=[.!?؟])\s+")
+
+def _candidates(texts: List[str]) -> List[str]:
+    """أسطر بطول MIN_LEN..MAX_LEN بترتيب ظهورها بلا تكرار (السطر الأطول يُقسَّم جملًا)."""
+    out = {}
     for t in texts or []:
-        for sent in (t or "").split("\n"):
-            s = sent.strip()
-            if 10 <= len(s) <= 220:
-                score = fuzz.partial_ratio(question, s)
-                if score >= 40:
-                    lines.append((score, s))
-    if not lines:
+        for line in (t or "").split("\n"):
+            s = line.strip()
+            parts = _SENT_SPLIT.split(s) if len(s) > MAX_LEN else (s,)
+            for p in parts:
+                p = p.strip()
+                if MIN_LEN <= len(p) <= MAX_LEN: out.setdefault(p, None)
+    return list(out)
+
+def _scores(question: str, cands: List[str]) -> List[float]:
+    if np is None:
+        return [fuzz.partial_ratio(question, s, score_cutoff=SCORE_CUTOFF) for s in cands]
+    m = process.cdist([question], cands, scorer=fuzz.partial_ratio, score_cutoff=SCORE_CUTOFF,
+                      dtype=np.float64, workers=-1 if len(cands) >= PARALLEL_MIN else 1)
+    return m[0].tolist()
+
+def top_lines(question: str, texts: List[str], k: int) -> List[Tuple[float, str]]:
+    """أعلى k أسطر (الدرجة، السطر) بدرجة ≥ SCORE_CUTOFF؛ التعادل يُحسم بأسبقية الظهور."""
+    cands = _candidates(texts)
+    if not cands or k <= 0: return []
+    scores = _scores(question, cands)
+    best = heapq.nlargest(k, ((sc, -i) for i, sc in enumerate(scores) if sc >= SCORE_CUTOFF))
+    return [(sc, cands[-i]) for sc, i in best]
+
+def smart_summarize(question: str, texts: list[str], max_bullets: int = 6) -> str:
+    picked = [s for _, s in top_lines(question, texts, max_bullets)]
+    if not picked:
         for t in texts or []:
             if t:
-                lines = [(0, x.strip()) for x in t.split("\n")[:8] if len(x.strip()) > 10]
+                picked = list(dict.fromkeys(x.strip() for x in t.split("\n")[:8] if len(x.strip()) > 10))[:max_bullets]
                 break
-    lines = sorted(lines, key=lambda x: x[0], reverse=True)
-    picked, seen = [], set()
-    for _, s in lines:
-        if s in seen: continue
-        seen.add(s); picked.append(s)
-        if len(picked) >= max_bullets: break
     if not picked:
         return "لم أجد نصًا كافيًا، جرّب إعادة صياغة سؤالك أو أضف كلمة مفتاحية."
     return "\n".join(f"• {p}" for p in picked)
+
+def make_bullets(snippets: List[str], max_items: int = 8) -> List[str]:
+    """نقاط من 4 كلمات فأكثر بلا تكرار (أول 80 حرفًا)؛ كل مقتطف يُقطَّع مرة واحدة (core.segment)."""
+    cleaned, seen = [], set()
+    for snip in snippets:
+        if not snip: continue
+        for p in segment(snip, "bullets").sents:
+            key = p[:80]
+            if key in seen: continue
+            seen.add(key); cleaned.append(p)
+            if len(cleaned) >= max_items: return cleaned
+    return cleaned
+
+if __name__ == "__main__":
+    # python -m core.summarize — 5 صفحات × 5000 حرف (شكل deep_fetch_texts) مقابل الحلقة القديمة
+    import random, time
+    random.seed(3)
+    words = ("الذكاء الاصطناعي تعلم الآلة البيانات الشبكات العصبية الحاسوب النماذج اللغوية "
+             "التطبيقات الطب التعليم الصناعة البحث العلمي الخوارزميات المعالجة الصور النصوص").split()
+    sent = lambda: " ".join(random.choice(words) for _ in range(random.randint(4, 30))) + random.choice(".؟!")
+    def page(sep: str) -> str:
+        out = ""
+        while len(out) < 5000: out += sent() + sep
+        return out[:5000]
+    q = "ما هي تطبيقات الذكاء الاصطناعي في الطب"
+
+    def legacy(question, texts, max_bullets=6):
+        lines = []
+        for t in texts:
+            for s in (x.strip() for x in t.split("\n")):
+                if 10 <= len(s) <= 220:
+                    score = fuzz.partial_ratio(question, s)
+                    if score >= 40: lines.append((score, s))
+        lines.sort(key=lambda x: x[0], reverse=True)
+        return list(dict.fromkeys(s for _, s in lines))[:max_bullets]
+
+    for label, sep, n_pages in (("5 pages, one line each", " ", 5), ("5 pages, newline per sentence", "\n", 5),
+                                ("50 pages, newline per sentence", "\n", 50)):
+        texts = [page(sep) for _ in range(n_pages)]
+        n = len(_candidates(texts))
+        t0 = time.perf_counter(); new = [s for _, s in top_lines(q, texts, 6)]; t1 = time.perf_counter()
+        old = legacy(q, texts); t2 = time.perf_counter()
+        if sep == "\n": assert new == old
+        print(f"{label:32s} {n:5d} candidates  batched {(t1 - t0) * 1e3:7.2f} ms  loop {(t2 - t1) * 1e3:7.2f} ms"
+              f"  ({len(old)} bullets before / {len(new)} now)")
@@ -0,0 +1,266 @@
+# core/translate.py — طبقة ترجمة مشتركة (core.utils.ensure_arabic + main_core.tool_translate)
+# 1) كشف سريع بنسبة الحروف (عربية/لاتينية) — langdetect فقط للنصوص المختلطة/الملتبسة.
+# 2) ذاكرة دائمة في SQLite: المفتاح بصمة (المصدر، الهدف، النص) → الترجمة.
+# 3) النصوص غير المخزّنة تُترجم معًا بطلب واحد: Google لكل BATCH_CHARS حرفًا،
+#    وLibreTranslate (LIBRETRANSLATE_URL) بقائمة q في طلب واحد على عميل httpx مشترك.
+# 4) عدّادات: الكشف السريع، إصابات الذاكرة، زمن الترجمة (stats()).
+
+import asyncio, hashlib, os, re, threading, time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from core.dbpool import connect as pooled_connect
+
+try:
+    from langdetect import DetectorFactory, detect
+    DetectorFactory.seed = 0   # langdetect عشوائي افتراضيًا: نفس النص قد يعطي لغتين
+except Exception:
+    detect = None
+try:
+    from deep_translator import GoogleTranslator
+except Exception:
+    # في حال لم تُثبَّت المكتبات بعد أثناء البيلد
+    GoogleTranslator = None
+
+TRANSLATE_DB = os.getenv("TRANSLATE_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "translations.db"))
+ARABIC_RATIO = 0.6    # ≥ هذه النسبة من الحروف عربية → عربي بلا langdetect
+LATIN_RATIO = 0.9     # ≥ هذه النسبة لاتينية (ولا حرف عربي) → يحتاج ترجمة بلا langdetect
+BATCH_CHARS = 4500    # حد Google للطلب الواحد 5000 حرف
+BATCH_SEP = "\n\n"
+LATENCY_SAMPLES = 200
+
+# ---------- كشف الكتابة ----------
+def _is_arabic(ch: str) -> bool:
+    o = ord(ch)
+    return 0x0600 <= o <= 0x06FF or 0x0750 <= o <= 0x077F or 0x08A0 <= o <= 0x08FF or 0xFB50 <= o <= 0xFDFF or 0xFE70 <= o <= 0xFEFF
+
+def script_ratio(text: str) -> Tuple[float, float, int]:
+    """(نسبة الحروف العربية، نسبة اللاتينية، عدد الحروف) — الأرقام والرموز لا تُحسب."""
+    ar = lat = n = 0
+    for ch in text:
+        if not ch.isalpha(): continue
+        n += 1
+        if ch < "ɐ": lat += 1
+        elif _is_arabic(ch): ar += 1
+    return (ar / n, lat / n, n) if n else (0.0, 0.0, 0)
+
+# ---------- عدّادات ----------
+class TranslationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {k: 0 for k in ("fast_arabic", "fast_latin", "no_letters", "langdetect",
+                                                      "cache_hits", "cache_misses", "upstream_calls",
+                                                      "upstream_texts", "errors")}
+        self.latency: deque = deque(maxlen=LATENCY_SAMPLES)   # مللي ثانية لكل طلب ترجمة
+
+    def add(self, key: str, n: int = 1) -> None:
+        with self._lock: self.counts[key] += n
+
+    def observe(self, seconds: float) -> None:
+        with self._lock: self.latency.append(seconds * 1000)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            c = dict(self.counts); lat = sorted(self.latency)
+        looked = c["cache_hits"] + c["cache_misses"]
+        pct = lambda p: round(lat[min(len(lat) - 1, int(round(p * (len(lat) - 1))))], 1) if lat else None
+        return {**c, "cache_hit_rate": round(c["cache_hits"] / looked, 3) if looked else None,
+                "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "n": len(lat)}}
+
+_stats = TranslationStats()
+
+def stats() -> Dict:
+    return _stats.snapshot()
+
+def needs_arabic(text: str) -> bool:
+    """هل النص غير عربي (فيحتاج ترجمة)؟ langdetect فقط عندما لا تحسم نسبة الحروف."""
+    ar, lat, n = script_ratio(text)
+    if not n: _stats.add("no_letters"); return False
+    if ar >= ARABIC_RATIO: _stats.add("fast_arabic"); return False
+    if lat >= LATIN_RATIO and not ar: _stats.add("fast_latin"); return True
+    if detect is None: return False   # أول تشغيل قبل التثبيت
+    _stats.add("langdetect")
+    try: return detect(text) != "ar"
+    except Exception: return False    # langdetect يرفض النصوص بلا ملامح
+
+# ---------- الذاكرة الدائمة ----------
+def _key(text: str, source: str, target: str) -> bytes:
+    return hashlib.blake2b(f"{source}\x1f{target}\x1f{text}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class TranslationCache:
+    def __init__(self, path: str = TRANSLATE_DB):
+        self.path = path
+        self._ready = False
+
+    def _db(self):
+        con = pooled_connect(self.path)
+        if not self._ready:
+            with con:
+                con.execute("""CREATE TABLE IF NOT EXISTS translations(
+                    key BLOB PRIMARY KEY, source TEXT NOT NULL, target TEXT NOT NULL,
+                    out TEXT NOT NULL, ts REAL NOT NULL) WITHOUT ROWID""")
+            self._ready = True
+        return con
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, str]:
+        found: Dict[bytes, str] = {}
+        con = self._db()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = con.execute(f"SELECT key, out FROM translations WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((bytes(k), v) for k, v in rows)
+        return found
+
+    def put_many(self, rows: Iterable[Tuple[bytes, str, str, str]]) -> None:
+        now = time.time()
+        with self._db() as con:
+            con.executemany("INSERT OR REPLACE INTO translations(key, source, target, out, ts) VALUES (?, ?, ?, ?, ?)",
+                            [(k, s, t, out, now) for k, s, t, out in rows])
+
+cache = TranslationCache()
+
+# ---------- الترجمة بالدفعات ----------
+def _chunks(texts: Sequence[str]) -> List[List[str]]:
+    out, cur, size = [], [], 0
+    for t in texts:
+        if cur and size + len(t) + len(BATCH_SEP) > BATCH_CHARS:
+            out.append(cur); cur, size = [], 0
+        cur.append(t); size += len(t) + len(BATCH_SEP)
+    if cur: out.append(cur)
+    return out
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+def _google(texts: List[str], source: str, target: str) -> List[str]:
+    """
+    دفعة واحدة لكل BATCH_CHARS: النصوص تُضم بسطر فارغ وتُفصل بعد الترجمة.
+    إن لم يطابق عدد الأجزاء (دمج المترجم فقرتين) تُترجم تلك الدفعة نصًا نصًا.
+    """
+    if GoogleTranslator is None: raise RuntimeError("deep_translator is not installed")
+    tr = GoogleTranslator(source=source, target=target)
+    out: List[str] = []
+    for chunk in _chunks([_BLANK_LINES.sub("\n", t).strip() for t in texts]):   # الفاصل لا يظهر داخل نص
+        _stats.add("upstream_calls")
+        parts = (tr.translate(BATCH_SEP.join(chunk)) or "").split(BATCH_SEP)
+        if len(parts) != len(chunk):
+            _stats.add("upstream_calls", len(chunk))
+            parts = [tr.translate(t) or t for t in chunk]
+        out += [p.strip() for p in parts]
+    return out
+
+BACKENDS: Dict[str, Callable[[List[str], str, str], List[str]]] = {"google": _google}
+
+# ---------- LibreTranslate (main_core): عميل httpx واحد بمجمّع اتصالات، وq كقائمة = طلب واحد ----------
+LIBRETRANSLATE_URL = os.getenv("LIBRETRANSLATE_URL", "https://libretranslate.de/translate")
+LIBRETRANSLATE_API_KEY = os.getenv("LIBRETRANSLATE_API_KEY", "")
+LIBRETRANSLATE_TIMEOUT = float(os.getenv("LIBRETRANSLATE_TIMEOUT", "10"))
+
+_client: Optional["httpx.AsyncClient"] = None
+
+def _libre_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(LIBRETRANSLATE_TIMEOUT, connect=3.0),
+                                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                                    headers={"Content-Type": "application/json"})
+    return _client
+
+async def aclose() -> None:
+    """يغلق عميل LibreTranslate (عند إيقاف التطبيق)."""
+    global _client
+    if _client is not None:
+        await _client.aclose(); _client = None
+
+async def _libre(texts: List[str], source: str, target: str) -> List[str]:
+    payload = {"q": texts, "source": source, "target": target, "format": "text"}
+    if LIBRETRANSLATE_API_KEY: payload["api_key"] = LIBRETRANSLATE_API_KEY
+    _stats.add("upstream_calls")
+    r = await _libre_client().post(LIBRETRANSLATE_URL, json=payload)
+    r.raise_for_status()
+    out = r.json().get("translatedText")
+    if isinstance(out, str): out = [out]
+    if not isinstance(out, list) or len(out) != len(texts):
+        raise ValueError(f"LibreTranslate returned {type(out).__name__} for {len(texts)} texts")
+    return out
+
+ASYNC_BACKENDS: Dict[str, Callable[[List[str], str, str], Awaitable[List[str]]]] = {"libre": _libre}
+
+# ---------- الواجهة: ذاكرة ثم دفعة واحدة للناقص ----------
+def _lookup(texts: Sequence[str], source: str, target: str) -> Tuple[List[bytes], Dict[bytes, str], List[Tuple[bytes, str]]]:
+    keys = [_key(t, source, target) for t in texts]
+    try:
+        found = cache.get_many(list(dict.fromkeys(keys)))
+    except Exception as e:
+        print("translation cache error:", e); found = {}
+    missing = {k: t for k, t in zip(keys, texts) if k not in found}
+    n_miss = sum(1 for k in keys if k in missing)
+    _stats.add("cache_hits", len(keys) - n_miss); _stats.add("cache_misses", n_miss)
+    return keys, found, list(missing.items())
+
+def _store(found: Dict[bytes, str], todo: List[Tuple[bytes, str]], translated: Optional[List[str]],
+           source: str, target: str) -> None:
+    if not translated: return
+    new = {k: out for (k, _), out in zip(todo, translated) if out}
+    found.update(new)
+    try: cache.put_many((k, source, target, out) for k, out in new.items())
+    except Exception as e: print("translation cache error:", e)
+
+def _result(keys: List[bytes], texts: Sequence[str], found: Dict[bytes, str], fallback: bool) -> List[Optional[str]]:
+    return [found.get(k, t if fallback else None) for k, t in zip(keys, texts)]
+
+def translate_many(texts: Sequence[str], target: str = "ar", source: str = "auto", backend: str = "google",
+                   fallback: bool = True) -> List[Optional[str]]:
+    """
+    يترجم texts بترتيبها؛ المخزّن يُقرأ من الذاكرة والباقي (بلا تكرار) بدفعات.
+    عند خطأ الخدمة يُعاد النص الأصلي (أو None مع fallback=False) ولا يُخزَّن.
+    """
+    keys, found, todo = _lookup(texts, source, target)
+    if todo:
+        t0 = time.perf_counter(); translated = None
+        try:
+            translated = BACKENDS[backend]([t for _, t in todo], source, target)
+            _stats.add("upstream_texts", len(todo))
+        except Exception as e:
+            print("translation error:", e); _stats.add("errors")
+        _stats.observe(time.perf_counter() - t0)
+        _store(found, todo, translated, source, target)
+    return _result(keys, texts, found, fallback)
+
+async def atranslate_many(texts: Sequence[str], target: str = "ar", source: str = "auto", backend: str = "libre",
+                          fallback: bool = True) -> List[Optional[str]]:
+    """مثل translate_many لخدمة async (libre): الذاكرة (SQLite) عبر to_thread والطلب على العميل المشترك."""
+    texts = list(texts)
+    keys, found, todo = await asyncio.to_thread(_lookup, texts, source, target)
+    if todo:
+        t0 = time.perf_counter(); translated = None
+        try:
+            translated = await ASYNC_BACKENDS[backend]([t for _, t in todo], source, target)
+            _stats.add("upstream_texts", len(todo))
+        except Exception as e:
+            print("translation error:", e); _stats.add("errors")
+        _stats.observe(time.perf_counter() - t0)
+        await asyncio.to_thread(_store, found, todo, translated, source, target)
+    return _result(keys, texts, found, fallback)
+
+def ensure_arabic_many(texts: Sequence[Optional[str]]) -> List[str]:
+    """كل نص عربي يعود كما هو، والباقي يُترجم إلى العربية في دفعة واحدة."""
+    out = [t or "" for t in texts]
+    idx = [i for i, t in enumerate(out) if t and needs_arabic(t)]
+    if idx:
+        for i, tr in zip(idx, translate_many([out[i] for i in idx], target="ar")): out[i] = tr
+    return out
+
+if __name__ == "__main__":
+    # python -m core.translate — كلفة الكشف: نسبة الحروف مقابل langdetect
+    import timeit
+    samples = ["ما هي عاصمة فرنسا وكم عدد سكانها؟", "What is the capital of France?",
+               "Python هي لغة برمجة", "123 456", "Das ist ein kleiner Test für die Erkennung"]
+    n = 2000
+    t = timeit.timeit(lambda: [script_ratio(s) for s in samples], number=n)
+    print(f"script_ratio {t / (n * len(samples)) * 1e6:8.2f} µs/text")
+    if detect is not None:
+        t = timeit.timeit(lambda: [detect(s) for s in samples if any(c.isalpha() for c in s)], number=n // 20)
+        print(f"langdetect   {t / (n // 20 * (len(samples) - 1)) * 1e6:8.2f} µs/text")
+    print({s: needs_arabic(s) for s in samples}, stats())
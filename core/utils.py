@@ -1,6 +1,9 @@
 # core/utils.py — Bassam الذكي / ALSHOTAIMI v13.6
 
-import os, re, csv, time
+import os, re, csv, time, threading
+from core.log_sink import BatchSink
+from core.retention import archive_csv
+from core.content_filter import content_filter
 
 # إنشاء المجلدات إذا لم تكن موجودة
 def ensure_dirs(*paths):
@@ -8,65 +11,53 @@ def ensure_dirs(*paths):
         if not os.path.exists(path):
             os.makedirs(path, exist_ok=True)
 
-# 🔒 الكلمات المحظورة (محتوى إباحي / مخل)
-HARAM_KEYWORDS = [
-    "sex","xxx","porn","nude","fuck","pussy","dick","anal","gay",
-    "سكس","اباحي","افلام اباحيه","ممثله اباحيه","ممثلات اباحيات","جماع","عاريه","مواقع اباحيه",
-    "عاري","صدرها","مؤخرتها","فرجها","قضيب","نيك","طيز","ممارسة","لواط","شذوذ","اغراء"
-]
-
-# ✅ الفحص إن كان السؤال مخالفًا
+# ✅ الفحص إن كان السؤال مخالفًا (القائمة "haram" في data/blocklist.json)
 def is_haram_query(text: str) -> bool:
-    text = text.lower().strip()
-    for kw in HARAM_KEYWORDS:
-        if kw in text:
-            return True
-    return False
+    return content_filter.check(text, ("haram",)) is not None
+
+# ✍️ كاتب CSV بالدفعات (فتح الملف مرة لكل دفعة بدل مرة لكل سطر)
+_csv_lock = threading.Lock()  # يشترك فيه الكاتب والأرشفة حتى لا يضيع سطر أثناء إعادة كتابة الملف
+
+def _csv_sink(name, header):
+    path = os.path.join("logs", name)
+    def _append(rows):
+        ensure_dirs(os.path.dirname(path))
+        with _csv_lock:
+            file_exists = os.path.exists(path)
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(header)
+                writer.writerows(rows)
+    return BatchSink(name, _append)
+
+_conversations_sink = _csv_sink("conversations.csv", ["timestamp", "ip", "user_name", "question", "answer"])
+_blocks_sink = _csv_sink("blocks.csv", ["timestamp", "ip", "user_name", "question", "reason"])
 
 # 📜 تسجيل المحادثات
 def log_conversation(ip, user_name, question, answer):
-    path = os.path.join("logs", "conversations.csv")
-    file_exists = os.path.exists(path)
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["timestamp", "ip", "user_name", "question", "answer"])
-        writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), ip, user_name, question, answer])
+    _conversations_sink.put([time.strftime("%Y-%m-%d %H:%M:%S"), ip, user_name, question, answer])
 
 # 🚫 تسجيل المحظورات (Blocks)
 def log_block(ip, user_name, question, reason="محتوى مخالف"):
-    path = os.path.join("logs", "blocks.csv")
-    file_exists = os.path.exists(path)
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["timestamp", "ip", "user_name", "question", "reason"])
-        writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), ip, user_name, question, reason])
-# === ترجمة تلقائية إلى العربية عند الحاجة ===
+    _blocks_sink.put([time.strftime("%Y-%m-%d %H:%M:%S"), ip, user_name, question, reason])
+
+# 🗄️ أرشفة سجلات CSV الأقدم من days إلى data/archive/<name>-YYYY-MM.jsonl.gz
+def archive_csv_logs(days=int(os.getenv("LOG_RETENTION_DAYS", "90"))):
+    moved = 0
+    for sink, name in ((_conversations_sink, "conversations.csv"), (_blocks_sink, "blocks.csv")):
+        sink.flush()
+        moved += archive_csv(os.path.join("logs", name), older_than_days=days, lock=_csv_lock)
+    return moved
+# === ترجمة تلقائية إلى العربية عند الحاجة (core.translate: كشف سريع + ذاكرة دائمة + دفعات) ===
 from typing import Optional
-try:
-    from langdetect import detect
-    from deep_translator import GoogleTranslator
-except Exception:
-    # في حال لم تُثبَّت المكتبات بعد أثناء البيلد
-    detect = None
-    GoogleTranslator = None
+from core.translate import ensure_arabic_many, stats as translation_stats
 
 def ensure_arabic(text: Optional[str]) -> str:
     """
     يعيد النص كما هو إذا كان عربيًا،
     وإلا يترجمه تلقائيًا إلى العربية.
     في حال حدوث خطأ، يعيد النص الأصلي بدون كسر.
+    لعدة نصوص: ensure_arabic_many (دفعة واحدة).
     """
-    if not text:
-        return ""
-    try:
-        if detect is None or GoogleTranslator is None:
-            return text  # أول تشغيل قبل التثبيت
-        lang = detect(text)
-        if lang != "ar":
-            return GoogleTranslator(source="auto", target="ar").translate(text)
-        return text
-    except Exception as e:
-        print("translation error:", e)
-        return text
+    return ensure_arabic_many([text])[0]
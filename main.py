@@ -2,12 +2,12 @@
 # بحث + رفع صور + GPT/محلي + إشعارات مباريات OneSignal + Deeplink ياسين/جنرال
 # لوحة إدارة + Service Worker + مسارات OneSignal Worker على الجذر
 
-import os, uuid, json, traceback, sqlite3, hashlib, io, csv, re
+import os, uuid, json, traceback, sqlite3, hashlib, re, time, asyncio, itertools
 import datetime as dt
 from typing import Optional, List, Dict
 from urllib.parse import quote
 
-from fastapi import FastAPI, Request, Form, UploadFile, File
+from fastapi import FastAPI, Request, Form, UploadFile, File, Query
 from fastapi.responses import (
     HTMLResponse, RedirectResponse, FileResponse,
     StreamingResponse, JSONResponse
@@ -26,6 +26,22 @@ from zoneinfo import ZoneInfo
 # OpenAI (اختياري)
 from openai import OpenAI
 
+from core.dbpool import connect as pooled_connect, close_all as close_db_pool
+from core.log_sink import BatchSink, close_all as close_log_sinks, all_stats as log_sink_stats
+from core.metrics import metrics
+from core.logstore import (ensure_log_schema, insert_logs, rollup_stats, page_logs,
+                           iter_log_rows, iter_archived_log_rows, stream_csv)
+from core.retention import archive_table
+from core.utils import archive_csv_logs
+from core.canned import CANNED, match_canned
+from core.summarize import make_bullets
+from core.translate import stats as translation_stats
+
+# ذاكرة الحقائق (data/memory.json) — يكتبها أيضًا عامل autolearn
+from brain.learn_brain import mm as memory_store, recall
+from brain.pipeline import Pipeline, Step
+from brain.planner import plan_pipeline
+
 # ----------------------------- مسارات
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
@@ -36,6 +52,7 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
 DB_PATH = os.path.join(DATA_DIR, "bassam.db")
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "90"))  # الأقدم يُنقل إلى data/archive
 
 # ----------------------------- تطبيق
 app = FastAPI(title="Bassam Brain")
@@ -43,6 +60,19 @@ app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
+@app.middleware("http")
+async def _track_requests(request: Request, call_next):
+    # عدّادات حيّة بالذاكرة للوحة /admin (طلبات/ث لكل مسار + زمن الاستجابة)
+    path = request.url.path
+    if path.startswith(("/static", "/uploads", "/admin/stream")):
+        return await call_next(request)
+    t0 = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        route = request.scope.get("route")
+        metrics.observe_request(getattr(route, "path", path), time.perf_counter() - t0)
+
 # ----------------------------- مفاتيح/إعدادات عامة
 SERPER_API_KEY = os.getenv("SERPER_API_KEY", "").strip()
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/") if os.getenv("PUBLIC_BASE_URL") else ""
@@ -71,7 +101,7 @@ async def ask_local_llm(user_q: str, context_lines: List[str], temperature: floa
         system_msg = ("أنت مساعد عربي خبير. أجب بإيجاز ووضوح وبنقاط مركزة عند الحاجة. "
                       "اعتمد على المعلومات التالية من نتائج البحث كمراجع خارجية. "
                       "إن لم تكن واثقًا قل لا أعلم.")
-        user_msg = f"السؤال:\n{user_q}\n\nنتائج البحث (للاستئناس والاستشهاد):\n" + "\n\n".join(context_lines[:6])
+        user_msg = f"السؤال:\n{user_q}\n\nنتائج البحث (للاستئناس والاستشهاد):\n" + "\n\n".join(context_lines[:8])
 
         payload = {
             "model": LOCAL_LLM_MODEL or "local",
@@ -83,10 +113,11 @@ async def ask_local_llm(user_q: str, context_lines: List[str], temperature: floa
             "max_tokens": int(max_tokens),
         }
 
-        async with httpx.AsyncClient(timeout=120) as ax:
-            r = await ax.post(f"{LOCAL_LLM_BASE}/v1/chat/completions",
-                              headers={"Content-Type": "application/json"},
-                              json=payload)
+        with metrics.llm_call():
+            async with httpx.AsyncClient(timeout=120) as ax:
+                r = await ax.post(f"{LOCAL_LLM_BASE}/v1/chat/completions",
+                                  headers={"Content-Type": "application/json"},
+                                  json=payload)
         if r.status_code != 200:
             return {"ok": False, "error": f"{r.status_code}: {r.text}"}
 
@@ -124,9 +155,8 @@ LEAGUE_NAME_BY_ID = {
 
 # ============================== قاعدة البيانات
 def db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # اتصال مُعاد استخدامه لهذا الخيط (WAL) — لا تغلقه بعد الاستخدام
+    return pooled_connect(DB_PATH)
 
 def init_db():
     with db() as con:
@@ -144,68 +174,20 @@ def init_db():
             );
             """
         )
+        ensure_log_schema(con)
 init_db()
 
-def log_event(event_type: str, ip: str, ua: str, query: Optional[str]=None,
-              file_name: Optional[str]=None, engine_used: Optional[str]=None):
+def _write_logs(rows: List[tuple]):
     with db() as con:
-        con.execute(
-            "INSERT INTO logs (ts, type, query, file_name, engine_used, ip, ua) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (dt.datetime.utcnow().isoformat(timespec="seconds")+"Z", event_type, query, file_name, engine_used, ip, ua)
-        )
+        insert_logs(con, rows)  # + تحديث التجميعات الساعية/اليومية
 
-# ============================== ردود ثابتة + خصوصية
-CANNED_ANSWER = "بسام الشتيمي هو منصوريّ الأصل، وهو صانع هذا التطبيق."
-INTRO_ANSWER = "أنا بسام الشتيمي، مساعدك. أخبرني بما ترغب أن تسألني."
-SENSITIVE_PRIVACY_ANSWER = (
-    "حرصًا على خصوصيتك وخصوصية الآخرين، بما في ذلك اسم زوجتك أو والدتك، "
-    "لا يقدّم بسام أي معلومات شخصية أو عائلية. "
-    "يُرجى استخدام التطبيق في الأسئلة العامة أو التعليمية فقط."
-)
+# الكتابة الفعلية في خيط خلفي بالدفعات؛ log_event لا ينتظر القرص
+log_sink = BatchSink("logs", _write_logs)
 
-def normalize_ar(text: str) -> str:
-    t = (text or "").strip().lower()
-    t = re.sub(r"[ًٌٍَُِّْ]", "", t)
-    t = t.replace("أ","ا").replace("إ","ا").replace("آ","ا")
-    t = t.replace("ى","ي").replace("ة","ه")
-    return t
-
-INTRO_PATTERNS = [r"من انت", r"من أنت", r"مين انت", r"من تكون", r"من هو المساعد", r"تعرف بنفسك", r"عرف بنفسك"]
-BASSAM_PATTERNS = [
-    r"من هو بسام", r"مين بسام", r"من هو بسام الذكي", r"من هو بسام الشتيمي",
-    r"من صنع التطبيق", r"من هو صانع التطبيق", r"من المطور", r"من هو صاحب التطبيق",
-    r"من مطور التطبيق", r"من برمج التطبيق", r"من انشأ التطبيق", r"مين المطور"
-]
-SENSITIVE_PATTERNS = [
-    r"اسم\s+زوج(ة|ه)?\s*بسام", r"زوج(ة|ه)\s*بسام", r"مرت\s*بسام",
-    r"اسم\s*ام\s*بسام", r"اسم\s*والدة\s*بسام", r"ام\s*بسام", r"والدة\s*بسام",
-    r"اسم\s*زوجة", r"اسم\s*ام", r"من هي زوجة", r"من هي ام"
-]
-
-def is_intro_query(user_text: str) -> bool:
-    q = normalize_ar(user_text);  return any(re.search(p, q) for p in INTRO_PATTERNS)
-def is_bassam_query(user_text: str) -> bool:
-    q = normalize_ar(user_text);  return any(re.search(p, q) for p in BASSAM_PATTERNS)
-def is_sensitive_personal_query(user_text: str) -> bool:
-    q = normalize_ar(user_text);  return any(re.search(p, q) for p in SENSITIVE_PATTERNS)
-
-# ============================== تلخيص بسيط
-def _clean(txt: str) -> str:
-    txt = (txt or "").strip()
-    return re.sub(r"[^\w\s\u0600-\u06FF]", " ", txt)
-
-def make_bullets(snippets: List[str], max_items: int = 8) -> List[str]:
-    text = " ".join(_clean(s) for s in snippets if s).strip()
-    parts = re.split(r"[.!؟\n]", text)
-    cleaned, seen = [], set()
-    for p in parts:
-        p = re.sub(r"\s+", " ", p).strip(" -•،,")
-        if len(p.split()) >= 4:
-            key = p[:80]
-            if key not in seen:
-                seen.add(key); cleaned.append(p)
-        if len(cleaned) >= max_items: break
-    return cleaned
+def log_event(event_type: str, ip: str, ua: str, query: Optional[str]=None,
+              file_name: Optional[str]=None, engine_used: Optional[str]=None):
+    if engine_used: metrics.engine(engine_used)
+    log_sink.put((dt.datetime.utcnow().isoformat(timespec="seconds")+"Z", event_type, query, file_name, engine_used, ip, ua))
 
 # ============================== البحث (Serper ثم DuckDuckGo)
 async def search_google_serper(q: str, num: int = 6) -> List[Dict]:
@@ -241,9 +223,10 @@ async def smart_search(q: str, num: int = 6) -> Dict:
             try:
                 results = await search_google_serper(q, num); used = "Google"
             except Exception:
-                results = search_duckduckgo(q, num); used = "DuckDuckGo"
+                results = await asyncio.to_thread(search_duckduckgo, q, num); used = "DuckDuckGo"
         else:
-            results = search_duckduckgo(q, num); used = "DuckDuckGo"
+            # DDGS متزامن: في خيط حتى لا يحجب حلقة الأحداث (وتعمل مهلة خطوة البحث)
+            results = await asyncio.to_thread(search_duckduckgo, q, num); used = "DuckDuckGo"
         bullets = make_bullets([r.get("snippet") for r in results], max_items=8)
         return {"ok": True, "used": used, "bullets": bullets, "results": results}
     except Exception as e:
@@ -265,26 +248,14 @@ async def search(request: Request, q: str = Form(...)):
     if not q:
         return templates.TemplateResponse("index.html", {"request": request, "error": "📝 الرجاء كتابة سؤالك أولًا."})
 
-    # تعريفات ثابتة
-    if is_intro_query(q):
-        ip = request.client.host if request.client else "?"
-        ua = request.headers.get("user-agent", "?")
-        log_event("search", ip, ua, query=q, engine_used="CANNED_INTRO")
-        ctx = {"request": request, "query": q, "engine_used": "CANNED_INTRO", "results": [], "bullets": [INTRO_ANSWER]}
-        return templates.TemplateResponse("index.html", ctx)
-
-    if is_bassam_query(q):
+    # تعريفات ثابتة (مطابقة واحدة لكل الفئات)
+    hit = match_canned(q)
+    if hit:
+        engine, answer, _ = CANNED[hit]
         ip = request.client.host if request.client else "?"
         ua = request.headers.get("user-agent", "?")
-        log_event("search", ip, ua, query=q, engine_used="CANNED")
-        ctx = {"request": request, "query": q, "engine_used": "CANNED", "results": [], "bullets": [CANNED_ANSWER]}
-        return templates.TemplateResponse("index.html", ctx)
-
-    if is_sensitive_personal_query(q):
-        ip = request.client.host if request.client else "?"
-        ua = request.headers.get("user-agent", "?")
-        log_event("search", ip, ua, query=q, engine_used="CANNED_PRIVACY")
-        ctx = {"request": request, "query": q, "engine_used": "CANNED_PRIVACY", "results": [], "bullets": [SENSITIVE_PRIVACY_ANSWER]}
+        log_event("search", ip, ua, query=q, engine_used=engine)
+        ctx = {"request": request, "query": q, "engine_used": engine, "results": [], "bullets": [answer]}
         return templates.TemplateResponse("index.html", ctx)
 
     result = await smart_search(q, num=8)
@@ -333,6 +304,67 @@ async def upload_image(request: Request, file: UploadFile = File(...)):
         return templates.TemplateResponse("index.html", {"request": request, "error": f"فشل رفع الصورة: {e}"})
 
 # ============================== API: ردّ الذكاء (محلي أولاً ثم OpenAI كاحتياط)
+# ============================== مسار /api/ask كخطوات (brain.pipeline)
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "12"))
+GENERATE_TIMEOUT = float(os.getenv("GENERATE_TIMEOUT", "90"))
+_NO_SEARCH = {"ok": False, "used": None, "results": [], "bullets": []}
+
+async def _step_search(ctx: Dict, res: Dict) -> Dict:
+    return await smart_search(ctx["q"], num=6)
+
+async def _step_context(ctx: Dict, res: Dict) -> List[str]:
+    # نتائج بحث مختصرة لاستخدامها كـ context
+    lines = []
+    for i, r in enumerate((res.get("web_search") or _NO_SEARCH).get("results", []), start=1):
+        title = (r.get("title") or "").strip()
+        link = (r.get("link") or "").strip()
+        snippet = (r.get("snippet") or "").strip()
+        lines.append(f"{i}. {title}\n{snippet}\n{link}")
+    return lines
+
+async def _step_generate(ctx: Dict, res: Dict) -> Optional[Dict]:
+    q, context_lines = ctx["q"], res.get("summarize") or []
+    # حتى حقيقتين محفوظتين بنفس نية/لغة السؤال (فهرس الوسوم في memory.json) قبل نتائج البحث الست
+    context_lines = [f"من الذاكرة: {f['content']}" for f in recall(q, limit=2)] + context_lines
+    # 1) المحلي أولاً (إن كان مُعدًا أو لو لا يوجد OpenAI)
+    if (USE_LOCAL_FIRST == "1") or (not client):
+        local = await ask_local_llm(q, context_lines)
+        if local.get("ok"):
+            return {"engine": "Local", "answer": local["answer"]}
+    # 2) OpenAI كاحتياط/أو أساسي إذا USE_LOCAL_FIRST=0
+    if client:
+        system_msg = ("أنت مساعد عربي خبير. أجب بإيجاز ووضوح وبنقاط مركزة عند الحاجة. "
+                      "اعتمد على المعلومات التالية من نتائج البحث كمراجع خارجية. إن لم تكن واثقًا قل لا أعلم.")
+        user_msg = f"السؤال:\n{q}\n\nنتائج البحث (للاستئناس والاستشهاد):\n" + "\n\n".join(context_lines[:8])
+        with metrics.llm_call():
+            resp = await asyncio.to_thread(
+                client.chat.completions.create,
+                model=LLM_MODEL or "gpt-5-mini",
+                messages=[{"role": "system", "content": system_msg},
+                          {"role": "user", "content": user_msg}],
+                temperature=0.3, max_tokens=600,
+            )
+        return {"engine": f"OpenAI:{LLM_MODEL}", "answer": (resp.choices[0].message.content or "").strip()}
+    return None
+
+# معالجات خطوات brain.planner.plan_pipeline: الخطة تختار الخطوات وترتيبها حسب نية السؤال
+# (code/math بلا بحث، search/summarize بلا توليد)؛ analyze/learn بلا معالج هنا فتُحذف.
+ASK_HANDLERS = {
+    "web_search": Step("web_search", _step_search, timeout=SEARCH_TIMEOUT,
+                       fallback=lambda c, r, e: dict(_NO_SEARCH, error=str(e or ""))),
+    "summarize": Step("summarize", _step_context, fallback=[]),   # نتائج البحث كسياق للتوليد
+    "generate": Step("generate", _step_generate, timeout=GENERATE_TIMEOUT, fallback=None),
+}
+_ask_pipelines: Dict[tuple, Pipeline] = {}   # الخطط قليلة (حسب النية) → DAG مبني مرة لكل شكل
+
+def ask_pipeline(q: str) -> Pipeline:
+    plan = plan_pipeline(q)
+    key = tuple((p["name"], tuple(p.get("deps", []))) for p in plan)
+    pipe = _ask_pipelines.get(key)
+    if pipe is None:
+        pipe = _ask_pipelines[key] = Pipeline.from_plan(plan, ASK_HANDLERS)
+    return pipe
+
 @app.post("/api/ask")
 async def api_ask(request: Request):
     try:
@@ -341,89 +373,48 @@ async def api_ask(request: Request):
         if not q:
             return JSONResponse({"ok": False, "error": "no_query"}, status_code=400)
 
-        # ردود ثابتة
-        if is_intro_query(q):
-            ip = request.client.host if request.client else "?"
-            ua = request.headers.get("user-agent", "?")
-            log_event("ask", ip, ua, query=q, engine_used="CANNED_INTRO")
-            return JSONResponse({"ok": True, "engine_used": "CANNED_INTRO",
-                                 "answer": INTRO_ANSWER,
-                                 "bullets": make_bullets([INTRO_ANSWER], max_items=3),
-                                 "sources": []})
-
-        if is_bassam_query(q):
+        # ردود ثابتة (مطابقة واحدة لكل الفئات)
+        hit = match_canned(q)
+        if hit:
+            engine, answer, max_items = CANNED[hit]
             ip = request.client.host if request.client else "?"
             ua = request.headers.get("user-agent", "?")
-            log_event("ask", ip, ua, query=q, engine_used="CANNED")
-            return JSONResponse({"ok": True, "engine_used": "CANNED",
-                                 "answer": CANNED_ANSWER,
-                                 "bullets": make_bullets([CANNED_ANSWER], max_items=4),
+            log_event("ask", ip, ua, query=q, engine_used=engine)
+            return JSONResponse({"ok": True, "engine_used": engine, "answer": answer,
+                                 "bullets": make_bullets([answer], max_items=max_items),
                                  "sources": []})
 
-        if is_sensitive_personal_query(q):
-            ip = request.client.host if request.client else "?"
-            ua = request.headers.get("user-agent", "?")
-            log_event("ask", ip, ua, query=q, engine_used="CANNED_PRIVACY")
-            return JSONResponse({"ok": True, "engine_used": "CANNED_PRIVACY",
-                                 "answer": SENSITIVE_PRIVACY_ANSWER,
-                                 "bullets": make_bullets([SENSITIVE_PRIVACY_ANSWER], max_items=4),
-                                 "sources": []})
-
-        # نتائج بحث مختصرة لاستخدامها كـ context
-        search = await smart_search(q, num=6)
-        sources = search.get("results", [])
-        context_lines = []
-        for i, r in enumerate(sources, start=1):
-            title = (r.get("title") or "").strip()
-            link = (r.get("link") or "").strip()
-            snippet = (r.get("snippet") or "").strip()
-            context_lines.append(f"{i}. {title}\n{snippet}\n{link}")
-
         ip = request.client.host if request.client else "?"
         ua = request.headers.get("user-agent", "?")
 
-        # 1) المحلي أولاً (إن كان مُعدًا أو لو لا يوجد OpenAI)
-        local_first = (USE_LOCAL_FIRST == "1") or (not client)
-        if local_first:
-            local = await ask_local_llm(q, context_lines)
-            if local.get("ok"):
-                log_event("ask", ip, ua, query=q, engine_used="Local")
-                answer = local["answer"]
-                bullets = make_bullets([answer], max_items=8)
-                return JSONResponse({"ok": True, "engine_used": "Local",
-                                     "answer": answer, "bullets": bullets, "sources": sources})
-            # لو فشل المحلي ولم يوجد OpenAI -> نرجّع ملخص البحث
-            if not client:
-                return JSONResponse({
-                    "ok": True, "engine_used": search.get("used"),
-                    "answer": "⚠️ تعذر الاتصال بالنموذج المحلي، أعرض لك ملخصًا من النتائج.",
-                    "bullets": search.get("bullets", []), "sources": sources
-                })
-
-        # 2) OpenAI كاحتياط/أو أساسي إذا USE_LOCAL_FIRST=0
-        if client:
-            system_msg = ("أنت مساعد عربي خبير. أجب بإيجاز ووضوح وبنقاط مركزة عند الحاجة. "
-                          "اعتمد على المعلومات التالية من نتائج البحث كمراجع خارجية. إن لم تكن واثقًا قل لا أعلم.")
-            user_msg = f"السؤال:\n{q}\n\nنتائج البحث (للاستئناس والاستشهاد):\n" + "\n\n".join(context_lines[:6])
-
-            resp = client.chat.completions.create(
-                model=LLM_MODEL or "gpt-5-mini",
-                messages=[{"role": "system", "content": system_msg},
-                          {"role": "user", "content": user_msg}],
-                temperature=0.3, max_tokens=600,
-            )
-            answer = (resp.choices[0].message.content or "").strip()
-            bullets = make_bullets([answer], max_items=8)
-
-            log_event("ask", ip, ua, query=q, engine_used=f"OpenAI:{LLM_MODEL}")
-            return JSONResponse({"ok": True, "engine_used": f"OpenAI:{LLM_MODEL}",
-                                 "answer": answer, "bullets": bullets, "sources": sources})
-
-        # 3) لا محلي ولا OpenAI
+        pipe = ask_pipeline(q)
+        run = await pipe.run({"q": q})
+        search, gen = run["web_search"] or _NO_SEARCH, run["generate"]
+        sources = search.get("results", [])
+        timings = run.report()
+
+        if gen:
+            log_event("ask", ip, ua, query=q, engine_used=gen["engine"])
+            return JSONResponse({"ok": True, "engine_used": gen["engine"], "answer": gen["answer"],
+                                 "bullets": make_bullets([gen["answer"]], max_items=8),
+                                 "sources": sources, "timings": timings})
+
+        if "generate" not in pipe.steps:
+            # الخطة بحث/تلخيص فقط → ملخص النتائج هو الجواب
+            log_event("ask", ip, ua, query=q, engine_used=search.get("used"))
+            bullets = search.get("bullets", [])
+            return JSONResponse({
+                "ok": True, "engine_used": search.get("used"),
+                "answer": "\n".join(f"• {b}" for b in bullets) or "لم أجد نتائج كافية، جرّب صياغة أخرى.",
+                "bullets": bullets, "sources": sources, "timings": timings
+            })
+
+        # لا محلي ولا OpenAI (أو فشلا/انتهت المهلة) -> نرجّع ملخص البحث
+        note = ("⚠️ تعذر الاتصال بالنموذج المحلي، أعرض لك ملخصًا من النتائج." if (USE_LOCAL_FIRST == "1") or (not client)
+                else "⚠️ لا يوجد اتصال بنموذج محلي ولا OpenAI، أعرض ملخصًا من النتائج.")
         return JSONResponse({
-            "ok": True, "engine_used": search.get("used"),
-            "answer": "⚠️ لا يوجد اتصال بنموذج محلي ولا OpenAI، أعرض ملخصًا من النتائج.",
-            "bullets": search.get("bullets", []), "sources": sources
+            "ok": True, "engine_used": search.get("used"), "answer": note,
+            "bullets": search.get("bullets", []), "sources": sources, "timings": timings
         })
 
     except Exception as e:
@@ -478,9 +469,11 @@ def is_admin(request: Request) -> bool:
 def admin_home(request: Request, login: Optional[int] = None):
     if not is_admin(request):
         return templates.TemplateResponse("admin.html", {"request": request, "page": "login", "error": None, "login": True})
+    # السجلات نفسها تُجلب من /admin/api/logs على دفعات أثناء التمرير
     with db() as con:
-        rows = con.execute("SELECT * FROM logs ORDER BY id DESC LIMIT 200").fetchall()
-    return templates.TemplateResponse("admin.html", {"request": request, "page": "dashboard", "rows": rows, "count": len(rows)})
+        stats = {by: rollup_stats(con, days=30, by=by) for by in ("engine", "type", "category")}
+    return templates.TemplateResponse("admin.html", {"request": request, "page": "dashboard",
+                                                     "stats": stats, "stats_days": 30})
 
 @app.post("/admin/login")
 def admin_login(request: Request, password: str = Form(...)):
@@ -497,23 +490,79 @@ def admin_logout():
     return resp
 
 @app.get("/admin/export.csv")
-def admin_export(request: Request):
+def admin_export(request: Request, since: Optional[str] = None, until: Optional[str] = None,
+                 type: List[str] = Query(default=[]), gzip: bool = False, archived: bool = False):
+    """
+    تصدير متدفّق على دفعات. فلاتر اختيارية: since/until (YYYY-MM-DD أو ISO)، type (يتكرر)، gzip=1.
+    archived=1: يُلحق بعد السجلات الحيّة ما نُقل للأرشيف الشهري (الأشهر من الأحدث للأقدم).
+    """
     if not is_admin(request):
         return RedirectResponse(url="/admin?login=1", status_code=302)
-    with db() as con:
-        cur = con.execute("SELECT id, ts, type, query, file_name, engine_used, ip, ua FROM logs ORDER BY id DESC")
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["id","ts","type","query","file_name","engine_used","ip","user_agent"])
-        for row in cur:
-            writer.writerow([
-                row["id"], row["ts"], row["type"], row["query"] or "",
-                row["file_name"] or "", row["engine_used"] or "", row["ip"] or "", row["ua"] or ""
-            ])
-        output.seek(0)
-    return StreamingResponse(iter([output.read()]), media_type="text/csv",
+    log_sink.flush(timeout=1.0)  # ليظهر ما سُجّل قبل لحظات
+    rows = iter_log_rows(DB_PATH, since=since, until=until, types=type)
+    if archived:
+        rows = itertools.chain(rows, iter_archived_log_rows(since=since, until=until, types=type))
+    chunks = stream_csv(rows, gzip=gzip)
+    if gzip:
+        return StreamingResponse(chunks, media_type="application/gzip",
+                                 headers={"Content-Disposition": "attachment; filename=bassam-logs.csv.gz"})
+    return StreamingResponse(chunks, media_type="text/csv",
                              headers={"Content-Disposition": "attachment; filename=bassam-logs.csv"})
 
+@app.get("/admin/api/logs")
+def admin_logs(request: Request, before: Optional[int] = None, limit: int = 50,
+               type: Optional[str] = None, engine: Optional[str] = None, ip: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None):
+    """تصفّح السجلات (keyset): مرّر next_before من الرد السابق في before للصفحة التالية."""
+    if not is_admin(request):
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    try:
+        with db() as con:
+            page = page_logs(con, before_id=before, limit=limit, type=type or None, engine=engine or None,
+                             ip=ip or None, since=since or None, until=until or None)
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=400)
+    return JSONResponse({"ok": True, **page})
+
+@app.get("/admin/api/stats")
+def admin_stats(request: Request, days: int = 30, by: str = "engine"):
+    """أعداد من جداول التجميع: by = engine | type | category | day | hour"""
+    if not is_admin(request):
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    try:
+        with db() as con:
+            items = rollup_stats(con, days=max(1, min(days, 3650)), by=by)
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=400)
+    return JSONResponse({"ok": True, "days": days, "by": by, "items": items})
+
+@app.get("/admin/stream")
+async def admin_stream(request: Request):
+    """SSE: لقطة من العدّادات الحيّة كل ثانية (من الذاكرة فقط، لا قراءة من SQLite)."""
+    if not is_admin(request):
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+
+    async def events():
+        while not await request.is_disconnected():
+            snap = metrics.snapshot()
+            snap["log_sinks"] = log_sink_stats()
+            snap["translation"] = translation_stats()
+            yield f"data: {json.dumps(snap, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/admin/memory")
+def admin_memory(request: Request, tag: List[str] = Query(default=[]), limit: int = 50):
+    """بدون tag: عدد الحقائق لكل وسم. مع tag (يتكرر): الحقائق التي تحمل كل الوسوم."""
+    if not is_admin(request):
+        return RedirectResponse(url="/admin?login=1", status_code=302)
+    if not tag:
+        return JSONResponse({"ok": True, "tags": memory_store.tag_counts()})
+    facts = memory_store.by_tag(*tag, limit=max(1, min(limit, 500)))
+    return JSONResponse({"ok": True, "tags": tag, "count": len(facts), "facts": facts})
+
 # ============================== إرسال إشعارات يدوية من لوحة الإدارة (اختياري)
 @app.get("/admin/push-test")
 def admin_push_test(request: Request, title: str = "📣 إشعار تجريبي", body: str = "مرحبًا! هذا إشعار من بسام الذكي"):
@@ -622,8 +671,16 @@ def job_half_hour_and_kickoff():
             send_push(f"🎬 بدأت الآن: {m['home']} × {m['away']}",
                       f"البطولة: {m['league']}", m["click_url"])
 
+def job_log_retention():
+    """يوميًا: سجلات أقدم من LOG_RETENTION_DAYS (جدول logs + ملفات logs/*.csv) → data/archive/<name>-YYYY-MM.jsonl.gz"""
+    moved = archive_table(DB_PATH, "logs", older_than_days=LOG_RETENTION_DAYS)
+    if moved: print(f"🗄️ archived {moved} log rows")
+    moved = archive_csv_logs(LOG_RETENTION_DAYS)
+    if moved: print(f"🗄️ archived {moved} csv log rows")
+
 def start_scheduler():
     sch = BackgroundScheduler(timezone=TIMEZONE)
+    sch.add_job(job_log_retention, CronTrigger(hour=4, minute=0, timezone=TIMEZONE))        # 🗄️ 04:00 أرشفة السجلات
     sch.add_job(job_daily_digest_15, CronTrigger(hour=15, minute=0, timezone=TIMEZONE))   # ⏰ 15:00 يوميًا مكة
     sch.add_job(job_half_hour_and_kickoff, CronTrigger(minute="*/5", timezone=TIMEZONE))  # ⏱️ كل 5 دقائق
     sch.start()
@@ -634,3 +691,8 @@ def _on_startup():
         start_scheduler()
     except Exception:
         traceback.print_exc()
+
+@app.on_event("shutdown")
+def _on_shutdown():
+    close_log_sinks()
+    close_db_pool()
@@ -4,26 +4,28 @@
 import os, re, math, json, time, sqlite3
 from typing import Dict, Any, Optional
 from datetime import datetime
-import httpx
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from duckduckgo_search import DDGS
 
+from core.dbpool import connect as pooled_connect, close_all as close_db_pool
+from core.arabic import normalize, tidy
+from core.translate import atranslate_many, aclose as close_translator
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 os.makedirs(TEMPLATES_DIR, exist_ok=True)
 os.makedirs(STATIC_DIR, exist_ok=True)
 
-DB_PATH = os.path.join(BASE_DIR, "data", "bassam_mem.db")
+DB_PATH = os.getenv("CORE_DB", os.path.join(BASE_DIR, "data", "bassam_mem.db"))
 os.makedirs(os.path.join(BASE_DIR, "data"), exist_ok=True)
 
 def db():
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+    # اتصال مُعاد استخدامه لهذا الخيط (WAL) — لا تغلقه بعد الاستخدام
+    return pooled_connect(DB_PATH)
 
 def init_db():
     with db() as con:
@@ -42,14 +44,6 @@ def init_db():
 init_db()
 
 # ---------- Utils ----------
-AR_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
-def norm_ar(text: str) -> str:
-    # تلميع بسيط للنص العربي
-    t = text.strip()
-    t = re.sub(r"\s+", " ", t)
-    t = t.translate(AR_DIGITS)
-    return t
-
 LANG_WORDS = {
     "ar": ["عربي","العربية","AR","Arabic"],
     "en": ["انجليزي","الإنجليزية","انجليزية","EN","English"],
@@ -75,12 +69,15 @@ INTENTS = {
     "chitchat": [r"السلام", r"مرحبا", r"شلونك", r"كيف الحال", r"شكرا", r"وداعا"]
 }
 
+# السؤال يُطابَق بعد core.arabic.normalize (ة→ه، إ/أ→ا، بلا تشكيل)، فتُطبَّع الأنماط بنفس
+# الطريقة مرة واحدة: "الى العربية" المكتوبة أعلاه تصبح "الى العربيه".
+_INTENT_RX = {intent: re.compile("|".join(f"(?:{normalize(p)})" for p in pats)) for intent, pats in INTENTS.items()}
+
 def classify_intent(q: str) -> str:
-    qn = norm_ar(q).lower()
-    for intent, patterns in INTENTS.items():
-        for pat in patterns:
-            if re.search(pat, qn):
-                return intent
+    qn = normalize(q)
+    for intent, rx in _INTENT_RX.items():
+        if rx.search(qn):
+            return intent
     # heuristics
     if re.search(r"https?://", qn):
         return "search"
@@ -101,20 +98,19 @@ async def tool_search_web(q: str, max_results: int = 3) -> str:
     return "\n\n".join(out) if out else "لم أجد نتيجة مناسبة."
 
 async def tool_translate(text: str, target: str = "ar") -> str:
-    url = "https://libretranslate.de/translate"
-    payload = {"q": text, "source": "auto", "target": target}
-    try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(url, json=payload, headers={"Content-Type":"application/json"})
-            data = r.json()
-            return data.get("translatedText", "تعذر إتمام الترجمة الآن.")
-    except Exception:
+    # كل سطر مقطع: الأسطر المكررة/المترجمة سابقًا من الذاكرة، والباقي في طلب واحد (core.translate)
+    lines = text.split("\n")
+    segs = list(dict.fromkeys(l.strip() for l in lines if l.strip()))
+    if not segs: return "تعذر إتمام الترجمة الآن."
+    out = dict(zip(segs, await atranslate_many(segs, target=target, backend="libre", fallback=False)))
+    if any(v is None for v in out.values()):
         return "تعذر الاتصال بخدمة الترجمة."
+    return "\n".join(out[l.strip()] if l.strip() else l for l in lines)
 
 SAFE_MATH = re.compile(r"^[0-9\.\+\-\*/\^\%\(\)\s]+$")
 def tool_calc(expr: str) -> str:
     expr = expr.replace("^", "**")
-    expr = norm_ar(expr)
+    expr = tidy(expr)
     if not SAFE_MATH.match(expr):
         return "لأسباب أمان لا أستطيع حساب هذه الصيغة."
     try:
@@ -139,7 +135,7 @@ def log_msg(role:str, text:str):
 
 # ---------- Dialogue Manager ----------
 async def handle_user(q: str) -> str:
-    q = norm_ar(q)
+    q = tidy(q)
     log_msg("user", q)
 
     intent = classify_intent(q)
@@ -238,6 +234,11 @@ recallBtn.addEventListener('click', ()=> ask('اعرض ما الذي تذكرت
 </body></html>
 """
 
+@app.on_event("shutdown")
+async def _on_shutdown():
+    await close_translator()
+    close_db_pool()
+
 @app.get("/", response_class=HTMLResponse)
 async def root(_: Request):
     return HTMLResponse(INDEX_HTML)
@@ -0,0 +1,11 @@
+# tests/conftest.py — تشغيل: python -m pytest -q (من جذر المستودع)
+# قواعد البيانات التي تُنشأ عند الاستيراد (bassam_agent، main_core) تُوجَّه إلى مجلد مؤقت قبل أي استيراد،
+# فلا يترك الاختبار ملفات في data/.
+import os, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_TMP = tempfile.mkdtemp(prefix="bassam-tests-")
+for var, name in (("AGENT_DB", "bassam.db"), ("AGENT_MEMORY_DB", "memory.db"), ("CORE_DB", "bassam_mem.db"),
+                  ("TRANSLATE_DB", "translations.db"), ("ARCHIVE_DIR", "archive")):
+    os.environ[var] = os.path.join(_TMP, name)
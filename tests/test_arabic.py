@@ -0,0 +1,23 @@
+# tests/test_arabic.py — core.arabic: نفس القواعد في المسار القصير (المخزَّن) والطويل
+import pytest
+
+from core.arabic import DIACRITICS, DIGITS, FOLD, TATWEEL, normalize, tidy
+
+_REF = str.maketrans({**{c: None for c in DIACRITICS + TATWEEL}, **FOLD, **DIGITS})
+
+SAMPLES = ["مَنْ هُوَ مُؤَسِّسُ الدَّولةِ الأمويّة؟", "كم عدد سكان مصر عام ٢٠٢٤ و۱۴۰۳", "إلى آخره ٱلـــرحمٰن",
+           "Hello WORLD ئ ؤ ى ة", "بدون أرقام ولا تشكيل"]
+
+@pytest.mark.parametrize("text", SAMPLES + [" ".join(SAMPLES * 20)])
+def test_matches_reference_table(text):
+    assert normalize(text) == text.translate(_REF).lower().strip()
+    assert normalize(text, spaces=True) == " ".join(text.translate(_REF).lower().split())
+
+def test_rules():
+    assert normalize("  أَحْمَدُ  إلى   مدرسة ٣ ") == "احمد  الي   مدرسه 3"
+    assert normalize("أحمد   إلى", spaces=True) == "احمد الي"
+    assert normalize("") == "" and normalize(None) == ""
+
+def test_tidy_keeps_letters():
+    assert tidy("  أَحمد   عام ٢٠٢٤ ") == "أَحمد عام 2024"
+    assert tidy(("رقم ٧ " * 100).strip()) == ("رقم 7 " * 100).strip()
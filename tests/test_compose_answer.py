@@ -0,0 +1,28 @@
+# tests/test_compose_answer.py — core.compose_answer: النقاط غير العربية تُترجم في دفعة واحدة
+import core.translate
+from core.compose_answer import compose_answer_ar
+
+RESULTS = [
+    {"title": "Python programming language overview", "snippet": "Python is a popular general purpose language.",
+     "link": "https://a.example"},
+    {"title": "بايثون لغة برمجة عامة الاستخدام", "snippet": "", "link": "https://b.example"},
+]
+
+def test_one_batch_for_non_arabic_bullets(monkeypatch):
+    calls = []
+    def fake(texts, target="ar", **kw):
+        calls.append(list(texts)); return [f"ترجمة: {t}" for t in texts]
+    monkeypatch.setattr(core.translate, "translate_many", fake)
+    out = compose_answer_ar("ما هي بايثون؟", RESULTS)
+    assert calls == [["Python programming language overview", "Python is a popular general purpose language"]]
+    assert "• ترجمة: Python programming language overview" in out["answer"]
+    assert "• بايثون لغة برمجة عامة الاستخدام" in out["answer"]
+    assert out["links"] == ["https://a.example", "https://b.example"]
+
+def test_arabic_only_skips_translation(monkeypatch):
+    monkeypatch.setattr(core.translate, "translate_many", lambda *a, **kw: 1 / 0)
+    out = compose_answer_ar("سؤال", RESULTS[1:])
+    assert "• بايثون لغة برمجة عامة الاستخدام" in out["answer"]
+
+def test_no_bullets():
+    assert compose_answer_ar("سؤال", [])["answer"] == "لم أستطع استخراج نقاط مفيدة من الويب."
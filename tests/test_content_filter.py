@@ -0,0 +1,72 @@
+# tests/test_content_filter.py — core.content_filter: القوائم، الأنماط، إعادة القراءة
+import json, os
+
+import pytest
+
+from core.content_filter import Automaton, ContentFilter, Hit, Scan, build_matcher, content_filter
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False)
+
+@pytest.fixture
+def make_filter(tmp_path):
+    path = str(tmp_path / "blocklist.json")
+    def make(data):
+        _write(path, data)
+        return ContentFilter(path)
+    make.path = path
+    return make
+
+def test_terms_match_normalized_text(make_filter):
+    f = make_filter({"lists": {"bad": ["افلام اباحيه", "xxx"], "other": ["كلمة"]}})
+    assert f.check("أفلامُ   إباحيّة") == Hit("bad", "افلام اباحيه")
+    assert f.check("XXX videos") == Hit("bad", "xxx")
+    assert f.check("كلمة", ["bad"]) is None
+    assert f.check("كلمة", ["other"]) == Hit("other", "كلمه")
+    assert f.check("سؤال عادي عن البرمجة") is None
+
+def test_collapse_spaces_only_for_listed_categories(make_filter):
+    f = make_filter({"lists": {"explicit": ["sex"], "haram": ["porn"]}, "collapse_spaces": ["explicit"]})
+    assert f.check("s e x") == Hit("explicit", "sex")
+    assert f.check("p o r n") is None
+    assert f.check("s e x", ["haram"]) is None
+
+def test_patterns_keep_uppercase_escapes(make_filter):
+    f = make_filter({"lists": {}, "patterns": {"email": [r"\S+@\S+\.\w+"], "num": [r"رقم\s*\D{0,2}\d{6,}"]}})
+    assert f.check("راسلني a.b@x.com") == Hit("email", "a.b@x.com")
+    assert f.check("رقم: 0551234567").category == "num"
+    assert f.check("x @ .com") is None   # كان \S يصبح \s بعد lowercase فيطابق " @ .com"
+
+def test_unnormalized_pattern_rejected_keeps_previous_lists(make_filter):
+    f = make_filter({"lists": {"bad": ["سكس"]}, "patterns": {"p": ["اسم ام"]}})
+    assert f.check("ما اسم أم فلان") == Hit("p", "اسم ام")
+    _write(make_filter.path, {"lists": {"bad": ["جديد"]}, "patterns": {"p": ["اسم زوجة"]}})   # ة غير مُطبَّعة
+    os.utime(make_filter.path, ns=(1, 1))
+    assert f.reload() is False
+    assert f.check("سكس") == Hit("bad", "سكس")
+
+def test_reload_on_change(make_filter):
+    f = make_filter({"lists": {"bad": ["قديم"]}})
+    _write(make_filter.path, {"lists": {"bad": ["جديدة الكلمة"]}})
+    os.utime(make_filter.path, ns=(2, 2))
+    assert f.reload() is True
+    assert f.check("قديم") is None
+    assert f.check("جديده الكلمه") == Hit("bad", "جديده الكلمه")
+
+def test_missing_file_is_empty(tmp_path):
+    assert ContentFilter(str(tmp_path / "none.json")).check("sex") is None
+
+def test_scan_and_automaton_agree():
+    terms = [("a", "he"), ("b", "she"), ("a", "hers"), ("c", "his")]
+    for text in ("ushers", "this", "nothing", "sh e"):
+        a, s = Automaton(terms).first(text), Scan(terms).first(text)
+        assert (a is None) == (s is None), text
+    assert Automaton(terms).first("ushers", frozenset({"c"})) is None
+    assert isinstance(build_matcher([("x", str(i)) for i in range(1000)]), Automaton)
+    assert isinstance(build_matcher(terms), Scan)
+
+def test_shipped_blocklist():
+    assert content_filter.check("افلام اباحية", ["haram"]) is not None
+    assert content_filter.check("ما اسم زوجة أحمد", ["sensitive_personal"]) is not None
+    assert content_filter.check("s e x", ["explicit"]) is not None
+    assert content_filter.check("كيف اتعلم البرمجة") is None
@@ -0,0 +1,56 @@
+# tests/test_fts_query.py — bassam_agent.fts_query: تعبير MATCH آمن لأي نص مستخدم
+import sqlite3
+
+import pytest
+
+import bassam_agent
+from bassam_agent import FTS_MAX_TERMS, _write_chats, fts_query, mdb, search_memories_like
+
+def test_terms_normalized_quoted_or():
+    assert fts_query("ما هي عاصمة فرنسا؟") == '"عاصمه"* OR "فرنسا"*'
+    assert fts_query("أحمد احمد إحمد") == '"احمد"*'
+
+def test_operators_become_plain_words():
+    assert fts_query('ما هو "الذكاء" AND NOT ai* (x) NEAR y') == '"الذكاء"* OR "and"* OR "not"* OR "ai"* OR "near"*'
+
+@pytest.mark.parametrize("text", ["", "   ", "؟!", "و يا في", "* ( ) \" : ^ -"])
+def test_nothing_to_match(text):
+    assert fts_query(text) == ""
+
+def test_term_cap_and_dedup():
+    q = fts_query(" ".join(f"كلمة{i}" for i in range(30)) + " كلمة0")
+    assert q.count(" OR ") == FTS_MAX_TERMS - 1
+
+@pytest.mark.parametrize("text", ['"غير مغلق', "col:value", "a OR OR b", "NEAR(ab cd)", "^بداية", "-نفي كلمة",
+                                  "ab*cd", "my_file", "__init__.py", "snake_case_name و كلمة"])
+def test_always_valid_match(text):
+    # جدول chats_search الحقيقي (detail='column' لا يقبل عبارات متعددة الكلمات)
+    with mdb() as con:
+        q = fts_query(text)
+        if q: con.execute("SELECT rowid FROM chats_search WHERE chats_search MATCH ?", (q,)).fetchall()
+
+def test_underscore_splits_into_terms():
+    assert fts_query("my_file") == '"my"* OR "file"*'
+    _write_chats([("2025-01-01T00:00:00Z", "fts-test", "user", "احب القهوه مع الحليب")])
+    assert search_memories_like("القهوه my_file", session="fts-test") == ["احب القهوه مع الحليب"]
+
+def test_session_filter_inside_fts():
+    _write_chats([("2025-01-01T00:00:00Z", "sess-a", "user", "موعد الطبيب يوم الاحد"),
+                  ("2025-01-01T00:00:01Z", "sess-b", "user", "موعد السفر يوم الاحد")])
+    assert search_memories_like("موعد", session="sess-a") == ["موعد الطبيب يوم الاحد"]
+    assert search_memories_like("موعد", session="sess-c") == []
+    assert len(search_memories_like("موعد")) == 2
+
+def test_old_index_without_sid_is_rebuilt(tmp_path, monkeypatch):
+    path = str(tmp_path / "memory.db")
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE chats(id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, role TEXT NOT NULL,"
+                " text TEXT NOT NULL, session TEXT NOT NULL DEFAULT '')")
+    con.execute("CREATE VIRTUAL TABLE chats_search USING fts5(norm, tokenize='unicode61 remove_diacritics 2', detail='column')")
+    con.execute("INSERT INTO chats(ts,role,text,session) VALUES('2025-01-01T00:00:00Z','user','رحلة الى جدة','old')")
+    con.execute("INSERT INTO chats_search(rowid,norm) VALUES(1,'رحله الى جده')")
+    con.commit(); con.close()
+    monkeypatch.setattr(bassam_agent, "MEM_DB", path)
+    bassam_agent.init_memory()
+    assert search_memories_like("جدة", session="old") == ["رحلة الى جدة"]
+    assert search_memories_like("جدة", session="other") == []
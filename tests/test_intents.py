@@ -0,0 +1,40 @@
+# tests/test_intents.py — main_core.classify_intent على النص المُطبَّع (core.arabic.normalize)
+import pytest
+
+main_core = pytest.importorskip("main_core")
+from main_core import INTENTS, classify_intent
+
+@pytest.mark.parametrize("q, intent", [
+    ("تذكّر أن اسمي أحمد", "remember"),
+    ("احفظ رقم الغرفة ١٢", "remember"),
+    ("ما الذي تتذكره عني؟", "recall"),
+    ("اعرض كل المحفوظ", "recall"),
+    ("حوّل هذا الى العربية", "translate"),
+    ("حول النص إلى العربية «hello»", "translate"),
+    ("ترجمة هذه الجملة", "translate"),
+    ("Translate this please", "translate"),
+    ("احسب ٢ + ٣", "calc"),
+    ("كم يساوي 5*7", "calc"),
+    ("ما معنى كلمة سراب", "define"),
+    ("اشرح الجاذبية", "define"),
+    ("ابحث عن مطاعم قريبة", "search"),
+    ("مَن هو ابن سينا", "search"),
+    ("السلام عليكم", "chitchat"),
+    ("شكرًا جزيلًا", "chitchat"),
+])
+def test_classify_intent(q, intent):
+    assert classify_intent(q) == intent
+
+def test_every_pattern_matches_its_own_text():
+    # كل نمط حرفي (بلا رموز تعبير) يجب أن يصنَّف إلى نيّته أو نيّة أسبق منها في الترتيب
+    order = list(INTENTS)
+    for intent, pats in INTENTS.items():
+        for p in pats:
+            text = p.lstrip("^")
+            if any(c in text for c in ".*?+[]()|\\"): continue
+            got = classify_intent(text)
+            assert order.index(got) <= order.index(intent), (p, got)
+
+def test_heuristics():
+    assert classify_intent("https://example.com") == "search"
+    assert classify_intent("(3+4)") == "calc"
@@ -0,0 +1,52 @@
+# tests/test_local_memory.py — core.local_memory.KnowledgeIndex: BM25 + إعادة القراءة عند التغيّر
+import os
+
+from core.local_memory import KnowledgeIndex
+
+def _write(path, text, mode="w", ns=None):
+    with open(path, mode, encoding="utf-8") as f: f.write(text)
+    if ns: os.utime(path, ns=(ns, ns))
+
+def test_bm25_ranks_all_query_words(tmp_path):
+    p = str(tmp_path / "k.txt")
+    _write(p, "بايثون لغة برمجة سهلة\nالقاهرة عاصمة مصر\nالرياض عاصمة السعودية\n")
+    idx = KnowledgeIndex(p); idx.reload()
+    res = idx.search("ما هي عاصمة مصر؟")
+    assert [line for _, line in res] == ["القاهرة عاصمة مصر", "الرياض عاصمة السعودية"]
+    assert idx.search("كلمة غير موجودة") == []
+    assert idx.search("") == []
+
+def test_append_is_incremental(tmp_path):
+    p = str(tmp_path / "k.txt")
+    _write(p, "سطر اول عن بايثون\n", ns=1)
+    idx = KnowledgeIndex(p); idx.reload()
+    _write(p, "سطر ثان عن جافا\n", "a", ns=2)
+    assert idx.reload() is True
+    assert idx.info()["appends"] == 1 and idx.info()["lines"] == 2
+    assert idx.search("جافا")[0][1] == "سطر ثان عن جافا"
+
+def test_partial_last_line_then_append_rebuilds(tmp_path):
+    p = str(tmp_path / "k.txt")
+    _write(p, "القاهرة عاصمة مصر", ns=1)
+    idx = KnowledgeIndex(p); idx.reload()
+    _write(p, " الكبرى\nجدة مدينة\n", "a", ns=2)
+    idx.reload()
+    assert idx.info()["appends"] == 0 and idx.info()["lines"] == 2
+    assert idx.search("الكبرى")[0][1] == "القاهرة عاصمة مصر الكبرى"
+
+def test_rewrite_truncate_and_delete(tmp_path):
+    p = str(tmp_path / "k.txt")
+    _write(p, "سطر قديم طويل جدا عن بايثون\nسطر اخر\n", ns=1)
+    idx = KnowledgeIndex(p); idx.reload()
+    _write(p, "نص جديد\n", ns=2)                       # أقصر: إعادة بناء
+    idx.reload()
+    assert idx.search("بايثون") == [] and idx.search("جديد")[0][1] == "نص جديد"
+    _write(p, "نص اخر مختلف تماما عن السابق كله\n", ns=3)   # أطول لكن بداية مختلفة
+    idx.reload()
+    assert idx.search("جديد") == [] and idx.info()["lines"] == 1
+    os.remove(p)
+    assert idx.reload() is True and idx.search("مختلف") == []
+
+def test_missing_file(tmp_path):
+    idx = KnowledgeIndex(str(tmp_path / "none.txt"))
+    assert idx.search("اي شيء") == []
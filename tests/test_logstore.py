@@ -0,0 +1,51 @@
+# tests/test_logstore.py — core.logstore.page_logs: ترقيم keyset على id مع الفلاتر
+import sqlite3
+
+import pytest
+
+from core.logstore import ensure_log_schema, insert_logs, page_logs
+
+@pytest.fixture
+def con():
+    con = sqlite3.connect(":memory:")
+    con.execute("""CREATE TABLE logs(id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, type TEXT NOT NULL,
+                   query TEXT, file_name TEXT, engine_used TEXT, ip TEXT, ua TEXT)""")
+    ensure_log_schema(con)
+    insert_logs(con, [(f"2025-01-{1 + i // 10:02d}T10:00:{i % 60:02d}Z", "search" if i % 2 else "ask",
+                       f"q{i}", None, "google" if i % 3 else "ddg", f"10.0.0.{i % 4}", "ua") for i in range(47)])
+    return con
+
+def _all_pages(con, **kw):
+    ids, before, pages = [], None, 0
+    while True:
+        page = page_logs(con, before_id=before, **kw)
+        ids += [r["id"] for r in page["items"]]; pages += 1
+        before = page["next_before"]
+        if before is None: return ids, pages
+
+def test_pages_cover_everything_newest_first(con):
+    ids, pages = _all_pages(con, limit=10)
+    assert ids == list(range(47, 0, -1)) and pages == 5
+
+def test_exact_multiple_ends_with_empty_page(con):
+    ids, pages = _all_pages(con, limit=47)
+    assert len(ids) == 47 and pages == 2
+
+def test_filters_combine_with_keyset(con):
+    ids, _ = _all_pages(con, limit=3, type="search", engine="google", ip="10.0.0.1")
+    expected = [i for i in range(47, 0, -1) if (i - 1) % 2 and (i - 1) % 3 and (i - 1) % 4 == 1]
+    assert ids == expected and expected
+
+def test_date_bounds(con):
+    ids, _ = _all_pages(con, limit=100, since="2025-01-02", until="2025-01-03")
+    assert ids == list(range(30, 10, -1))
+
+def test_new_rows_do_not_shift_pages(con):
+    first = page_logs(con, limit=10)
+    insert_logs(con, [("2025-02-01T00:00:00Z", "ask", "new", None, "ddg", "1.1.1.1", "ua")])
+    second = page_logs(con, before_id=first["next_before"], limit=10)
+    assert [r["id"] for r in second["items"]] == list(range(37, 27, -1))
+
+def test_limit_clamped(con):
+    assert len(page_logs(con, limit=0)["items"]) == 1
+    assert len(page_logs(con, limit=10_000)["items"]) == 47
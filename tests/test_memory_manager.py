@@ -0,0 +1,88 @@
+# tests/test_memory_manager.py — brain.memory_manager.MemoryManager: الوسوم، البحث، تعدد العمليات
+import multiprocessing, os
+
+from brain.memory_manager import MemoryManager
+
+def _mm(tmp_path):
+    mm = MemoryManager(str(tmp_path / "memory.json"))
+    mm.add_facts([{"content": "القاهرة عاصمة مصر", "tags": ["qa", "ar"]},
+                  {"content": "Paris is the capital of France", "tags": ["qa", "en"]},
+                  {"content": "ملاحظة عامة", "tags": ["note", "ar"]}])
+    return mm
+
+def test_empty_search_returns_nothing(tmp_path):
+    mm = _mm(tmp_path)
+    assert mm.search("") == [] and mm.search("   ") == []
+    assert mm.query("", tags=["ar"]) == []
+
+def test_recent_is_explicit(tmp_path):
+    mm = _mm(tmp_path)
+    assert len(mm.query("", recent=True, limit=10)) == 3
+    assert {f["content"] for f in mm.query("", tags=["ar"], recent=True)} == {"القاهرة عاصمة مصر", "ملاحظة عامة"}
+    assert [f["content"] for f in mm.by_tag("ar")] == ["ملاحظة عامة", "القاهرة عاصمة مصر"]
+
+def test_tag_filter_then_text(tmp_path):
+    mm = _mm(tmp_path)
+    assert [f["content"] for f in mm.query("capital", tags=["qa"])] == ["Paris is the capital of France"]
+    assert mm.query("capital", tags=["ar"]) == []
+    assert mm.query("عاصمة", tags=["QA", "ar"])[0]["content"] == "القاهرة عاصمة مصر"
+    assert mm.by_tag("qa", "missing") == []
+    assert dict(mm.tag_counts())["qa"] == 2
+
+def test_duplicates_skipped(tmp_path):
+    mm = _mm(tmp_path)
+    mm.add_fact("القاهرة عاصمة مصر", tags=["qa"])
+    assert len(mm.all()) == 3
+
+def test_missing_file_resets(tmp_path):
+    mm = _mm(tmp_path)
+    os.remove(mm.path)
+    assert mm.refresh() is True and mm.all() == [] and mm.search("عاصمة") == []
+    assert mm.refresh() is False
+    mm.add_fact("حقيقة بعد الحذف", tags=["ar"])
+    assert os.path.exists(mm.path) and [f["content"] for f in MemoryManager(mm.path).all()] == ["حقيقة بعد الحذف"]
+
+def _writer(path, n, k):
+    mm = MemoryManager(path)
+    for i in range(k):
+        mm.add_fact(f"حقيقة {n}-{i}", tags=[f"p{n}"])
+
+def test_multiple_processes(tmp_path):
+    path = str(tmp_path / "memory.json")
+    reader = MemoryManager(path)
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(path, n, 10)) for n in range(4)]
+    for p in procs: p.start()
+    for p in procs: p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+    facts = reader.all()
+    assert len(facts) == 40 and len({f["id"] for f in facts}) == 40
+    assert reader.version == 40
+    assert all(len(reader.by_tag(f"p{n}")) == 10 for n in range(4))
+
+def test_recall_uses_intent_and_lang_tags(tmp_path, monkeypatch):
+    from brain import learn_brain
+    mm = MemoryManager(str(tmp_path / "memory.json"))
+    mm.add_facts([{"content": "القاهرة عاصمة مصر", "tags": ["qa", "ar"]},
+                  {"content": "عاصمة مصر في كود بايثون", "tags": ["code", "ar"]},
+                  {"content": "Cairo is the capital of Egypt", "tags": ["qa", "en"]}])
+    monkeypatch.setattr(learn_brain, "mm", mm)
+    assert [f["content"] for f in learn_brain.recall("ما عاصمة مصر؟")] == ["القاهرة عاصمة مصر"]
+    assert [f["content"] for f in learn_brain.recall("capital of Egypt?")] == ["Cairo is the capital of Egypt"]
+    assert learn_brain.recall("سؤال لا علاقة له") == []
+
+def test_threads_adding_while_others_refresh(tmp_path):
+    import threading
+    path = str(tmp_path / "memory.json")
+    writer, other = MemoryManager(path), MemoryManager(path)
+    def add(n):
+        for i in range(25): writer.add_fact(f"حقيقة {n}-{i}", tags=[f"t{n}"])
+    def read():
+        for _ in range(200): writer.refresh(); writer.query("حقيقة", limit=3)
+    other.add_fact("من عملية اخرى", tags=["x"])   # يجبر writer على إعادة التحميل
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(4)] + [threading.Thread(target=read) for _ in range(2)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    facts = MemoryManager(path).all()
+    assert len(facts) == 101 and len(writer.all()) == 101
+    assert all(len(writer.by_tag(f"t{n}")) == 25 for n in range(4)) and len(writer.by_tag("x")) == 1
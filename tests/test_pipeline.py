@@ -0,0 +1,102 @@
+# tests/test_pipeline.py — brain.pipeline: ترتيب الاعتماديات، التوازي، المهلة، النتيجة الاحتياطية، from_plan
+import asyncio, time
+
+import pytest
+
+from brain.pipeline import Pipeline, Step
+
+def _const(v, delay=0.0):
+    async def fn(ctx, res):
+        if delay: await asyncio.sleep(delay)
+        return v
+    return fn
+
+def _run(p, ctx=None):
+    return asyncio.run(p.run(ctx))
+
+def test_toposort_respects_deps():
+    p = Pipeline([Step("c", _const(3), ("a", "b")), Step("b", _const(2), ("a",)), Step("a", _const(1))])
+    assert p.order == ["a", "b", "c"]
+
+def test_invalid_graphs():
+    with pytest.raises(ValueError, match="unknown deps"):
+        Pipeline([Step("a", _const(1), ("x",))])
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Step("a", _const(1), ("b",)), Step("b", _const(2), ("a",))])
+    with pytest.raises(ValueError, match="duplicate"):
+        Pipeline([Step("a", _const(1)), Step("a", _const(2))])
+
+def test_deps_see_results_and_independent_steps_overlap():
+    async def total(ctx, res): return res["a"] + res["b"]
+    p = Pipeline([Step("a", _const(1, 0.2)), Step("b", _const(2, 0.2)), Step("sum", total, ("a", "b"))])
+    t0 = time.perf_counter(); run = _run(p); dt = time.perf_counter() - t0
+    assert run["sum"] == 3 and run.status == {"a": "ok", "b": "ok", "sum": "ok"}
+    assert dt < 0.35
+
+def test_timeout_uses_fallback():
+    async def after(ctx, res): return f"after:{res['slow']}"
+    p = Pipeline([Step("slow", _const("late", 1.0), timeout=0.05, fallback="fb"), Step("next", after, ("slow",))])
+    run = _run(p)
+    assert run["slow"] == "fb" and run.status["slow"] == "timeout"
+    assert run["next"] == "after:fb" and run.status["next"] == "ok"
+
+def test_error_calls_fallback_with_exception():
+    async def boom(ctx, res): raise RuntimeError("x")
+    p = Pipeline([Step("boom", boom, fallback=lambda c, r, e: type(e).__name__)])
+    run = _run(p)
+    assert run["boom"] == "RuntimeError" and run.status["boom"] == "error"
+
+def test_when_false_skips_with_fallback():
+    called = []
+    async def fn(ctx, res): called.append(1); return "ran"
+    p = Pipeline([Step("s", fn, fallback=None, when=lambda c, r: c["go"])])
+    run = _run(p, {"go": False})
+    assert run["s"] is None and run.status["s"] == "skipped" and not called
+    assert _run(p, {"go": True})["s"] == "ran"
+
+def test_background_not_awaited():
+    done = []
+    async def bg(ctx, res): await asyncio.sleep(0.1); done.append(res["a"])
+    p = Pipeline([Step("a", _const(1)), Step("bg", bg, ("a",), background=True)])
+    async def main():
+        run = await p.run({})
+        assert "bg" not in run.status and not done
+        await asyncio.sleep(0.2)
+        return run
+    run = asyncio.run(main())
+    assert done == [1] and run.status["bg"] == "ok"
+
+def _seen():
+    async def fn(ctx, res): return sorted(k for k in res if res[k] is not None)
+    return fn
+
+def test_from_plan_skips_unhandled_steps_and_inherits_deps():
+    plan = [{"name": "analyze", "deps": []}, {"name": "search", "deps": ["analyze"]},
+            {"name": "summarize", "deps": ["search"]}, {"name": "generate", "deps": ["summarize"]},
+            {"name": "learn", "deps": ["generate"]}]
+    handlers = {"search": Step("search", _const("s")), "generate": Step("generate", _seen())}
+    p = Pipeline.from_plan(plan, handlers)
+    assert p.order == ["search", "generate"]
+    assert p.steps["generate"].deps == ("search",) and p.steps["search"].deps == ()
+    assert _run(p)["generate"] == ["search"]
+
+def test_from_plan_keeps_handler_options_and_drops_foreign_deps():
+    plan = [{"name": "a", "deps": []}, {"name": "b", "deps": []}]
+    handlers = {"a": Step("a", _const(1, 1.0), timeout=0.05, fallback="fb"),
+                "b": Step("b", _seen(), ("a", "not_in_plan"))}
+    p = Pipeline.from_plan(plan, handlers)
+    assert p.steps["b"].deps == ("a",)
+    run = _run(p)
+    assert run["a"] == "fb" and run.status["a"] == "timeout" and run["b"] == ["a"]
+
+@pytest.mark.parametrize("q, steps", [
+    ("ابحث عن اسعار الذهب", ["web_search", "summarize"]),
+    ("لماذا السماء زرقاء؟", ["web_search", "summarize", "generate"]),
+    ("اكتب كود python لفرز قائمة", ["generate"]),
+])
+def test_planner_drives_step_selection(q, steps):
+    from brain.planner import plan_pipeline
+    handlers = {n: Step(n, _const(n)) for n in ("web_search", "summarize", "generate")}
+    p = Pipeline.from_plan(plan_pipeline(q), handlers)
+    assert p.order == steps
+    assert all(p.steps[b].deps == (a,) for a, b in zip(steps, steps[1:]))
@@ -0,0 +1,23 @@
+# tests/test_retention.py — أرشفة ملفات CSV (core.retention.archive_csv عبر job_log_retention)
+import csv, gzip, json, os
+
+from core.retention import archive_csv
+
+def test_archive_csv_moves_old_rows(tmp_path):
+    path = tmp_path / "conversations.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["timestamp", "ip", "question"])
+        w.writerow(["2000-01-05 10:00:00", "1.1.1.1", "قديم"])
+        w.writerow(["2999-01-01 10:00:00", "2.2.2.2", "حديث"])
+    archive = tmp_path / "archive"
+    assert archive_csv(str(path), older_than_days=30, archive_dir=str(archive)) == 1
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["timestamp", "ip", "question"], ["2999-01-01 10:00:00", "2.2.2.2", "حديث"]]
+    with gzip.open(archive / "conversations-2000-01.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(l)["question"] for l in f] == ["قديم"]
+    assert archive_csv(str(path), older_than_days=30, archive_dir=str(archive)) == 0
+
+def test_archive_csv_missing_file(tmp_path):
+    assert archive_csv(str(tmp_path / "nope.csv"), older_than_days=30, archive_dir=str(tmp_path)) == 0
@@ -0,0 +1,23 @@
+# tests/test_segment.py — core.segment: ذاكرة التقطيع وعدّاد الكاش في core.metrics
+import core.segment
+from core.metrics import Metrics
+from core.segment import SegmentCache
+
+TEXT = "هذه جملة أولى طويلة بما يكفي. وهذه جملة ثانية طويلة أيضًا!"
+
+def test_hits_and_misses_reach_admin_metrics(monkeypatch):
+    m = Metrics(); monkeypatch.setattr(core.segment, "metrics", m)
+    cache = SegmentCache()
+    first = cache.get(TEXT)
+    assert cache.get(TEXT) is first and cache.get(TEXT, "bullets") is not first
+    assert first.sents == ("هذه جملة أولى طويلة بما يكفي.", "وهذه جملة ثانية طويلة أيضًا!")
+    assert cache.info()["hits"] == 1 and cache.info()["misses"] == 2
+    assert m.snapshot()["cache_hit_rate"] == round(1 / 3, 3)
+
+def test_lru_eviction_by_bytes():
+    cache = SegmentCache()
+    a, b = cache.get(TEXT), cache.get(TEXT + " ثالثة هنا ايضا.")
+    cache.max_bytes = a.size + b.size
+    cache.get(TEXT)                                  # a الأحدث استخدامًا
+    cache.get("نص جديد مختلف تماما عن السابق هنا.")  # يطرد b
+    assert cache.get(TEXT) is a and cache.info()["entries"] == 2
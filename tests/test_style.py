@@ -0,0 +1,22 @@
+# tests/test_style.py — bassam_agent: ذاكرة ملفات الأسلوب (LRU) والعدّادات الجارية
+import bassam_agent as ba
+
+def _reset(monkeypatch, n):
+    monkeypatch.setattr(ba, "STYLE_MAX_SESSIONS", n)
+    ba._style_cache.clear(); ba._style_stats.clear()
+
+def test_hit_refreshes_recency(monkeypatch):
+    _reset(monkeypatch, 2)
+    ba.get_style_profile("lru-a"); ba.get_style_profile("lru-b")
+    ba.get_style_profile("lru-a")                 # a الأحدث الآن
+    ba.get_style_profile("lru-c")                 # يُستبعد b لا a
+    assert list(ba._style_cache) == ["lru-a", "lru-c"] and set(ba._style_stats) == {"lru-a", "lru-c"}
+
+def test_push_updates_tone_and_recency(monkeypatch):
+    _reset(monkeypatch, 2)
+    ba.get_style_profile("tone-a"); ba.get_style_profile("tone-b")
+    assert ba.get_style_profile("tone-a")["tone"] == "هادئ وودّي"
+    ba._style_push("user", "رائع!!!", "tone-a")
+    assert ba.get_style_profile("tone-a")["tone"] == "حماسي وودّي"
+    ba._style_push("user", "تمام", "tone-b")
+    assert list(ba._style_cache) == ["tone-a", "tone-b"]